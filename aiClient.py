@@ -2,152 +2,535 @@
 """
 AI Client for asking simple questions to various AI providers
 Supports OpenAI, Anthropic (Claude), and local models via Ollama
+
+Each provider keeps a pooled requests.Session for ask_question, and one
+pooled httpx.AsyncClient for ask_question_async / ask_many, which fan
+questions out concurrently on an event loop instead of blocking a thread per
+request; close it with aclose() or async with before the loop ends.
+stream_question (and stream_question_async) yield the answer as it
+is generated and can stop early, e.g. once a tweet's worth of text is in.
 """
 
+import asyncio
 import os
 import requests
 import json
 from typing import Optional, Dict, Any
 from abc import ABC, abstractmethod
 
+import httpx
 from openai import OpenAI as OpenAIClient
 
+from diskCache import DiskCache, cacheKey
+from tokenEstimator import maxTokensFor, promptTokens
+from tweetLength import TWEET_LIMIT, weightedLength
+
+
+DEFAULT_ASYNC_CONNECTIONS = 20
+# answer size asked for when the caller gives no max_tokens
+DEFAULT_MAX_TOKENS = 1000
+
+
+def tweetBudget(limit: int = TWEET_LIMIT):
+    """
+    Stop condition for stream_question: true once the text fills a tweet
+
+    Args:
+        limit (int): weighted length to stop at, urls count 23 and wide
+            characters 2 as in tweetLength
+
+    Returns:
+        callable: text so far -> bool
+    """
+    return lambda text: weightedLength(text) >= limit
+
+
+class _Provider(ABC):
+    """Shared HTTP plumbing (async client, fan-out, streaming) for the providers"""
+
+    name = "AI"
+    _async_client = None
+    _async_loop = None
+
+    async def _asyncClient(self) -> httpx.AsyncClient:
+        # one pooled client per provider and event loop, an httpx client's
+        # connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=DEFAULT_ASYNC_CONNECTIONS,
+                                    max_keepalive_connections=DEFAULT_ASYNC_CONNECTIONS)
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """
+        Close the async client's pooled connections
+
+        Call it (or use the provider with async with) before the event loop
+        ends: the connections cannot be closed from another loop, so a client
+        left open when asyncio.run returns is leaked.
+        """
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _post_async(self, url: str, headers: dict, data: dict, timeout: float) -> dict:
+        # wait_for bounds the whole call, httpx's timeout only each read
+        response = await asyncio.wait_for(
+            (await self._asyncClient()).post(url, headers=headers, json=data, timeout=timeout),
+            timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def ask_many(self, questions: list, context: Optional[str] = None, concurrency: int = 8,
+                       timeout: Optional[float] = None, return_exceptions: bool = False,
+                       max_tokens: Optional[int] = None) -> list:
+        """
+        Ask several questions concurrently
+
+        Args:
+            questions (list): question strings
+            context (str, optional): system context shared by every question
+            concurrency (int): max requests in flight
+            timeout (float, optional): per-question timeout in seconds
+            return_exceptions (bool): put a failed question's exception in
+                its slot instead of raising the first failure
+            max_tokens (int, optional): longest answer, per question
+
+        Returns:
+            list: answers in the order of the questions
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def ask(question):
+            async with semaphore:
+                return await self.ask_question_async(question, context, timeout=timeout, max_tokens=max_tokens)
+
+        return await asyncio.gather(*(ask(q) for q in questions), return_exceptions=return_exceptions)
+
+    @abstractmethod
+    def _request(self, question: str, context: Optional[str] = None, max_tokens: Optional[int] = None):
+        """
+        Build the provider's request
+
+        Returns:
+            tuple: (url, headers, JSON body)
+        """
+
+    @abstractmethod
+    def _cacheKey(self, question: str, context: Optional[str], data: dict) -> str:
+        """Cache key of a question, from the request body built for it"""
 
+    @abstractmethod
+    def _parseLine(self, line: str):
+        """
+        Parse one line of the provider's streamed response
 
-class OpenAI():
+        Returns:
+            tuple: (text token or '', True once the answer is complete)
+        """
+
+    def _maxTokens(self, messages: list, max_tokens: Optional[int]) -> int:
+        # right-sized for the prompt, raises ValueError before the request
+        # for a prompt that cannot fit
+        return maxTokensFor(promptTokens(messages, self.model), self.model, max_tokens or DEFAULT_MAX_TOKENS)
+
+    def _streamRequest(self, question: str, context: Optional[str], max_tokens: Optional[int] = None):
+        url, headers, data = self._request(question, context, max_tokens)
+        return url, headers, dict(data, stream=True)
+
+    def stream_question(self, question: str, context: Optional[str] = None, stop_when=None,
+                        max_tokens: Optional[int] = None):
+        """
+        Ask a question and yield the answer's text as it is generated
+
+        Args:
+            question (str): the question
+            context (str, optional): system context
+            stop_when (callable, optional): called with the text so far after
+                every token; when it returns True the response is closed,
+                which also stops the generation server side
+            max_tokens (int, optional): longest answer
+
+        Yields:
+            str: text tokens, a cached answer comes as a single token
+        """
+        url, headers, data = self._streamRequest(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        answer = ''
+        try:
+            with self.session.post(url, headers=headers, json=data, timeout=self.timeout,
+                                   stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    token, done = self._parseLine(line.decode('utf-8', errors='replace'))
+                    if token:
+                        answer += token
+                        yield token
+                        if stop_when is not None and stop_when(answer):
+                            return  # cut short, not cached
+                    if done:
+                        break
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"{self.name} request failed: {str(e)}")
+
+        if self.cache:
+            self.cache.set(key, answer.strip())
+
+    async def stream_question_async(self, question: str, context: Optional[str] = None,
+                                    stop_when=None, timeout: Optional[float] = None,
+                                    max_tokens: Optional[int] = None):
+        """Async generator version of stream_question, timeout bounds each read"""
+        url, headers, data = self._streamRequest(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        answer = ''
+        try:
+            client = await self._asyncClient()
+            async with client.stream("POST", url, headers=headers, json=data,
+                                     timeout=timeout or self.timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    token, done = self._parseLine(line)
+                    if token:
+                        answer += token
+                        yield token
+                        if stop_when is not None and stop_when(answer):
+                            return
+                    if done:
+                        break
+        except httpx.HTTPError as e:
+            raise Exception(f"{self.name} request failed: {str(e)}")
+
+        if self.cache:
+            self.cache.set(key, answer.strip())
+
+
+class OpenAI(_Provider):
     """OpenAI API provider (GPT models)"""
-    
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo"):
-        
+
+    name = "OpenAI API"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo",
+                 cache: Optional[DiskCache] = None, base_url: Optional[str] = None,
+                 timeout: float = 30):
+
         self.api_key = api_key or os.getenv('openaiApiKey')
         self.model = model
-        self.base_url = "https://api.openai.com/v1"
-        
+        self.cache = cache
+        self.base_url = (base_url or os.getenv('openaiBaseUrl') or "https://api.openai.com/v1").rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
         if not self.api_key:
             raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
-    
-    def ask_question(self, question: str, context: Optional[str] = None) -> str:
-        """Ask a question using OpenAI's API"""
+
+    def _request(self, question: str, context: Optional[str] = None, max_tokens: Optional[int] = None):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
+
         messages = []
         if context:
             messages.append({"role": "system", "content": context})
         messages.append({"role": "user", "content": question})
-        
+
         data = {
             "model": self.model,
             "messages": messages,
             "temperature": 0.7,
-            "max_tokens": 1000        }
-        
+            "max_tokens": self._maxTokens(messages, max_tokens)
+        }
+        return f"{self.base_url}/chat/completions", headers, data
+
+    def _cacheKey(self, question: str, context: Optional[str], data: dict) -> str:
+        return cacheKey("openai", question, self.model, context, 0.7, data['max_tokens'])
+
+    def _parseLine(self, line: str):
+        # server-sent events, a chat.completion.chunk per data line
+        if not line.startswith("data:"):
+            return '', False
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return '', True
+        choices = json.loads(payload).get('choices') or [{}]
+        return choices[0].get('delta', {}).get('content') or '', False
+
+    def ask_question(self, question: str, context: Optional[str] = None,
+                     max_tokens: Optional[int] = None) -> str:
+        """Ask a question using OpenAI's API"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
+            response = self.session.post(
+                url,
                 headers=headers,
                 json=data,
-                timeout=30
+                timeout=self.timeout
             )
             response.raise_for_status()
-            
+
             result = response.json()
-            return result['choices'][0]['message']['content'].strip()
-            
+            answer = result['choices'][0]['message']['content'].strip()
+            if self.cache:
+                self.cache.set(key, answer)
+            return answer
+
         except requests.exceptions.RequestException as e:
             raise Exception(f"OpenAI API request failed: {str(e)}")
 
+    async def ask_question_async(self, question: str, context: Optional[str] = None,
+                                 timeout: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Ask a question using OpenAI's API without blocking the event loop"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
-class Anthropic():
+        try:
+            result = await self._post_async(url, headers, data, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"OpenAI API request timed out after {timeout or self.timeout}s")
+        except httpx.HTTPError as e:
+            raise Exception(f"OpenAI API request failed: {str(e)}")
+
+        answer = result['choices'][0]['message']['content'].strip()
+        if self.cache:
+            self.cache.set(key, answer)
+        return answer
+
+
+class Anthropic(_Provider):
     """Anthropic Claude API provider"""
-    
-    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-haiku-20240307"):
+
+    name = "Anthropic API"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-haiku-20240307",
+                 cache: Optional[DiskCache] = None, base_url: str = "https://api.anthropic.com/v1",
+                 timeout: float = 30):
         self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
         self.model = model
-        self.base_url = "https://api.anthropic.com/v1"
-        
+        self.cache = cache
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
         if not self.api_key:
             raise ValueError("Anthropic API key not found. Set ANTHROPIC_API_KEY environment variable.")
-    
-    def ask_question(self, question: str, context: Optional[str] = None) -> str:
-        """Ask a question using Anthropic's Claude API"""
+
+    def _request(self, question: str, context: Optional[str] = None, max_tokens: Optional[int] = None):
         headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json",
             "anthropic-version": "2023-06-01"
         }
-        
+
         prompt = question
         if context:
             prompt = f"Context: {context}\n\nQuestion: {question}"
-        
+
+        messages = [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
         data = {
             "model": self.model,
-            "max_tokens": 1000,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+            "max_tokens": self._maxTokens(messages, max_tokens),
+            "messages": messages
         }
-        
+        return f"{self.base_url}/messages", headers, data
+
+    def _cacheKey(self, question: str, context: Optional[str], data: dict) -> str:
+        return cacheKey("anthropic", question, self.model, context, None, data['max_tokens'])
+
+    def _parseLine(self, line: str):
+        # server-sent events, text arrives in content_block_delta events
+        if not line.startswith("data:"):
+            return '', False
+        event = json.loads(line[len("data:"):])
+        kind = event.get('type')
+        if kind == "content_block_delta":
+            return event.get('delta', {}).get('text') or '', False
+        if kind == "error":
+            raise Exception(f"Anthropic API request failed: {event.get('error', {}).get('message')}")
+        return '', kind == "message_stop"
+
+    def ask_question(self, question: str, context: Optional[str] = None,
+                     max_tokens: Optional[int] = None) -> str:
+        """Ask a question using Anthropic's Claude API"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.post(
-                f"{self.base_url}/messages",
+            response = self.session.post(
+                url,
                 headers=headers,
                 json=data,
-                timeout=30
+                timeout=self.timeout
             )
             response.raise_for_status()
-            
+
             result = response.json()
-            return result['content'][0]['text'].strip()
-            
+            answer = result['content'][0]['text'].strip()
+            if self.cache:
+                self.cache.set(key, answer)
+            return answer
+
         except requests.exceptions.RequestException as e:
             raise Exception(f"Anthropic API request failed: {str(e)}")
 
+    async def ask_question_async(self, question: str, context: Optional[str] = None,
+                                 timeout: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Ask a question using Anthropic's Claude API without blocking the event loop"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await self._post_async(url, headers, data, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Anthropic API request timed out after {timeout or self.timeout}s")
+        except httpx.HTTPError as e:
+            raise Exception(f"Anthropic API request failed: {str(e)}")
+
+        answer = result['content'][0]['text'].strip()
+        if self.cache:
+            self.cache.set(key, answer)
+        return answer
+
 
-class Ollama():
+class Ollama(_Provider):
     """Local Ollama provider"""
-    
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama2"):
+
+    name = "Ollama"
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama2",
+                 cache: Optional[DiskCache] = None, timeout: float = 60):
         self.base_url = base_url.rstrip('/')
         self.model = model
-        
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+
         # Test if Ollama is running
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             response.raise_for_status()
         except requests.exceptions.RequestException:
             raise Exception(f"Ollama not accessible at {self.base_url}. Make sure Ollama is running.")
-    
-    def ask_question(self, question: str, context: Optional[str] = None) -> str:
-        """Ask a question using local Ollama"""
+
+    def _request(self, question: str, context: Optional[str] = None, max_tokens: Optional[int] = None):
         prompt = question
         if context:
             prompt = f"Context: {context}\n\nQuestion: {question}"
-        
+
         data = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "options": {
+                "num_predict": self._maxTokens([{"content": prompt}], max_tokens)
+            }
         }
-        
+        return f"{self.base_url}/api/generate", {}, data
+
+    def _cacheKey(self, question: str, context: Optional[str], data: dict) -> str:
+        return cacheKey("ollama", question, self.model, context, None, data['options']['num_predict'])
+
+    def _parseLine(self, line: str):
+        # newline-delimited JSON, one generated piece per line
+        if not line.strip():
+            return '', False
+        chunk = json.loads(line)
+        if 'error' in chunk:
+            raise Exception(f"Ollama request failed: {chunk['error']}")
+        return chunk.get('response') or '', bool(chunk.get('done'))
+
+    def ask_question(self, question: str, context: Optional[str] = None,
+                     max_tokens: Optional[int] = None) -> str:
+        """Ask a question using local Ollama"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
+            response = self.session.post(
+                url,
                 json=data,
-                timeout=60
+                timeout=self.timeout
             )
             response.raise_for_status()
-            
+
             result = response.json()
-            return result['response'].strip()
-            
+            answer = result['response'].strip()
+            if self.cache:
+                self.cache.set(key, answer)
+            return answer
+
         except requests.exceptions.RequestException as e:
             raise Exception(f"Ollama request failed: {str(e)}")
 
+    async def ask_question_async(self, question: str, context: Optional[str] = None,
+                                 timeout: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Ask a question using local Ollama without blocking the event loop"""
+        url, headers, data = self._request(question, context, max_tokens)
+        key = self._cacheKey(question, context, data)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            result = await self._post_async(url, headers, data, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Ollama request timed out after {timeout or self.timeout}s")
+        except httpx.HTTPError as e:
+            raise Exception(f"Ollama request failed: {str(e)}")
+
+        answer = result['response'].strip()
+        if self.cache:
+            self.cache.set(key, answer)
+        return answer
+
 
@@ -0,0 +1,220 @@
+"""
+Batch-API revision of a whole newsletter.
+
+Gathers the reviseArticleForTweet prompt of every chunk of every article into
+a single JSONL batch job, submits it through the OpenAI batch endpoint, polls
+until it finishes and fans the answers back out to their article/chunk slots.
+Chunks already in the revision cache are not sent at all.
+
+With a job queue the batch id is recorded as soon as the batch is submitted
+and every answer is checkpointed as a chunk revision, so a run that dies
+during the (up to 24 hour) wait polls the same batch again on restart
+instead of paying for a new one.  Chunks a failed, expired or cancelled batch
+did not answer are revised one by one through a RevisionStage; an article
+still missing a chunk is held back, not posted as a bare link.
+"""
+
+import json
+import time
+
+from openai import OpenAI
+
+from diskCache import DiskCache, getRevisionCache
+from tweetFormatter import (getClient, revisionCacheKey, revisionChunks, revisionMaxTokens,
+                            revisionMessages, REVISION_MODEL, REVISION_TEMPERATURE)
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINISHED_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def buildBatchRequests(items: dict, chunkLimit: int = 220) -> tuple:
+    """
+    Collect one chat completion request per article chunk
+
+    Args:
+        items (dict): section name -> list of article dictionaries, or an
+            iterable of article dictionaries
+        chunkLimit (int): chunk size passed to revisionChunks
+
+    Returns:
+        tuple: (articles, slots) where articles is a flat list of article
+               dictionaries and slots maps custom_id -> (article index,
+               chunk index, chunk text)
+    """
+    if isinstance(items, dict):
+        articles = [item for v in items.values() for item in v]
+    else:
+        articles = list(items)
+    slots = {}
+    for articleIndex, item in enumerate(articles):
+        # articles with a job id keep the same custom_id across runs, so a
+        # resumed batch's answers still find their slots
+        key = f"j{item['job']}" if item.get('job') is not None else f"a{articleIndex}"
+        for chunkIndex, chunk in enumerate(revisionChunks(item['description'], chunkLimit)):
+            slots[f"{key}-c{chunkIndex}"] = (articleIndex, chunkIndex, chunk)
+    return articles, slots
+
+
+def batchLine(customId: str, chunk: str) -> dict:
+    return {
+        "custom_id": customId,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": REVISION_MODEL,
+            "messages": revisionMessages(chunk),
+            "temperature": REVISION_TEMPERATURE,
+            "max_tokens": revisionMaxTokens(chunk)
+        }
+    }
+
+
+def submitBatch(client: OpenAI, lines: list) -> str:
+    """Upload the JSONL input file and create the batch job, returns the batch id"""
+    payload = "\n".join(json.dumps(line) for line in lines).encode('utf-8')
+    inputFile = client.files.create(file=("revisions.jsonl", payload), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=inputFile.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h"
+    )
+    print(f"Submitted batch {batch.id} with {len(lines)} requests")
+    return batch.id
+
+
+def waitForBatch(client: OpenAI, batchId: str, pollInterval: float = 30, timeout: float = None):
+    """Poll the batch until it reaches a final status, returns the batch object"""
+    start = time.monotonic()
+    while True:
+        batch = client.batches.retrieve(batchId)
+        if batch.status in FINISHED_STATUSES:
+            print(f"Batch {batchId} {batch.status}")
+            return batch
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f"Batch {batchId} still {batch.status} after {timeout} seconds")
+        time.sleep(pollInterval)
+
+
+def readBatchResults(client: OpenAI, batch) -> dict:
+    """
+    Returns custom_id -> revised text for every request that succeeded and
+    was not cut off by max_tokens
+    """
+    results = {}
+    if not batch.output_file_id:
+        return results
+
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get('response') or {}
+        if record.get('error') or response.get('status_code') != 200:
+            continue
+        choice = response['body']['choices'][0]
+        if choice.get('finish_reason') == 'length':
+            # cut off at the estimated budget, revised again outside the batch
+            continue
+        results[record['custom_id']] = choice['message']['content'].strip()
+    return results
+
+
+def reviseSectionsBatch(items: dict, client: OpenAI = None, cache: DiskCache = None,
+                        chunkLimit: int = 220, pollInterval: float = 30, timeout: float = None,
+                        jobs=None, stage=None) -> list:
+    """
+    Revise every article of parseSections output with one batch job
+
+    Args:
+        items (dict): parseSections output or an iterable of articles
+        jobs (JobQueue, optional): checkpoints the batch id and every revised
+            chunk of articles labeled with a 'job' id, and resumes their
+            unfinished batches
+        stage (RevisionStage, optional): revises the chunks the batch did not
+            answer
+
+    Returns:
+        list: (item, revisedTweets) tuples in section/article order, same shape
+              as RevisionStage.revise_sections; articles with a chunk that
+              could not be revised are left out (and stay pending)
+    """
+    if client is None:
+        client = getClient()
+    if cache is None:
+        cache = getRevisionCache()
+
+    articles, slots = buildBatchRequests(items, chunkLimit)
+
+    def job(customId):
+        return articles[slots[customId][0]].get('job') if jobs is not None else None
+
+    revised = {}
+
+    def store(customId, tweet):
+        articleIndex, chunkIndex, chunk = slots[customId]
+        cache.set(revisionCacheKey(chunk), tweet)
+        if job(customId) is not None:
+            jobs.save_revision(job(customId), chunkIndex, chunk, tweet)
+        revised[customId] = tweet
+
+    def collect(batchId):
+        batch = waitForBatch(client, batchId, pollInterval, timeout)
+        for customId, tweet in readBatchResults(client, batch).items():
+            if customId in slots and customId not in revised:
+                store(customId, tweet)
+        if jobs is not None:
+            jobs.finish_batch(batchId, batch.status)
+
+    saved = {}
+    for customId, (articleIndex, chunkIndex, chunk) in slots.items():
+        if job(customId) is not None:
+            if job(customId) not in saved:
+                saved[job(customId)] = jobs.revisions(job(customId))
+            source, text = saved[job(customId)].get(chunkIndex, (None, None))
+            if source == chunk:
+                revised[customId] = text
+                continue
+        cached = cache.get(revisionCacheKey(chunk))
+        if cached is not None:
+            store(customId, cached)
+
+    jobIds = [item['job'] for item in articles if jobs is not None and item.get('job') is not None]
+    if jobs is not None:
+        # a batch submitted before a crash is still running or done
+        for batchId in jobs.open_batches(jobIds):
+            if len(revised) == len(slots):
+                break
+            print(f"Resuming batch {batchId}")
+            collect(batchId)
+
+    lines = [batchLine(customId, chunk) for customId, (_, _, chunk) in slots.items() if customId not in revised]
+    if lines:
+        batchId = submitBatch(client, lines)
+        if jobs is not None:
+            jobs.save_batch(batchId, jobIds)
+        collect(batchId)
+
+    missing = [customId for customId in slots if customId not in revised]
+    if missing and stage is not None:
+        print(f"Revising {len(missing)} chunks the batch did not answer one by one")
+        futures = {customId: stage.submit_chunk(slots[customId][2]) for customId in missing}
+        for customId, future in futures.items():
+            tweet = future.result()
+            if tweet is not None:
+                store(customId, tweet)
+
+    threads = [[item['url']] for item in articles]
+    complete = [True] * len(articles)
+    # slots were created in article/chunk order, so appending keeps chunk order
+    for customId, (articleIndex, chunkIndex, chunk) in slots.items():
+        if customId in revised:
+            threads[articleIndex].append(revised[customId])
+        else:
+            complete[articleIndex] = False
+
+    for item, ok in zip(articles, complete):
+        if not ok:
+            print(f"❌ Holding back {item.get('title')}: not every chunk was revised")
+
+    return [(item, thread) for item, thread, ok in zip(articles, threads, complete) if ok]
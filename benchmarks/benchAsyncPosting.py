@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline run of AsyncTwitterPoster against a mock Twitter API.
+
+The mock answers POST /2/tweets after 60 ms and enforces a rate-limit window.
+The same threads are posted one at a time and several at once, with a
+generous budget and with one tight enough that the scheduler has to wait.
+Wall time, tweets per second, 429 responses and whether every thread came
+out complete and in order are reported for each run.
+
+Usage: python -m benchmarks.benchAsyncPosting [threads] [tweets per thread]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from yarl import URL
+
+from benchmarks.stubServer import MockTwitterApi, StubServer
+from rateLimiter import RateLimitScheduler
+from twitterPost import AsyncTwitterPoster
+
+
+class StubSession:
+    """aiohttp session that sends tweepy's api.twitter.com requests to the stub"""
+
+    def __init__(self, baseUrl: str):
+        self.base = baseUrl
+        self.session = aiohttp.ClientSession()
+
+    def request(self, method, url, **kwargs):
+        # tweepy passes signed, already encoded urls
+        url = URL(str(url), encoded=True) if not isinstance(url, URL) else url
+        return self.session.request(method, URL(self.base + url.raw_path_qs, encoded=True), **kwargs)
+
+    async def close(self):
+        await self.session.close()
+
+
+async def post(baseUrl: str, threads: list, concurrency: int) -> float:
+    session = StubSession(baseUrl)
+    poster = AsyncTwitterPoster(RateLimitScheduler(), session=session, concurrency=concurrency)
+    start = time.perf_counter()
+    try:
+        await poster.post_threads(threads)
+    finally:
+        await session.close()
+    return time.perf_counter() - start
+
+
+def run(label: str, threads: list, concurrency: int, limit: int, period: int) -> None:
+    api = MockTwitterApi(limit=limit, period=period, latency=0.06)
+    with StubServer(api.routes()) as server:
+        elapsed = asyncio.run(post(server.base_url, threads, concurrency))
+
+    posted = sorted(api.threads())
+    tweets = sum(len(thread) for thread in threads)
+    intact = posted == sorted(threads)
+    print(f"{label:<34} {elapsed:6.2f} s  {tweets / elapsed:6.1f} tweets/s  "
+          f"429s {api.rejected:3d}  out of order {api.outOfOrder}  threads intact {intact}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for name in ('apiKey', 'apiKeySecret', 'accessToken', 'accessTokenSecret'):
+        os.environ.setdefault(name, 'stub')
+
+    threads = [[f"Article {t} tweet {i + 1}/{length}" for i in range(length)] for t in range(count)]
+    print(f"{count} threads of {length} tweets, 60 ms per request")
+    run("one thread at a time", threads, 1, 10000, 900)
+    run("4 threads at once", threads, 4, 10000, 900)
+    run("16 threads at once", threads, 16, 10000, 900)
+    run("16 at once, 40 tweets/2 s budget", threads, 16, 40, 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Sync vs async aiClient throughput against a local stub server.
+
+legacy posts each question with a bare requests.post (a new connection every
+time, which is what the providers used to do), session reuses the provider's
+pooled requests.Session one question after another, and async fans the
+questions out with ask_many over one pooled httpx.AsyncClient.  The stub
+sleeps for a fixed latency per request to stand in for model time.
+
+Usage: python -m benchmarks.benchAsyncProviders [questions] [latencyMs] [concurrency]
+"""
+
+import asyncio
+import sys
+import time
+
+import requests
+
+from aiClient import Anthropic, Ollama, OpenAI
+from benchmarks.stubServer import StubServer, anthropicMessagesRoute, chatCompletionRoute, ollamaRoutes
+
+
+def timeLegacy(provider, questions: list) -> float:
+    start = time.perf_counter()
+    for question in questions:
+        url, headers, data = provider._request(question)
+        requests.post(url, headers=headers, json=data, timeout=30).raise_for_status()
+    return time.perf_counter() - start
+
+
+def timeSession(provider, questions: list) -> float:
+    start = time.perf_counter()
+    for question in questions:
+        provider.ask_question(question)
+    return time.perf_counter() - start
+
+
+def timeAsync(provider, questions: list, concurrency: int) -> float:
+    async def run():
+        try:
+            start = time.perf_counter()
+            answers = await provider.ask_many(questions, concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+        finally:
+            await provider.aclose()
+        assert len(answers) == len(questions)
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    routes = [chatCompletionRoute(), anthropicMessagesRoute()] + ollamaRoutes()
+    questions = [f"Summarise story {i} for a tweet" for i in range(count)]
+
+    with StubServer(routes, latency=latency) as server:
+        providers = [
+            ("openai", OpenAI(api_key="stub-key", base_url=f"{server.base_url}/v1")),
+            ("anthropic", Anthropic(api_key="stub-key", base_url=f"{server.base_url}/v1")),
+            ("ollama", Ollama(base_url=server.base_url)),
+        ]
+        print(f"{count} questions, {latency * 1000:.0f} ms stub latency, async concurrency {concurrency}")
+        for name, provider in providers:
+            results = []
+            for label, timer in (("legacy", lambda: timeLegacy(provider, questions)),
+                                 ("session", lambda: timeSession(provider, questions)),
+                                 ("async", lambda: timeAsync(provider, questions, concurrency))):
+                before = server.connections
+                elapsed = timer()
+                results.append(elapsed)
+                print(f"{name:<10} {label:<8} {count / elapsed:8.1f} q/s   "
+                      f"connections {server.connections - before}")
+            print(f"{name:<10} async vs legacy {results[0] / results[2]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Offline run of the batch revision path against a local mock batch server.
+
+Revises a synthetic newsletter once through RevisionStage (one request per
+chunk) and once through reviseSectionsBatch (one batch job), checks that the
+batch answers land in the right article/chunk slots and reports the number of
+HTTP requests and wall time of each.  Then checks, with a job queue, that a
+run which dies while waiting resumes the same batch instead of submitting a
+new one, and that the chunks of a failed batch are revised one by one.
+
+Usage: python -m benchmarks.benchBatchRevision [articles] [chunksPerArticle]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.stubServer import MockBatchApi, StubServer, chatCompletionRoute
+
+
+def echo(messages) -> str:
+    # the answer carries the chunk it came from so slot mapping can be checked
+    return "revised " + messages[-1]['content'][:6]
+
+
+def syntheticSections(articles: int, chunksPerArticle: int) -> dict:
+    sections = {"Attacks & Vulnerabilities": [], "Quick Links": []}
+    for i in range(articles):
+        chunks = [f"A{i:03d}C{c}".ljust(200, 'x') for c in range(chunksPerArticle)]
+        section = "Attacks & Vulnerabilities" if i % 2 else "Quick Links"
+        sections[section].append({
+            'title': f"Article {i}",
+            'url': f"https://example.com/{i}",
+            'description': ' '.join(chunks)
+        })
+    return sections
+
+
+def main():
+    articles = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    chunksPerArticle = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sections = syntheticSections(articles, chunksPerArticle)
+
+    batchApi = MockBatchApi(reply=echo)
+    with StubServer([chatCompletionRoute(echo)] + batchApi.routes(), latency=0.02) as server:
+        os.environ["openaiBaseUrl"] = f"{server.base_url}/v1"
+        os.environ.setdefault("openaiApiKey", "stub-key")
+
+        from batchRevision import reviseSectionsBatch
+        from diskCache import DiskCache
+        from revisionStage import RevisionStage
+        from tweetFormatter import reviseArticleForTweet
+
+        cache = DiskCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), enabled=False)
+
+        before, start = server.requests, time.perf_counter()
+        stage = RevisionStage(revise=lambda chunk: reviseArticleForTweet(chunk, cache=cache))
+        with stage:
+            perChunk = list(stage.revise_sections(sections))
+        print(f"per-chunk: {server.requests - before:4d} requests  {time.perf_counter() - start:6.2f} s")
+
+        before, start = server.requests, time.perf_counter()
+        batched = reviseSectionsBatch(sections, cache=cache, pollInterval=0.05)
+        print(f"batch:     {server.requests - before:4d} requests  {time.perf_counter() - start:6.2f} s")
+
+    assert [item['url'] for item, _ in batched] == [item['url'] for item, _ in perChunk]
+    for item, tweets in batched:
+        index = int(item['url'].rsplit('/', 1)[1])
+        assert tweets[0] == item['url']
+        assert tweets[1:] == [f"revised A{index:03d}C{c}" for c in range(chunksPerArticle)], tweets
+    assert batched == perChunk
+    print("batch results match per-chunk results slot for slot")
+
+    checkResume(sections)
+    checkFailedBatch(sections)
+
+
+def queuedArticles(sections: dict):
+    from jobQueue import JobQueue
+
+    jobs = JobQueue(os.path.join(tempfile.mkdtemp(), "jobs.sqlite"))
+    jobs.add_message("bench.eml", "Bench", "<html>bench</html>", sections)
+    return jobs, jobs.pending_articles()
+
+
+def expected(item) -> list:
+    index = int(item['url'].rsplit('/', 1)[1])
+    chunks = len(item['description'].split())
+    return [item['url']] + [f"revised A{index:03d}C{c}" for c in range(chunks)]
+
+
+def checkResume(sections: dict):
+    from batchRevision import reviseSectionsBatch
+    from diskCache import DiskCache
+    from tweetFormatter import createClient
+
+    jobs, articles = queuedArticles(sections)
+    cache = DiskCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), enabled=False)
+    batchApi = MockBatchApi(reply=echo, pollsUntilDone=1000)
+    with StubServer(batchApi.routes()) as server:
+        # a client of its own, the shared one points at the first stub
+        os.environ["openaiBaseUrl"] = f"{server.base_url}/v1"
+        client = createClient()
+        try:
+            reviseSectionsBatch(articles, client, cache, pollInterval=0.01, timeout=0.1, jobs=jobs)
+            raise AssertionError("the batch should still be running")
+        except TimeoutError:
+            pass
+
+        # restart: the batch has finished in the meantime
+        batchApi.pollsUntilDone = 0
+        resumed = reviseSectionsBatch(jobs.pending_articles(), client, cache, pollInterval=0.01, jobs=jobs)
+
+    assert len(batchApi.batches) == 1, "a second batch was submitted"
+    assert len(resumed) == len(articles)
+    for item, tweets in resumed:
+        assert tweets == expected(item), tweets
+        assert len(jobs.revisions(item['job'])) == len(tweets) - 1
+    assert jobs.stats()['open_batches'] == 0
+    print("a restarted run resumed the submitted batch and checkpointed every chunk")
+
+
+def checkFailedBatch(sections: dict):
+    from batchRevision import reviseSectionsBatch
+    from diskCache import DiskCache
+    from revisionStage import RevisionStage
+    from tweetFormatter import createClient, reviseArticleForTweet
+
+    jobs, articles = queuedArticles(sections)
+    cache = DiskCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), enabled=False)
+    batchApi = MockBatchApi(reply=echo, finalStatus="expired")
+    with StubServer([chatCompletionRoute(echo)] + batchApi.routes()) as server:
+        os.environ["openaiBaseUrl"] = f"{server.base_url}/v1"
+        client = createClient()
+        assert reviseSectionsBatch(articles, client, cache, pollInterval=0.01) == [], \
+            "an expired batch must not yield url-only threads"
+
+        stage = RevisionStage(revise=lambda chunk: reviseArticleForTweet(chunk, client, cache), jobs=jobs)
+        with stage:
+            recovered = reviseSectionsBatch(articles, client, cache, pollInterval=0.01, jobs=jobs, stage=stage)
+
+    assert [tweets for _, tweets in recovered] == [expected(item) for item in articles]
+    print("the chunks of an expired batch were revised one by one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Cold vs warm OpenAI client latency for reviseArticleForTweet.
+
+Cold builds a new client (and connection pool) for every call, which is what
+reviseArticleForTweet used to do; warm reuses the process-wide client.  Runs
+against a local stub server, so the difference is connection setup only (no
+TLS here, the gap against api.openai.com is larger).
+
+Usage: python -m benchmarks.benchClientReuse [calls]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.stubServer import StubServer, chatCompletionRoute
+
+
+def timeCalls(calls: int, clientFactory) -> list:
+    from diskCache import DiskCache
+    from tweetFormatter import reviseArticleForTweet
+
+    # every call has to reach the server, so keep the revision cache out of it
+    cache = DiskCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), enabled=False)
+
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        reviseArticleForTweet("Researchers found critical vulnerabilities in camera systems.",
+                              client=clientFactory(), cache=cache)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list, connections: int):
+    ms = [t * 1000 for t in timings]
+    print(f"{name:<6} mean {statistics.mean(ms):7.2f} ms   median {statistics.median(ms):7.2f} ms   "
+          f"p95 {sorted(ms)[int(len(ms) * 0.95) - 1]:7.2f} ms   connections {connections}")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with StubServer([chatCompletionRoute()]) as server:
+        os.environ["openaiBaseUrl"] = f"{server.base_url}/v1"
+        os.environ.setdefault("openaiApiKey", "stub-key")
+
+        import tweetFormatter
+
+        before = server.connections
+        cold = timeCalls(calls, tweetFormatter.createClient)
+        report("cold", cold, server.connections - before)
+
+        before = server.connections
+        warm = timeCalls(calls, tweetFormatter.getClient)
+        report("warm", warm, server.connections - before)
+
+        print(f"speedup {statistics.mean(cold) / statistics.mean(warm):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Cross-issue dedup index: lookup cost as history grows, and match quality.
+
+Fills a DedupIndex with synthetic articles (years of issues at 50 articles a
+day) and, at several sizes, times lookups of new articles and of reworded
+copies of old ones (a few words swapped, new tracking url).  Reports how many
+reworded copies are caught and how many unrelated articles are wrongly
+flagged.
+
+Usage: python -m benchmarks.benchDedupIndex [articles]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.newsletterCorpus import WORDS
+from dedupIndex import DedupIndex
+
+
+# news vocabulary: the corpus words plus a long tail of names and terms
+_vocabulary = random.Random(1)
+VOCABULARY = WORDS + [''.join(_vocabulary.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(_vocabulary.randint(3, 10)))
+                      for _ in range(20000)]
+
+
+def word(rng) -> str:
+    # common words most of the time, the long tail otherwise
+    return rng.choice(WORDS) if rng.random() < 0.5 else rng.choice(VOCABULARY)
+
+
+def description(rng) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 4)):
+        words = [word(rng) for _ in range(rng.randint(8, 18))]
+        sentences.append(' '.join(words).capitalize() + '.')
+    return ' '.join(sentences)
+
+
+def article(rng, index: int) -> dict:
+    return {
+        'title': f"Story {index}",
+        'url': f"https://www.example-news.com/security/story-{index}/?utm_source=tldrinfosec",
+        'description': description(rng)
+    }
+
+
+def reworded(rng, original: dict, index: int) -> dict:
+    words = original['description'].split()
+    for _ in range(rng.randint(1, 3)):
+        words[rng.randrange(len(words))] = word(rng)
+    return {
+        'title': original['title'],
+        'url': f"https://other-site.example.org/{index}",
+        'description': ' '.join(words)
+    }
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(0)
+    index = DedupIndex(os.path.join(tempfile.mkdtemp(), "dedup.sqlite"))
+    history = []
+
+    checkpoints = [size for size in (1000, 10000, 50000, 200000) if size <= total] or [total]
+    start = time.perf_counter()
+    for size in checkpoints:
+        while len(history) < size:
+            item = article(rng, len(history))
+            index.add(item)
+            history.append(item)
+        inserted = time.perf_counter() - start
+
+        probes = 500
+        fresh = [article(rng, 10**7 + i) for i in range(probes)]
+        copies = [reworded(rng, rng.choice(history), 10**7 + i) for i in range(probes)]
+        sameUrl = [dict(rng.choice(history), description="Short blurb.") for _ in range(probes)]
+
+        t = time.perf_counter()
+        falsePositives = sum(index.find(item) is not None for item in fresh)
+        caught = sum(index.find(item) is not None for item in copies)
+        urls = sum(index.find(item) is not None for item in sameUrl)
+        lookup = (time.perf_counter() - t) / (3 * probes)
+
+        print(f"{size:7d} articles (inserted in {inserted:5.1f} s): {lookup * 1e6:6.0f} µs/lookup,"
+              f" reworded copies caught {caught / probes:5.1%}, same url {urls / probes:5.1%},"
+              f" unrelated flagged {falsePositives / probes:4.1%}")
+        start = time.perf_counter() - inserted
+
+
+if __name__ == "__main__":
+    main()
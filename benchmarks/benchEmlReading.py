@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Peak memory and time of reading a multi-MB .eml and extracting its info.
+
+The legacy reader opened the file as UTF-8 text, re-read and re-parsed it as
+latin-1 when that failed, and decoded every attachment twice to size it.  The
+current reader parses the bytes once and sizes attachments from their encoded
+payload.  The html-only path (EmailView.html_body, what getEmailHtmlBody and
+the ingest workers use) drops other part bodies while reading and stops at the
+end of the html part.
+Messages carry a latin-1 html body (so the legacy UTF-8 read fails) and a few
+base64 attachments.
+
+Usage: python -m benchmarks.benchEmlReading [attachmentMB] [attachments]
+"""
+
+import email
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from email import policy
+from email.charset import Charset
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from benchmarks.newsletterCorpus import newsletterHtml
+from emailParse import EmailView, extract_email_info, read_eml_file
+
+
+def legacyReadEmlFile(file_path: str):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return email.message_from_file(file, policy=policy.default)
+    except UnicodeDecodeError:
+        with open(file_path, 'r', encoding='latin-1') as file:
+            return email.message_from_file(file, policy=policy.default)
+
+
+def legacyExtractEmailInfo(msg) -> dict:
+    info = {'html_body': '', 'attachments': []}
+    for part in msg.walk():
+        content_type = part.get_content_type()
+        content_disposition = str(part.get("Content-Disposition"))
+        if content_type == "text/html" and "attachment" not in content_disposition:
+            html_body = part.get_payload(decode=True)
+            if html_body:
+                info['html_body'] = html_body.decode('utf-8', errors='ignore')
+        elif "attachment" in content_disposition:
+            info['attachments'].append({
+                'filename': part.get_filename(),
+                'content_type': content_type,
+                'size': len(part.get_payload(decode=True)) if part.get_payload(decode=True) else 0
+            })
+    return info
+
+
+def writeMessage(path: str, attachmentBytes: int, attachments: int) -> list:
+    msg = MIMEMultipart()
+    msg['Subject'] = 'TLDR InfoSec'
+    msg['From'] = 'dan@tldrnewsletter.com'
+    html = newsletterHtml(20).encode('latin-1', 'xmlcharrefreplace').decode('latin-1')
+    html += '<p>Caf\xe9 cr\xe8me \xa9</p>'
+    # raw 8bit latin-1, as some mailers send it
+    latin1 = Charset('latin-1')
+    latin1.body_encoding = None
+    msg.attach(MIMEText(html, 'html', latin1))
+
+    sizes = []
+    for i in range(attachments):
+        # vary the padding so both '=' and '==' endings are sized
+        payload = os.urandom(attachmentBytes + i)
+        part = MIMEApplication(payload, Name=f'report-{i}.pdf')
+        part['Content-Disposition'] = f'attachment; filename="report-{i}.pdf"'
+        msg.attach(part)
+        sizes.append(len(payload))
+
+    with open(path, 'wb') as f:
+        f.write(msg.as_bytes())
+    return sizes
+
+
+def measure(read, extract, path: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    info = extract(read(path))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return info, elapsed, peak
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    attachments = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    path = os.path.join(tempfile.mkdtemp(), 'large.eml')
+    sizes = writeMessage(path, int(megabytes * 1024 * 1024), attachments)
+    print(f"message {os.path.getsize(path) / 1024 / 1024:.1f} MB, {attachments} attachments")
+
+    legacy, legacyTime, legacyPeak = measure(legacyReadEmlFile, legacyExtractEmailInfo, path)
+    current, currentTime, currentPeak = measure(read_eml_file, extract_email_info, path)
+    html, htmlTime, htmlPeak = measure(EmailView, lambda view: view.html_body, path)
+
+    assert [a['size'] for a in current['attachments']] == sizes
+    assert [a['size'] for a in legacy['attachments']] == sizes
+    # the legacy reader dropped non-UTF-8 characters from the body
+    assert 'Caf\xe9 cr\xe8me \xa9' in current['html_body']
+    assert html == current['html_body']
+
+    print(f"legacy   peak {legacyPeak / 1024 / 1024:7.1f} MB   {legacyTime * 1000:7.1f} ms")
+    print(f"current  peak {currentPeak / 1024 / 1024:7.1f} MB   {currentTime * 1000:7.1f} ms")
+    print(f"html     peak {htmlPeak / 1024 / 1024:7.1f} MB   {htmlTime * 1000:7.1f} ms")
+    print(f"full info: peak memory {legacyPeak / currentPeak:.2f}x lower, {legacyTime / currentTime:.2f}x faster")
+    print(f"html only: peak memory {legacyPeak / htmlPeak:.2f}x lower, {legacyTime / htmlTime:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
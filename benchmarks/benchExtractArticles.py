@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Per-table cost of extract_articles_from_table, before and after the
+single-pass rewrite.
+
+legacyExtract is the previous implementation: every link walks its text-block
+again and every fragment is cleaned with patterns compiled per call.
+
+Usage: python -m benchmarks.benchExtractArticles [issues] [linksPerBlock]
+"""
+
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.newsletterCorpus import corpus
+from parseEmailSections import extract_articles_from_table, fixUpHref
+
+
+def legacyExtract(table):
+    articles = []
+    for link in table.find_all('a', href=True):
+        href = link.get('href', '')
+        if any(skip_term in href.lower() for skip_term in ['refer.', 'advertise', 'unsubscribe', 'manage']):
+            continue
+        strong_tag = link.find('strong')
+        if strong_tag:
+            title = strong_tag.get_text(strip=True)
+            description = ""
+            parent_div = link.find_parent('div', class_='text-block')
+            if parent_div:
+                text_parts = []
+                for element in parent_div.find_all(string=True):
+                    text = element.strip()
+                    if text and text != title and not text.startswith('http'):
+                        cleaned_text = re.sub(r'\s+', ' ', text).strip()
+                        if cleaned_text and len(cleaned_text) > 10:
+                            text_parts.append(cleaned_text)
+                if text_parts:
+                    description = ' '.join(text_parts)
+                    description = re.sub(r'&[a-zA-Z0-9#]+;', ' ', description)
+                    description = re.sub(r'\s+', ' ', description).strip()
+            if title:
+                articles.append({'title': title, 'url': fixUpHref(href), 'description': description})
+    return articles
+
+
+def timeExtract(extract, tables: list, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for table in tables:
+            extract(table)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    issues = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for linksPerBlock in ([int(sys.argv[2])] if len(sys.argv) > 2 else [1, 4]):
+        tables = []
+        for html in corpus(issues, linksPerBlock=linksPerBlock):
+            tables.extend(BeautifulSoup(html, 'html.parser').find_all('table', class_='content-table'))
+
+        for table in tables:
+            assert extract_articles_from_table(table) == legacyExtract(table)
+
+        before = timeExtract(legacyExtract, tables)
+        after = timeExtract(extract_articles_from_table, tables)
+        print(f"{linksPerBlock} link(s) per text-block, {len(tables)} tables, outputs identical")
+        print(f"  before {before * 1e6 / len(tables):9.1f} us/table")
+        print(f"  after  {after * 1e6 / len(tables):9.1f} us/table   ({before / after:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tail latency of one degraded provider vs the hedging ProviderRouter.
+
+Two stub vendors: "openai" usually answers in 60 ms but 4% of its answers
+take 1.5 s, "anthropic" always takes 150 ms.  single asks openai only, router
+asks openai first and hedges to anthropic after openai's p95.  The last run
+makes openai fail outright, the router should fail over and put it in
+cooldown.
+
+Usage: python -m benchmarks.benchProviderRouter [questions] [concurrency]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from aiClient import Anthropic, OpenAI
+from benchmarks.stubServer import StubServer, anthropicMessagesRoute, chatCompletionRoute
+from healthTracker import HealthTracker
+from providerRouter import ProviderRouter
+
+
+def degraded(rng):
+    def reply(messages):
+        time.sleep(1.5 if rng.random() < 0.04 else 0.06)
+        return "Degraded vendor tweet #Stub"
+    return reply
+
+
+def steady(messages):
+    time.sleep(0.15)
+    return "Steady vendor tweet #Stub"
+
+
+def failing(request, match):
+    return 500, {"error": {"message": "overloaded"}}
+
+
+async def timeQuestions(ask, count: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await ask(f"Summarise story {i}")
+            except Exception:
+                return None
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(i) for i in range(count)))
+
+
+def report(name: str, timings: list, extra: str = ""):
+    ok = sorted(t * 1000 for t in timings if t is not None)
+    pick = lambda q: ok[min(len(ok) - 1, int(q * len(ok)))]
+    print(f"{name:<8} p50 {pick(0.5):7.1f} ms   p95 {pick(0.95):7.1f} ms   p99 {pick(0.99):7.1f} ms   "
+          f"max {ok[-1]:7.1f} ms   failed {len(timings) - len(ok):3d}  {extra}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with StubServer([chatCompletionRoute(degraded(random.Random(1)))]) as slow, \
+            StubServer([anthropicMessagesRoute(steady)]) as good, \
+            StubServer([("POST", r"/v1/chat/completions", failing)]) as broken:
+
+        async def run():
+            openai = OpenAI(api_key="stub-key", base_url=f"{slow.base_url}/v1")
+            anthropic = Anthropic(api_key="stub-key", base_url=f"{good.base_url}/v1")
+            down = OpenAI(api_key="stub-key", base_url=f"{broken.base_url}/v1")
+            try:
+                report("single", await timeQuestions(openai.ask_question_async, count, concurrency))
+
+                router = ProviderRouter({'openai': openai, 'anthropic': anthropic})
+                timings = await timeQuestions(router.ask_question_async, count, concurrency)
+                report("router", timings, f"hedges {router.hedges}")
+
+                router = ProviderRouter({'openai': down, 'anthropic': anthropic},
+                                        tracker=HealthTracker(cooldown=300))
+                timings = await timeQuestions(router.ask_question_async, count, concurrency)
+                report("failing", timings, f"failovers {router.failovers}, openai calls {broken.requests}")
+            finally:
+                for provider in (openai, anthropic, down):
+                    await provider.aclose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
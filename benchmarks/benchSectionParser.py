@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+BeautifulSoup vs single-pass streaming section extraction.
+
+Checks both backends return identical sections for every issue of a
+synthetic real-world-sized corpus, then times them.
+
+Usage: python -m benchmarks.benchSectionParser [issues] [repeat]
+"""
+
+import sys
+import time
+
+from benchmarks.newsletterCorpus import corpus
+from parseEmailSections import parse_email_sections
+from streamSectionParser import parse_email_sections_stream
+
+
+def timeBackend(parse, issues: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in issues:
+            parse(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    issues = corpus(count)
+
+    size = sum(len(html) for html in issues)
+    articles = 0
+    for html in issues:
+        expected = parse_email_sections(html)
+        assert parse_email_sections_stream(html) == expected
+        articles += sum(len(v) for v in expected.values())
+    print(f"{count} issues, {size / 1024:.0f} KB, {articles} articles, outputs identical")
+
+    soup = timeBackend(parse_email_sections, issues, repeat)
+    stream = timeBackend(parse_email_sections_stream, issues, repeat)
+    print(f"bs4 html.parser  {soup * 1000 / count:8.2f} ms/issue")
+    print(f"stream           {stream * 1000 / count:8.2f} ms/issue")
+    print(f"speedup {soup / stream:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Offline run of bulk url shortening against a local stub of TinyURL.
+
+Shortens the article urls of a synthetic digest (a quarter of them repeated)
+three ways: one call at a time with a new URLShortener per url, as
+quick_shorten used to; shorten_many on an empty cache; and shorten_many
+again on the warm cache.  Reports requests, connections and wall time.
+
+Usage: python -m benchmarks.benchShortener [urls] [latency]
+"""
+
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.stubServer import StubServer
+from diskCache import DiskCache
+from urlShortener import URLShortener
+
+
+def tinyurlRoute():
+    def handler(request, match):
+        url = request.query['url'][0]
+        return 200, "https://tinyurl.com/" + hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]
+
+    return ("GET", r"/api-create.php", handler)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    rng = random.Random(0)
+    unique = [f"https://example.com/articles/{i}?utm_source=tldrinfosec" for i in range(count * 3 // 4)]
+    urls = unique + [rng.choice(unique) for _ in range(count - len(unique))]
+    rng.shuffle(urls)
+
+    with StubServer([tinyurlRoute()], latency=latency) as server:
+        endpoints = {'tinyurl': f"{server.base_url}/api-create.php"}
+        noCache = DiskCache(os.path.join(tempfile.mkdtemp(), "off.sqlite"), enabled=False)
+
+        def run(label, shorten):
+            requests, connections = server.requests, server.connections
+            start = time.perf_counter()
+            result = shorten()
+            print(f"{label:22s} {server.requests - requests:4d} requests"
+                  f"  {server.connections - connections:4d} connections  {time.perf_counter() - start:6.2f} s")
+            return result
+
+        one = run("one at a time", lambda: [
+            URLShortener(cache=noCache, endpoints=endpoints).shorten_url(url) for url in urls
+        ])
+
+        shortener = URLShortener(cache=DiskCache(os.path.join(tempfile.mkdtemp(), "short.sqlite")),
+                                 endpoints=endpoints, concurrency=8)
+        cold = run("shorten_many (cold)", lambda: shortener.shorten_many(urls))
+        warm = run("shorten_many (cached)", lambda: shortener.shorten_many(urls))
+
+    assert one == cold == warm and None not in cold
+    print(f"{len(urls)} urls, {len(unique)} distinct, results identical and in input order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Offline run of the 'fastest' shortening mode against stub shorteners.
+
+Three stub services: TinyURL answers in 40 ms but stalls for 1.5 s on 3% of
+requests, is.gd is down (rejects every url) for the first half of the run,
+v.gd steadily takes 80 ms.  The same urls are shortened through TinyURL
+alone, through shorten_fastest with p95 staggering and with all services
+raced at once, and the latency distribution, failures and requests sent are
+reported for each.
+
+Usage: python -m benchmarks.benchShortenerRace [urls]
+"""
+
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.stubServer import StubServer
+from diskCache import DiskCache
+from healthTracker import HealthTracker
+from urlShortener import URLShortener
+
+
+def shortCode(url: str) -> str:
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]
+
+
+class Services:
+    """Stub TinyURL, is.gd and v.gd with their own latency and failures"""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.isgdDown = True
+
+    def routes(self) -> list:
+        def tinyurl(request, match):
+            with self.lock:
+                stall = self.rng.random() < 0.03
+            time.sleep(1.5 if stall else 0.04)
+            return 200, "https://tinyurl.com/" + shortCode(request.query['url'][0])
+
+        def isgd(request, match):
+            time.sleep(0.03)
+            if self.isgdDown:
+                return 200, "Error: Sorry, the URL you entered is on our internal blacklist."
+            return 200, "https://is.gd/" + shortCode(request.form()['url'])
+
+        def vgd(request, match):
+            time.sleep(0.08)
+            return 200, "https://v.gd/" + shortCode(request.form()['url'])
+
+        return [("GET", r"/api-create.php", tinyurl),
+                ("POST", r"/isgd/create.php", isgd),
+                ("POST", r"/vgd/create.php", vgd)]
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q / 100 * len(samples))) - 1)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    urls = [f"https://example.com/articles/{i}" for i in range(count)]
+    services = Services()
+
+    with StubServer(services.routes()) as server:
+        endpoints = {
+            'tinyurl': f"{server.base_url}/api-create.php",
+            'isgd': f"{server.base_url}/isgd/create.php",
+            'vgd': f"{server.base_url}/vgd/create.php"
+        }
+        noCache = DiskCache(os.path.join(tempfile.mkdtemp(), "off.sqlite"), enabled=False)
+
+        def run(label, shorten):
+            services.isgdDown = True
+            latencies, failures = [], 0
+            before = server.requests
+            for i, url in enumerate(urls):
+                if i == count // 2:
+                    services.isgdDown = False
+                start = time.perf_counter()
+                short = shorten(url)
+                latencies.append(time.perf_counter() - start)
+                failures += short is None
+            # let requests that lost a race land before counting
+            time.sleep(1.6)
+            print(f"{label:18s} p50 {percentile(latencies, 50) * 1000:6.0f} ms"
+                  f"  p95 {percentile(latencies, 95) * 1000:6.0f} ms  max {max(latencies) * 1000:6.0f} ms"
+                  f"  {failures:3d} failed  {server.requests - before:4d} requests")
+
+        single = URLShortener(cache=noCache, endpoints=endpoints)
+        run("tinyurl only", single.shorten_url)
+
+        staggered = URLShortener(cache=noCache, endpoints=endpoints, tracker=HealthTracker(defaultLatency=1.0))
+        run("fastest (p95)", staggered.shorten_fastest)
+        print(f"  health: { {name: round(s['p95'], 3) for name, s in staggered.tracker.stats().items()} }")
+
+        raced = URLShortener(cache=noCache, endpoints=endpoints, tracker=HealthTracker(defaultLatency=1.0))
+        run("fastest (race)", lambda url: raced.shorten_fastest(url, stagger=0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+split_into_tweets against textwrap.wrap, the splitter it replaced.
+
+Splits the article descriptions of the synthetic corpus, plain and with urls,
+CJK and emoji mixed in, and a single very long description.  Reports time,
+the number of tweets, how many exceed the weighted limit (the platform would
+reject them) and how many end at a sentence.
+
+Usage: python -m benchmarks.benchSplitTweets [issues]
+"""
+
+import random
+import re
+import sys
+import textwrap
+import time
+
+from benchmarks.newsletterCorpus import corpus
+from parseEmailSections import parse_email_sections
+from tweetFormatter import SENTENCE_END_RE, split_into_tweets
+from tweetLength import TWEET_LIMIT, weightedLength
+
+
+NUMBERING_RE = re.compile(r" \(\d+/\d+\)$")
+EXTRAS = ["https://example.com/advisories/2024/" + "x" * 40, "脆弱性が見つかりました", "🔐🚨", "“patched”"]
+
+
+def mixed(text: str, rng) -> str:
+    words = text.split()
+    for _ in range(len(words) // 8):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(EXTRAS))
+    return ' '.join(words)
+
+
+def report(label: str, split, texts: list, repeat: int = 3) -> None:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tweets = [tweet for text in texts for tweet in split(text)]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    over = sum(weightedLength(tweet) > TWEET_LIMIT for tweet in tweets)
+    sentences = sum(bool(SENTENCE_END_RE.search(NUMBERING_RE.sub('', tweet))) for tweet in tweets)
+    print(f"  {label:9s} {best * 1000:8.2f} ms  {len(tweets):6d} tweets  {over:5d} over the limit"
+          f"  {sentences / len(tweets):4.0%} end a sentence")
+
+
+def main():
+    issues = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = random.Random(0)
+    plain = [
+        article['description']
+        for html in corpus(issues)
+        for articles in (parse_email_sections(html) or {}).values()
+        for article in articles
+    ]
+    withExtras = [mixed(text, rng) for text in plain]
+    long = [' '.join(withExtras)]
+
+    wrap = lambda text: textwrap.wrap(text, TWEET_LIMIT)
+    for name, texts in ((f"{len(plain)} plain descriptions", plain),
+                        (f"{len(withExtras)} with urls, CJK and emoji", withExtras),
+                        (f"one description of {len(long[0]) // 1000} KB", long)):
+        print(name)
+        report("textwrap", wrap, texts)
+        report("weighted", split_into_tweets, texts)
+        report("numbered", lambda text: split_into_tweets(text, number=True), texts)
+
+
+if __name__ == "__main__":
+    main()
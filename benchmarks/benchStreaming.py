@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Time to first token and early stop with aiClient streaming.
+
+The stub generates a long reply a word at a time.  full waits for the whole
+answer with ask_question, stream reads it with stream_question, and budget
+streams with tweetBudget() so the response is closed once a tweet's 280
+weighted characters are in; chunks is how many tokens the stub actually
+generated.
+
+Usage: python -m benchmarks.benchStreaming [words] [tokenLatencyMs]
+"""
+
+import sys
+import time
+
+from aiClient import Anthropic, Ollama, OpenAI, tweetBudget
+from benchmarks.newsletterCorpus import WORDS
+from benchmarks.stubServer import StubServer, anthropicMessagesRoute, chatCompletionRoute, ollamaRoutes
+
+
+def timeFull(provider):
+    start = time.perf_counter()
+    answer = provider.ask_question("Write a tweet about this story")
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(answer)
+
+
+def timeStream(provider, stop_when=None):
+    start = time.perf_counter()
+    first = None
+    answer = ''
+    for token in provider.stream_question("Write a tweet about this story", stop_when=stop_when):
+        if first is None:
+            first = time.perf_counter() - start
+        answer += token
+    return first, time.perf_counter() - start, len(answer)
+
+
+def main():
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.01
+
+    text = ' '.join(WORDS[i % len(WORDS)] for i in range(words))
+    reply = lambda prompt: text
+    routes = [chatCompletionRoute(reply, latency), anthropicMessagesRoute(reply, latency)] + \
+        ollamaRoutes(reply, latency)
+
+    with StubServer(routes) as server:
+        providers = [
+            ("openai", OpenAI(api_key="stub-key", base_url=f"{server.base_url}/v1")),
+            ("anthropic", Anthropic(api_key="stub-key", base_url=f"{server.base_url}/v1")),
+            ("ollama", Ollama(base_url=server.base_url)),
+        ]
+        print(f"{words} word reply, {latency * 1000:.0f} ms per token")
+        for name, provider in providers:
+            for label, run in (("full", lambda: timeFull(provider)),
+                               ("stream", lambda: timeStream(provider)),
+                               ("budget", lambda: timeStream(provider, tweetBudget()))):
+                before = server.chunks
+                first, total, chars = run()
+                # let the stub notice the closed connection
+                time.sleep(latency * 3)
+                print(f"{name:<10} {label:<7} first token {first * 1000:8.1f} ms   total {total * 1000:8.1f} ms"
+                      f"   chars {chars:5d}   chunks {server.chunks - before}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Offline run of thread revision against a local stub of the chat API.
+
+Revises synthetic articles once chunk by chunk (one request per chunk) and
+once a whole article per request (reviseArticleAsThread), and reports the
+requests and wall time of each.  Every fifth article gets a thread answer
+with an over-long tweet, which must be caught locally and revised chunk by
+chunk instead.
+
+Usage: python -m benchmarks.benchThreadRevision [articles] [chunksPerArticle]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.stubServer import StubServer, chatCompletionRoute
+
+
+def reply(messages) -> str:
+    from tweetFormatter import THREAD_PROMPT
+
+    content = messages[-1]['content']
+    if messages[0]['content'] != THREAD_PROMPT:
+        return "revised " + content[:8]
+
+    parts, article = content.split('\n', 1)
+    tweets = [f"thread {article[:4]} part {i}" for i in range(int(parts))]
+    if int(article[1:4]) % 5 == 0:
+        tweets[-1] = tweets[-1].ljust(300, '!')
+    return json.dumps(tweets)
+
+
+def syntheticSections(articles: int, chunksPerArticle: int) -> dict:
+    items = []
+    for i in range(articles):
+        # sentences of ~200 characters so each lands in a chunk of its own
+        sentences = [f"A{i:03d}C{c} " + "word " * 38 + "end." for c in range(chunksPerArticle)]
+        items.append({
+            'title': f"Article {i}",
+            'url': f"https://example.com/{i}",
+            'description': ' '.join(sentences)
+        })
+    return {"Attacks & Vulnerabilities": items}
+
+
+def main():
+    articles = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    chunksPerArticle = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sections = syntheticSections(articles, chunksPerArticle)
+
+    with StubServer([chatCompletionRoute(reply)], latency=0.05) as server:
+        os.environ["openaiBaseUrl"] = f"{server.base_url}/v1"
+        os.environ.setdefault("openaiApiKey", "stub-key")
+
+        from diskCache import DiskCache
+        from revisionStage import RevisionStage
+        from tweetFormatter import reviseArticleAsThread, reviseArticleForTweet
+
+        cache = DiskCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"), enabled=False)
+        revise = lambda chunk: reviseArticleForTweet(chunk, cache=cache)
+
+        before, start = server.requests, time.perf_counter()
+        with RevisionStage(revise=revise) as stage:
+            perChunk = list(stage.revise_sections(sections))
+        print(f"per-chunk: {server.requests - before:4d} requests  {time.perf_counter() - start:6.2f} s")
+
+        reviseThread = lambda article, chunkLimit, revise: reviseArticleAsThread(
+            article, chunkLimit, revise=revise, cache=cache)
+        before, start = server.requests, time.perf_counter()
+        with RevisionStage(revise=revise, reviseThread=reviseThread) as stage:
+            threaded = list(stage.revise_sections(sections))
+        print(f"thread:    {server.requests - before:4d} requests  {time.perf_counter() - start:6.2f} s"
+              f"  ({(articles + 4) // 5} articles fell back to per-chunk)")
+
+    assert [item['url'] for item, _ in threaded] == [item['url'] for item, _ in perChunk]
+    for (item, tweets), (_, chunkTweets) in zip(threaded, perChunk):
+        index = int(item['url'].rsplit('/', 1)[1])
+        assert all(len(tweet) <= 280 for tweet in tweets)
+        if index % 5 == 0:
+            assert tweets == chunkTweets, tweets
+        else:
+            assert tweets[1:] == [f"thread A{index:03d} part {c}" for c in range(chunksPerArticle)], tweets
+    print("threads validated, rejected answers match the per-chunk results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Token budgeting of revision requests over a synthetic newsletter corpus.
+
+Splits every article of the corpus into revision chunks the old way (one LLM
+call per split_into_tweets piece, max_tokens fixed at REVISION_MAX_TOKENS)
+and the new way (short pieces merged, max_tokens sized from each chunk), and
+reports the calls and completion tokens reserved by each, the cost of the
+estimator itself, and that an oversized input is refused locally.
+
+Usage: python -m benchmarks.benchTokenBudget [issues]
+"""
+
+import sys
+import time
+
+from benchmarks.newsletterCorpus import corpus
+from parseEmailSections import parse_email_sections
+from tokenEstimator import contextWindow, countTokens, encoderFor
+from tweetFormatter import (REVISION_MAX_TOKENS, REVISION_MODEL, revisionChunks, revisionMaxTokens,
+                            split_into_tweets)
+
+
+def main():
+    issues = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    descriptions = [
+        article['description']
+        for html in corpus(issues)
+        for articles in (parse_email_sections(html) or {}).values()
+        for article in articles
+    ]
+    print(f"{len(descriptions)} articles, token counts from "
+          f"{'tiktoken' if encoderFor(REVISION_MODEL) is not None else 'the heuristic'}")
+
+    start = time.perf_counter()
+    oldChunks = [chunk for text in descriptions for chunk in split_into_tweets(text, 220)]
+    newChunks = [chunk for text in descriptions for chunk in revisionChunks(text, 220)]
+    reserved = sum(revisionMaxTokens(chunk) for chunk in newChunks)
+    elapsed = time.perf_counter() - start
+
+    oldReserved = len(oldChunks) * REVISION_MAX_TOKENS
+    print(f"fixed:  {len(oldChunks):5d} calls  {oldReserved:7d} max_tokens")
+    print(f"sized:  {len(newChunks):5d} calls  {reserved:7d} max_tokens"
+          f"  ({1 - len(newChunks) / len(oldChunks):.0%} fewer calls,"
+          f" {1 - reserved / oldReserved:.0%} fewer reserved tokens)")
+    print(f"chunking and sizing took {elapsed * 1000:.1f} ms")
+
+    countTokens.cache_clear()
+    start = time.perf_counter()
+    for text in descriptions:
+        countTokens(text, REVISION_MODEL)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in descriptions:
+        countTokens(text, REVISION_MODEL)
+    warm = time.perf_counter() - start
+    print(f"countTokens: {cold / len(descriptions) * 1e6:.1f} µs per article cold,"
+          f" {warm / len(descriptions) * 1e6:.2f} µs cached")
+
+    oversized = "word " * contextWindow(REVISION_MODEL)
+    try:
+        revisionMaxTokens(oversized)
+    except ValueError as e:
+        print(f"oversized input refused before the network: {e}")
+    else:
+        raise AssertionError("oversized input was not refused")
+
+
+if __name__ == "__main__":
+    main()
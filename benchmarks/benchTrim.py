@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Timing of tweetFormatter.trim against the previous implementation, on the
+inputs that one could handle (plain words followed by hashtags), short and
+long.  The properties of trim are checked in tests/test_tweetFormatter.py.
+
+Usage: python -m benchmarks.benchTrim [tweets] [seed]
+"""
+
+import random
+import sys
+import time
+
+from tweetFormatter import trim
+
+
+WORDS = ("patch exploit ransomware attackers vulnerability researchers released critical "
+         "update servers cloud breach phishing credentials").split()
+
+
+def legacyTrim(tweet):
+    # the implementation trim replaced, quadratic and fragile
+    lastTag = len(tweet)
+    while True:
+        tag = tweet[:lastTag].rfind('#')
+        if tag == -1:
+            break
+        lastTag = tag - 1
+
+    if lastTag == -1:
+        hashtags = None
+        hashtagLength = len(tweet)
+    else:
+        hashtags = tweet[lastTag:]
+        hashtagLength = len(hashtags)
+
+    tweetLen = len(tweet[:lastTag])
+    while (tweetLen + hashtagLength) > 280:
+        lastTag = tweet[:lastTag].rfind(' ')
+        tweetLen = len(tweet[:lastTag])
+
+    return tweet[:lastTag] + hashtags
+
+
+def timeTrim(function, tweets: list, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tweet in tweets:
+            function(tweet)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = random.Random(seed)
+
+    # the previous trim only copes with plain words followed by hashtags
+    legacyOk = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 80))) + ' #CyberSecurity #Patch'
+                for _ in range(count)]
+    print(f"on {len(legacyOk)} tweets the previous trim handles:")
+    for label, scale in (("short", 1), ("long x50", 50)):
+        sample = [' '.join([t[:t.index(' #')]] * scale) + t[t.index(' #'):] for t in legacyOk]
+        old = timeTrim(legacyTrim, sample)
+        new = timeTrim(trim, sample)
+        print(f"  {label:9s} previous {old / len(sample) * 1e6:9.1f} µs/tweet"
+              f"  trim {new / len(sample) * 1e6:7.1f} µs/tweet  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+fixUpHref's url canonicalization against the string splitting it replaced.
+
+Generates thousands of newsletter hrefs, repeating across issues as real
+links do: TLDR tracker links, destinations with 'http' in their path or
+other percent-escapes in their query, trackers nested in a Google redirect
+with double encoding, and plain links with utm parameters.  Reports how many
+each implementation maps to the right destination and the time per href,
+cold and memoized.  Then resolves redirect chains against a local stub, one
+new connection per link versus RedirectResolver's pooled session.
+
+Usage: python -m benchmarks.benchUrlCanonical [hrefs] [distinct]
+"""
+
+import random
+import sys
+import time
+from urllib.parse import quote
+
+import requests
+
+from benchmarks.stubServer import StubServer
+from urlCanonical import RedirectResolver, canonicalUrl
+
+
+def legacyFixUpHref(href):
+    # the implementation fixUpHref replaced
+    scheme = 'https'
+    if href.startswith('http://'):
+        parts = href.split('http')
+        scheme = 'http'
+    else:
+        parts = href.split('https')
+
+    numParts = len(parts)
+    urlIndex = 2
+    if numParts == 2: # there is only one https
+        urlIndex = 1
+    part = parts[urlIndex].replace('%2F', '/')
+    part = part.split('%3F')[0]
+    return scheme + part
+
+
+def tracked(url: str, rng) -> str:
+    return (f"https://tracking.tldrnewsletter.com/CL0/{quote(url, safe=':=')}/1/"
+            f"01000198a38abf5c-{rng.randint(10**7, 10**8)}-000000/yCsUCrlwhItaPww2IcSKVDOt=418")
+
+
+def sample(rng, index: int):
+    """Returns (href, expected canonical url)"""
+    kind = index % 5
+    if kind == 0:
+        url = f"https://www.example-news.com/security/story-{index}/"
+        return tracked(url + "?utm_source=tldrinfosec", rng), url
+    if kind == 1:
+        url = f"https://blog.example.org/http-request-smuggling-{index}/"
+        return tracked(url + "?utm_source=tldrinfosec", rng), url
+    if kind == 2:
+        url = f"https://www.example-news.com/article?id={index}&page=2"
+        return tracked(url + "&utm_medium=email&utm_source=tldrinfosec", rng), url
+    if kind == 3:
+        url = f"https://example.com/reports/{index}"
+        inner = tracked(url + "?utm_campaign=weekly", rng)
+        return f"https://www.google.com/url?q={quote(inner, safe='')}&sa=D&source=editors", url
+    url = f"http://example.com/plain/{index}"
+    return url + "?utm_source=newsletter&utm_medium=email", url
+
+
+def timeIt(function, hrefs: list) -> float:
+    start = time.perf_counter()
+    for href in hrefs:
+        function(href)
+    return time.perf_counter() - start
+
+
+def redirectRoutes():
+    def hop(request, match):
+        return 302, "", {'Location': f"/hop2/{match.group(1)}"}
+
+    def hop2(request, match):
+        return 301, "", {'Location': f"/article/{match.group(1)}?utm_source=short"}
+
+    def article(request, match):
+        return 200, "<html></html>", {'Content-Type': 'text/html'}
+
+    return [("GET", r"/s/(\d+)", hop), ("GET", r"/hop2/(\d+)", hop2), ("GET", r"/article/(\d+)", article)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(0)
+    pool = [sample(rng, i) for i in range(distinct)]
+    hrefs = [rng.choice(pool) for _ in range(count)]
+
+    def correct(function):
+        right = 0
+        for href, expected in pool:
+            try:
+                right += function(href) == expected
+            except IndexError:
+                pass
+        return right
+
+    print(f"{distinct} distinct hrefs mapped to the right url:"
+          f" string splitting {correct(legacyFixUpHref)}, canonicalUrl {correct(canonicalUrl)}")
+
+    links = [href for href, _ in hrefs]
+    safeLinks = [href for href in links if href.count('https') <= 2]
+    old = timeIt(legacyFixUpHref, safeLinks) / len(safeLinks)
+    canonicalUrl.cache_clear()
+    cold = timeIt(canonicalUrl.__wrapped__, links) / len(links)
+    timeIt(canonicalUrl, links)
+    warm = timeIt(canonicalUrl, links) / len(links)
+    print(f"{count} hrefs: string splitting {old * 1e6:.2f} µs/href, canonicalUrl {cold * 1e6:.2f} µs/href"
+          f" uncached, {warm * 1e6:.2f} µs/href memoized")
+
+    with StubServer(redirectRoutes(), latency=0.01) as server:
+        short = [f"{server.base_url}/s/{i}" for i in range(200)]
+        expected = [f"{server.base_url}/article/{i}" for i in range(200)]
+
+        connections, start = server.connections, time.perf_counter()
+        sequential = [canonicalUrl(requests.get(url, stream=True, timeout=5).url) for url in short]
+        print(f"redirects one at a time:   {server.connections - connections:4d} connections"
+              f"  {time.perf_counter() - start:5.2f} s")
+
+        resolver = RedirectResolver(concurrency=8)
+        connections, start = server.connections, time.perf_counter()
+        resolved = resolver.resolve_many(short)
+        print(f"RedirectResolver:          {server.connections - connections:4d} connections"
+              f"  {time.perf_counter() - start:5.2f} s")
+        resolver.close()
+
+    assert sequential == resolved == expected, resolved[:3]
+    print("resolved urls match, tracking parameters stripped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Synthetic newsletter html shaped like the TLDR InfoSec issues parseSections
+reads: section header tables followed by content tables of text-block divs,
+tracking links, inline styles, spacer images, ads and a footer.
+"""
+
+import random
+
+
+SECTIONS = [
+    ("🔓", "Attacks & Vulnerabilities"),
+    ("🧠", "Strategies & Tactics"),
+    ("🧑‍💻", "Launches & Tools"),
+    ("🎁", "Miscellaneous"),
+    ("⚡", "Quick Links"),
+]
+
+WORDS = ("attackers exploited critical vulnerability remote code execution patch released "
+         "researchers ransomware credentials cloud misconfiguration supply chain malicious "
+         "package phishing campaign zero-day firmware authentication bypass privilege escalation "
+         "data breach customers notified security update mitigations detection rules").split()
+
+STYLE = ("font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, "
+         "sans-serif; font-size: 16px; line-height: 24px; color: #333333; text-align: left;")
+
+
+def _sentence(rng) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _trackingHref(rng, index: int) -> str:
+    return ("https://tracking.tldrnewsletter.com/CL0/https:%2F%2Fwww.example-news.com%2Fsecurity%2F"
+            f"story-{index}-{rng.randint(1000, 9999)}%2F%3Futm_source=tldrinfosec/1/"
+            f"01000198a38abf5c-{rng.randint(10**7, 10**8)}-000000/yCsUCrlwhItaPww2IcSKVDOt=418")
+
+
+def _article(rng, index: int) -> str:
+    description = ' '.join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+    return (
+        f'<span><a href="{_trackingHref(rng, index)}" target="_blank" rel="noopener noreferrer">'
+        f'<span><strong>Story {index}: {_sentence(rng)[:60]} ({rng.randint(2, 9)} minute read)</strong></span></a>'
+        f'<br><br><span style="{STYLE}">{description} &nbsp;</span></span>'
+    )
+
+
+def _block(rng, start: int, count: int) -> str:
+    articles = '<br><br>'.join(_article(rng, start + i) for i in range(count))
+    return (
+        f'<div class="text-block" style="{STYLE}">{articles}</div>'
+        f'<table width="100%" role="presentation"><tr><td style="padding: 10px 0;">'
+        f'<img src="https://example.com/spacer.gif" width="1" height="10" alt=""></td></tr></table>'
+    )
+
+
+def _section(rng, emoji: str, name: str, articles: int, start: int, linksPerBlock: int = 1) -> str:
+    header = (
+        f'<table align="center" width="100%" role="presentation" class="header-table"><tr>'
+        f'<td style="padding: 20px 0;"><div class="text-block" style="{STYLE}">'
+        f'<h1 style="font-size: 20px;"><span>{emoji}</span><br><span>{name.replace("&", "&amp;")}</span></h1>'
+        f'</div></td></tr></table>'
+    )
+    body = ''.join(_block(rng, start + i, min(linksPerBlock, articles - i))
+                   for i in range(0, articles, linksPerBlock))
+    content = (
+        f'<table align="center" width="100%" role="presentation" class="content-table"><tr>'
+        f'<td style="padding: 0 16px;">{body}</td></tr></table>'
+    )
+    return header + content
+
+
+def newsletterHtml(articlesPerSection: int = 6, seed: int = 0, linksPerBlock: int = 1) -> str:
+    """Returns one synthetic issue, linksPerBlock articles share each text-block"""
+    rng = random.Random(seed)
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><style>',
+        'body { margin: 0; } .text-block { padding: 0 8px; } ' * 40,
+        '</style></head><body><table width="100%" class="container" role="presentation"><tr><td>',
+        f'<div class="text-block" style="{STYLE}"><a href="https://tldr.tech/infosec?ref=refer.example">'
+        f'<span><strong>Sign up</strong></span></a> | <a href="https://advertise.tldr.tech">'
+        f'<strong>Advertise</strong></a></div>',
+    ]
+    start = 0
+    for emoji, name in SECTIONS:
+        parts.append(_section(rng, emoji, name, articlesPerSection, start, linksPerBlock))
+        start += articlesPerSection
+        # sponsor block between sections
+        parts.append(
+            f'<table width="100%"><tr><td><div class="text-block" style="{STYLE}">'
+            f'<a href="https://tracking.tldrnewsletter.com/CL0/https:%2F%2Fsponsor.example%2F/1/x=1">'
+            f'<strong>Sponsor</strong></a><span>{_sentence(rng)}</span></div></td></tr></table>'
+        )
+    parts.append(
+        f'<div class="text-block" style="{STYLE}"><a href="https://tldr.tech/unsubscribe">Unsubscribe</a>'
+        f' | <a href="https://tldr.tech/manage">Manage</a></div></td></tr></table></body></html>'
+    )
+    return ''.join(parts)
+
+
+def corpus(issues: int = 20, seed: int = 0, linksPerBlock: int = 1) -> list:
+    """Returns issues of real-world size (roughly 50-200 KB each)"""
+    rng = random.Random(seed)
+    return [newsletterHtml(rng.randint(6, 25), seed + i, linksPerBlock) for i in range(issues)]
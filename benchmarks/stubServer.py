@@ -0,0 +1,488 @@
+"""
+Local stub HTTP server for offline benchmarks.
+
+Speaks HTTP/1.1 with keep-alive so connection reuse on the client side is
+visible, counts accepted connections and can add a fixed per-request latency
+to stand in for model time.
+
+Routes are (method, regex, handler) tuples; a handler gets the StubRequest and
+the regex match and returns (status, body) or (status, body, headers).  A
+dict/list body is sent as JSON; an iterator body is streamed with chunked
+transfer encoding, one chunk per item, and stops when the client hangs up.
+The model routes stream their reply token by token when the request asks for
+"stream": true.
+"""
+
+import email.parser
+import email.policy
+import json
+import re
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+class StubRequest:
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b'null')
+
+    def form(self):
+        return {k: v[0] for k, v in parse_qs(self.body.decode('utf-8')).items()}
+
+
+class _ThreadingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver's default backlog of 5 resets bursts of concurrent connects
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # clients that drop their connection without a request are expected
+        if isinstance(sys.exc_info()[1], ConnectionResetError):
+            return
+        super().handle_error(request, client_address)
+
+
+class StubServer:
+    """Threaded local HTTP server driven by a route table"""
+
+    def __init__(self, routes: list, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.chunks = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), self._makeHandler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _dispatch(self, request):
+        for method, pattern, handler in self.routes:
+            # HEAD is answered by the GET route, without the body
+            if method != request.method and not (request.method == "HEAD" and method == "GET"):
+                continue
+            match = pattern.fullmatch(request.path)
+            if match:
+                return handler(request, match)
+        return 404, {"error": f"no route for {request.method} {request.path}"}
+
+    def _makeHandler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # headers and body go out in separate writes, without
+                # TCP_NODELAY keep-alive requests stall on delayed ACKs
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                parts = urlsplit(self.path)
+                request = StubRequest(self.command, parts.path, parse_qs(parts.query), self.headers, body)
+
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                try:
+                    result = stub._dispatch(request)
+                except Exception as e:
+                    # e.g. a body cut short by a client that gave up
+                    result = (500, {"error": {"message": str(e)}})
+                status, payload = result[0], result[1]
+                headers = result[2] if len(result) > 2 else {}
+
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode('utf-8')
+                    headers.setdefault('Content-Type', 'application/json')
+                elif isinstance(payload, str):
+                    payload = payload.encode('utf-8')
+                    headers.setdefault('Content-Type', 'text/plain')
+                elif not isinstance(payload, bytes):
+                    self._stream(status, payload, headers)
+                    return
+
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    if self.command != "HEAD":
+                        self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up (timeout or cancelled call)
+                    self.close_connection = True
+
+            def _stream(self, status, chunks, headers):
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for chunk in chunks:
+                        if isinstance(chunk, str):
+                            chunk = chunk.encode('utf-8')
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        self.wfile.flush()
+                        with stub._lock:
+                            stub.chunks += 1
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            do_GET = _handle
+            do_HEAD = _handle
+            do_POST = _handle
+            do_DELETE = _handle
+
+        return Handler
+
+
+def replyTokens(text: str, tokenLatency: float = 0.0):
+    """Yields text a word at a time, tokenLatency seconds apart"""
+    for token in re.findall(r'\s*\S+', text):
+        if tokenLatency:
+            time.sleep(tokenLatency)
+        yield token
+
+
+def chatCompletionRoute(reply=lambda messages: "Stub tweet #Stub", tokenLatency: float = 0.0):
+    """Route serving POST /v1/chat/completions like the OpenAI API"""
+
+    def stream(model, content):
+        for token in replyTokens(content, tokenLatency):
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def handler(request, match):
+        data = request.json()
+        model, content = data.get('model', 'stub'), reply(data['messages'])
+        if data.get('stream'):
+            return 200, stream(model, content), {'Content-Type': 'text/event-stream'}
+        for _ in replyTokens(content, tokenLatency):
+            pass  # generate the whole reply before answering
+        return 200, chatCompletionBody(model, content)
+
+    return ("POST", r"/v1/chat/completions", handler)
+
+
+def chatCompletionBody(model: str, content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+
+def anthropicMessagesRoute(reply=lambda messages: "Stub tweet #Stub", tokenLatency: float = 0.0):
+    """Route serving POST /v1/messages like the Anthropic API"""
+
+    def event(kind, data):
+        return f"event: {kind}\ndata: {json.dumps(dict(data, type=kind))}\n\n"
+
+    def stream(content):
+        yield event("message_start", {"message": {"id": "msg_stub", "role": "assistant", "content": []}})
+        yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        for token in replyTokens(content, tokenLatency):
+            yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+        yield event("content_block_stop", {"index": 0})
+        yield event("message_stop", {})
+
+    def handler(request, match):
+        data = request.json()
+        content = reply(data['messages'])
+        if data.get('stream'):
+            return 200, stream(content), {'Content-Type': 'text/event-stream'}
+        for _ in replyTokens(content, tokenLatency):
+            pass
+        return 200, {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": data.get('model', 'stub'),
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": 0, "output_tokens": 0}
+        }
+
+    return ("POST", r"/v1/messages", handler)
+
+
+def ollamaRoutes(reply=lambda prompt: "Stub tweet #Stub", tokenLatency: float = 0.0):
+    """Routes serving GET /api/tags and POST /api/generate like Ollama"""
+
+    def tags(request, match):
+        return 200, {"models": [{"name": "llama2"}]}
+
+    def stream(model, content):
+        for token in replyTokens(content, tokenLatency):
+            yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+        yield json.dumps({"model": model, "response": "", "done": True}) + "\n"
+
+    def generate(request, match):
+        data = request.json()
+        model, content = data.get('model', 'stub'), reply(data['prompt'])
+        if data.get('stream', True):
+            return 200, stream(model, content), {'Content-Type': 'application/x-ndjson'}
+        for _ in replyTokens(content, tokenLatency):
+            pass
+        return 200, {"model": model, "response": content, "done": True}
+
+    return [("GET", r"/api/tags", tags), ("POST", r"/api/generate", generate)]
+
+
+class MockBatchApi:
+    """
+    In-memory stand-in for the OpenAI files and batches endpoints
+
+    Uploaded JSONL requests are answered with reply(messages); a batch reports
+    in_progress for pollsUntilDone retrievals before it completes.  With
+    finalStatus "failed", "expired" or "cancelled" it ends that way instead,
+    without an output file.
+    """
+
+    def __init__(self, reply=lambda messages: "Stub tweet #Stub", pollsUntilDone: int = 2,
+                 finalStatus: str = "completed"):
+        self.reply = reply
+        self.pollsUntilDone = pollsUntilDone
+        self.finalStatus = finalStatus
+        self.files = {}
+        self.batches = {}
+        self._lock = threading.Lock()
+
+    def routes(self) -> list:
+        return [
+            ("POST", r"/v1/files", self._createFile),
+            ("GET", r"/v1/files/(?P<id>[^/]+)/content", self._fileContent),
+            ("POST", r"/v1/batches", self._createBatch),
+            ("GET", r"/v1/batches/(?P<id>[^/]+)", self._retrieveBatch),
+        ]
+
+    def _newId(self, prefix: str, table: dict) -> str:
+        return f"{prefix}-{len(table) + 1}"
+
+    def _fileObject(self, fileId: str, purpose: str) -> dict:
+        return {
+            "id": fileId,
+            "object": "file",
+            "bytes": len(self.files[fileId]),
+            "created_at": int(time.time()),
+            "filename": f"{fileId}.jsonl",
+            "purpose": purpose,
+            "status": "processed"
+        }
+
+    def _createFile(self, request, match):
+        # multipart/form-data body, parsed with the email package
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: " + request.headers['Content-Type'].encode('latin-1') + b"\r\n\r\n" + request.body
+        )
+        content, purpose = b'', 'batch'
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                content = part.get_payload(decode=True)
+            elif name == 'purpose':
+                purpose = part.get_payload(decode=True).decode('utf-8')
+
+        with self._lock:
+            fileId = self._newId("file", self.files)
+            self.files[fileId] = content
+        return 200, self._fileObject(fileId, purpose)
+
+    def _fileContent(self, request, match):
+        content = self.files.get(match.group('id'))
+        if content is None:
+            return 404, {"error": {"message": "No such file"}}
+        return 200, content, {'Content-Type': 'application/octet-stream'}
+
+    def _createBatch(self, request, match):
+        data = request.json()
+        with self._lock:
+            batchId = self._newId("batch", self.batches)
+            self.batches[batchId] = {
+                "id": batchId,
+                "object": "batch",
+                "endpoint": data['endpoint'],
+                "input_file_id": data['input_file_id'],
+                "completion_window": data['completion_window'],
+                "status": "validating",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                "_polls": 0
+            }
+        return 200, self._public(self.batches[batchId])
+
+    def _retrieveBatch(self, request, match):
+        batch = self.batches.get(match.group('id'))
+        if batch is None:
+            return 404, {"error": {"message": "No such batch"}}
+
+        with self._lock:
+            batch['_polls'] += 1
+            if batch['status'] != "completed":
+                if batch['_polls'] > self.pollsUntilDone and self.finalStatus != "completed":
+                    batch['status'] = self.finalStatus
+                elif batch['_polls'] > self.pollsUntilDone:
+                    self._complete(batch)
+                else:
+                    batch['status'] = "in_progress"
+        return 200, self._public(batch)
+
+    def _complete(self, batch: dict):
+        lines = [json.loads(line) for line in self.files[batch['input_file_id']].splitlines() if line.strip()]
+        output = []
+        for line in lines:
+            body = line['body']
+            output.append(json.dumps({
+                "id": f"batch_req_{line['custom_id']}",
+                "custom_id": line['custom_id'],
+                "response": {
+                    "status_code": 200,
+                    "request_id": line['custom_id'],
+                    "body": chatCompletionBody(body.get('model', 'stub'), self.reply(body['messages']))
+                },
+                "error": None
+            }))
+
+        outputId = self._newId("file", self.files)
+        self.files[outputId] = "\n".join(output).encode('utf-8')
+        batch['output_file_id'] = outputId
+        batch['status'] = "completed"
+        batch['request_counts'] = {"total": len(lines), "completed": len(lines), "failed": 0}
+
+    def _public(self, batch: dict) -> dict:
+        return {k: v for k, v in batch.items() if not k.startswith('_')}
+
+
+class MockTwitterApi:
+    """
+    POST /2/tweets of the Twitter/X API v2, with its rate limit
+
+    At most limit tweets are accepted per window of period seconds, aligned
+    like the real windows, and every response carries the x-rate-limit-*
+    headers; a tweet over the budget gets 429.  Tweets are counted when they
+    arrive and answered latency seconds later.  Replies are checked as they
+    arrive: a reply to an unknown tweet, or to a tweet that already has a
+    reply, counts as out of order.
+    """
+
+    def __init__(self, limit: int = 300, period: int = 900, latency: float = 0.0):
+        self.limit = limit
+        self.period = period
+        self.latency = latency
+        self.tweets = {}
+        self.replies = {}
+        self.accepted = 0
+        self.rejected = 0
+        self.outOfOrder = 0
+        self._windowStart = 0
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def routes(self) -> list:
+        return [("POST", r"/2/tweets", self._createTweet)]
+
+    def _headers(self) -> dict:
+        return {
+            'x-rate-limit-limit': str(self.limit),
+            'x-rate-limit-remaining': str(max(0, self.limit - self._used)),
+            'x-rate-limit-reset': str(self._windowStart + self.period)
+        }
+
+    def _createTweet(self, request, match):
+        data = request.json()
+        replyTo = (data.get('reply') or {}).get('in_reply_to_tweet_id')
+        now = time.time()
+        with self._lock:
+            windowStart = int(now // self.period * self.period)
+            if windowStart != self._windowStart:
+                self._windowStart = windowStart
+                self._used = 0
+            if self._used >= self.limit:
+                self.rejected += 1
+                result = (429, {"title": "Too Many Requests", "detail": "Too Many Requests", "status": 429},
+                          self._headers())
+            else:
+                self._used += 1
+                headers = self._headers()
+                if replyTo is not None and (replyTo not in self.tweets or replyTo in self.replies):
+                    self.outOfOrder += 1
+                tweetId = str(len(self.tweets) + 1)
+                self.tweets[tweetId] = {'text': data['text'], 'reply_to': replyTo}
+                if replyTo is not None:
+                    self.replies[replyTo] = tweetId
+                self.accepted += 1
+                result = (201, {"data": {"id": tweetId, "text": data['text'],
+                                         "edit_history_tweet_ids": [tweetId]}}, headers)
+        if self.latency:
+            time.sleep(self.latency)
+        return result
+
+    def threads(self) -> list:
+        """Texts of every posted thread, following the reply chains from each root"""
+        with self._lock:
+            threads = []
+            for tweetId, tweet in self.tweets.items():
+                if tweet['reply_to'] is not None:
+                    continue
+                texts = [tweet['text']]
+                while tweetId in self.replies:
+                    tweetId = self.replies[tweetId]
+                    texts.append(self.tweets[tweetId]['text'])
+                threads.append(texts)
+            return threads
@@ -0,0 +1,190 @@
+"""
+Persistent index of articles already seen, across newsletter issues.
+
+The same story shows up in several issues and in several sections of one
+issue (Quick Links and Miscellaneous).  Every article is recorded by its
+canonical url and by a MinHash signature of its description's word pairs;
+an article whose url was seen before, or whose description shares most of
+its word pairs with an earlier one (the same blurb lightly reworded), is a
+duplicate and is not revised or posted again.
+
+Near-duplicate lookups use LSH banding: the 16 minimums are grouped into 8
+bands of 2 and each band is indexed, so similar descriptions (Jaccard 0.8
+and up) share a band with near certainty while unrelated ones almost never
+do.  A lookup reads eight small buckets and one url row, whatever the size
+of the history.
+
+The file defaults to .dedup.sqlite, set DEDUP_INDEX_PATH to move it.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+
+from urlCanonical import canonicalUrl
+
+
+DEFAULT_PATH = ".dedup.sqlite"
+HASHES = 16
+ROWS = 2
+BANDS = HASHES // ROWS
+# share of equal minimums (estimated Jaccard similarity) counted as the same
+THRESHOLD = 0.6
+# descriptions shorter than this are only matched by url
+MIN_WORDS = 8
+
+WORD_RE = re.compile(r"\w+")
+SIGNATURE = struct.Struct(f"<{HASHES}I")
+
+
+def minhash(text: str):
+    """
+    MinHash signature of the word pairs of text
+
+    One 64 byte BLAKE2b digest per pair gives all 16 hash values at once.
+
+    Returns:
+        tuple: 16 32-bit minimums, or None when text is too short to compare
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    hashes = [
+        SIGNATURE.unpack(hashlib.blake2b(f"{first} {second}".encode('utf-8'), digest_size=64).digest())
+        for first, second in set(zip(words, words[1:]))
+    ]
+    return tuple(map(min, zip(*hashes)))
+
+
+def similarity(first: tuple, second: tuple) -> float:
+    return sum(a == b for a, b in zip(first, second)) / HASHES
+
+
+def bands(signature: tuple) -> list:
+    # two 32-bit minimums per band, as a signed 64-bit SQLite integer
+    values = []
+    for band in range(BANDS):
+        value = signature[band * ROWS] << 32 | signature[band * ROWS + 1]
+        values.append(value - (1 << 64) if value >= 1 << 63 else value)
+    return values
+
+
+class DedupIndex:
+    """SQLite index of seen articles by canonical url and description MinHash"""
+
+    def __init__(self, path: str = None, threshold: float = THRESHOLD):
+        self.path = path or os.environ.get("DEDUP_INDEX_PATH", DEFAULT_PATH)
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " signature BLOB,"
+            " owner TEXT,"
+            " title TEXT,"
+            " seen REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS articles_url ON articles (url);"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL,"
+            " value INTEGER NOT NULL,"
+            " article_id INTEGER NOT NULL REFERENCES articles (id),"
+            " PRIMARY KEY (band, value, article_id)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+    def _find(self, url: str, signature, owner):
+        row = url and self._conn.execute(
+            "SELECT url, title, owner FROM articles WHERE url = ? AND (owner IS NULL OR owner IS NOT ?) LIMIT 1",
+            (url, owner)
+        ).fetchone()
+        if row:
+            return {'url': row[0], 'title': row[1], 'reason': 'url'}
+        if signature is None:
+            return None
+
+        checked = set()
+        for band, value in enumerate(bands(signature)):
+            rows = self._conn.execute(
+                "SELECT a.id, a.url, a.title, a.signature, a.owner FROM bands b JOIN articles a ON a.id = b.article_id"
+                " WHERE b.band = ? AND b.value = ?",
+                (band, value)
+            ).fetchall()
+            for articleId, candidateUrl, title, candidate, candidateOwner in rows:
+                if articleId in checked or (owner is not None and candidateOwner == owner):
+                    continue
+                checked.add(articleId)
+                if similarity(SIGNATURE.unpack(candidate), signature) >= self.threshold:
+                    return {'url': candidateUrl, 'title': title, 'reason': 'description'}
+        return None
+
+    def _add(self, url: str, signature, owner, title) -> None:
+        cursor = self._conn.execute(
+            "INSERT INTO articles (url, signature, owner, title, seen) VALUES (?, ?, ?, ?, ?)",
+            (url, None if signature is None else SIGNATURE.pack(*signature), owner, title, time.time())
+        )
+        if signature is not None:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bands (band, value, article_id) VALUES (?, ?, ?)",
+                [(band, value, cursor.lastrowid) for band, value in enumerate(bands(signature))]
+            )
+
+    def find(self, article: dict, owner=None):
+        """
+        Look up an earlier copy of an article
+
+        Args:
+            article (dict): article dictionary from parseSections
+            owner (optional): the article's own id (e.g. its job id), a match
+                              recorded under the same owner is not a duplicate
+
+        Returns:
+            dict: 'url', 'title' and 'reason' ('url' or 'description') of the
+                  earlier article, None when it is new
+        """
+        url = canonicalUrl(article.get('url') or '')
+        signature = minhash(article.get('description') or '')
+        owner = None if owner is None else str(owner)
+        with self._lock:
+            return self._find(url, signature, owner)
+
+    def check_and_add(self, article: dict, owner=None):
+        """
+        Record an article unless it is a duplicate, in one step
+
+        Returns:
+            dict: the earlier article when it is a duplicate (see find),
+                  None when it was new and has been recorded
+        """
+        url = canonicalUrl(article.get('url') or '')
+        signature = minhash(article.get('description') or '')
+        owner = None if owner is None else str(owner)
+        with self._lock:
+            match = self._find(url, signature, owner)
+            if match is None:
+                self._add(url, signature, owner, article.get('title'))
+                self._conn.commit()
+            return match
+
+    def add(self, article: dict, owner=None) -> None:
+        url = canonicalUrl(article.get('url') or '')
+        signature = minhash(article.get('description') or '')
+        with self._lock:
+            self._add(url, signature, None if owner is None else str(owner), article.get('title'))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        return {'articles': articles}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,168 @@
+"""
+Persistent content-addressed cache for LLM completions.
+
+Entries live in a small SQLite file keyed by a SHA-256 of everything that
+determines the completion (input text, model, system prompt, temperature,
+max_tokens).  Entries expire after a TTL and the least recently used ones are
+evicted once the cache grows past maxEntries.
+
+Set REVISION_CACHE_BYPASS=1 (or cache.enabled = False) to skip the cache.
+The url shortener cache has its own switch, SHORTENER_CACHE_BYPASS=1.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_PATH = ".revision_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_TTL = 30 * 24 * 3600
+
+SHORTENER_CACHE_PATH = ".shortener_cache.sqlite"
+# short links do not change, keep them for a year
+SHORTENER_CACHE_TTL = 365 * 24 * 3600
+
+_revisionCache = None
+_revisionCacheLock = threading.Lock()
+_shortenerCache = None
+
+
+def cacheKey(*parts) -> str:
+    """
+    Build a cache key from the values that determine a completion
+
+    Args:
+        *parts: JSON serialisable values, e.g. text, model, system prompt,
+                temperature and max_tokens
+
+    Returns:
+        str: hex SHA-256 digest
+    """
+    encoded = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """SQLite backed key/value cache with TTL and LRU eviction"""
+
+    def __init__(self, path: str = None, maxEntries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL, enabled: bool = None):
+        self.path = path or os.environ.get("REVISION_CACHE_PATH", DEFAULT_PATH)
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        if enabled is None:
+            enabled = os.environ.get("REVISION_CACHE_BYPASS", "") in ("", "0")
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Returns the cached value or None on a miss (or when bypassed)"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # drop expired rows, then the least recently used ones above the cap
+        expired = self._conn.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,)).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxEntries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (excess,)
+            )
+        self.evictions += expired + max(excess, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'enabled': self.enabled
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def getRevisionCache() -> DiskCache:
+    """
+    Returns the process-wide cache used for tweet revisions, created on first use
+    """
+    global _revisionCache
+    if _revisionCache is None:
+        with _revisionCacheLock:
+            if _revisionCache is None:
+                _revisionCache = DiskCache()
+    return _revisionCache
+
+
+def getShortenerCache() -> DiskCache:
+    """
+    Returns the process-wide long url -> short url cache, created on first use
+
+    Stored in .shortener_cache.sqlite unless SHORTENER_CACHE_PATH is set,
+    SHORTENER_CACHE_BYPASS=1 skips it (REVISION_CACHE_BYPASS does not).
+    """
+    global _shortenerCache
+    if _shortenerCache is None:
+        with _revisionCacheLock:
+            if _shortenerCache is None:
+                _shortenerCache = DiskCache(
+                    os.environ.get("SHORTENER_CACHE_PATH", SHORTENER_CACHE_PATH),
+                    ttl=SHORTENER_CACHE_TTL,
+                    enabled=os.environ.get("SHORTENER_CACHE_BYPASS", "") in ("", "0")
+                )
+    return _shortenerCache
@@ -1,25 +1,64 @@
 import email
+from concurrent.futures import ProcessPoolExecutor
 from email import policy
+from email.parser import BytesFeedParser, BytesHeaderParser
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import os
 import time
+from typing import Optional
 
 from parseEmailSections import parseSections
 from twitterPost import TwitterPoster
 
 def read_eml_file(file_path: str):
+    # Parse the raw bytes once with the default policy; each part's own
+    # charset is applied when its payload is decoded, so there is no
+    # whole-file text decode that can fail and force a second read
+    with open(file_path, 'rb') as file:
+        msg = email.message_from_binary_file(file, policy=policy.default)
+        return msg
 
+
+def decode_part(part) -> str:
+    """Decode a text part's payload with the charset it declares"""
+    payload = part.get_payload(decode=True)
+    if not payload:
+        return ''
+    charset = part.get_content_charset() or 'utf-8'
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            # Parse the email using the default policy
-            msg = email.message_from_file(file, policy=policy.default)
-            return msg
-    except UnicodeDecodeError:
-        # If UTF-8 fails, try with different encoding
-        with open(file_path, 'r', encoding='latin-1') as file:
-            msg = email.message_from_file(file, policy=policy.default)
-            return msg
+        return payload.decode(charset, errors='ignore')
+    except LookupError:
+        # unknown charset name
+        return payload.decode('utf-8', errors='ignore')
+
+
+def payload_size(part) -> int:
+    """
+    Size in bytes of a part's decoded payload, worked out from the encoded
+    payload without decoding or copying it (except for quoted-printable)
+    """
+    encoded = part.get_payload(decode=False)
+    if not isinstance(encoded, str):
+        return 0
+
+    encoding = str(part.get('Content-Transfer-Encoding', '7bit')).strip().lower()
+    if encoding == 'base64':
+        # every 4 base64 characters carry 3 bytes, less the '=' padding
+        whitespace = sum(encoded.count(c) for c in '\r\n\t ')
+        chars = len(encoded) - whitespace
+        padding = 0
+        end = len(encoded) - 1
+        while end >= 0 and padding < 2 and encoded[end] in '=\r\n\t ':
+            if encoded[end] == '=':
+                padding += 1
+            end -= 1
+        return max(chars // 4 * 3 - padding, 0)
+    if encoding == 'quoted-printable':
+        payload = part.get_payload(decode=True)
+        return len(payload) if payload else 0
+    # 7bit/8bit/binary: non-ascii bytes are kept as one surrogate each
+    return len(encoded)
 
 
 def extract_email_info(msg) -> dict:
@@ -44,15 +83,15 @@ def extract_email_info(msg) -> dict:
 
             # Extract text body
             if content_type == "text/plain" and "attachment" not in content_disposition:
-                body = part.get_payload(decode=True)
+                body = decode_part(part)
                 if body:
-                    info['body'] = body.decode('utf-8', errors='ignore')
+                    info['body'] = body
 
             # Extract HTML body
             elif content_type == "text/html" and "attachment" not in content_disposition:
-                html_body = part.get_payload(decode=True)
+                html_body = decode_part(part)
                 if html_body:
-                    info['html_body'] = html_body.decode('utf-8', errors='ignore')
+                    info['html_body'] = html_body
 
             # Extract attachments
             elif "attachment" in content_disposition:
@@ -61,22 +100,141 @@ def extract_email_info(msg) -> dict:
                     info['attachments'].append({
                         'filename': filename,
                         'content_type': content_type,
-                        'size': len(part.get_payload(decode=True)) if part.get_payload(decode=True) else 0
+                        'size': payload_size(part)
                     })
     else:
         # Single part message
         content_type = msg.get_content_type()
         if content_type == "text/plain":
-            body = msg.get_payload(decode=True)
-            if body:
-                info['body'] = body.decode('utf-8', errors='ignore')
+            info['body'] = decode_part(msg)
         elif content_type == "text/html":
-            html_body = msg.get_payload(decode=True)
-            if html_body:
-                info['html_body'] = html_body.decode('utf-8', errors='ignore')
+            info['html_body'] = decode_part(msg)
 
     return info
 
+def find_html_part(msg):
+    """
+    Returns the first non-attachment text/html part, or None
+
+    Parts are visited lazily in walk order, so the search stops as soon as
+    the html is found and attachment payloads are never decoded.
+    """
+    for part in msg.walk():
+        if part.is_multipart():
+            continue
+        if part.get_content_type() == "text/html" and \
+                "attachment" not in str(part.get("Content-Disposition")):
+            return part
+    return None
+
+
+def read_eml_html(file_path: str):
+    """
+    Parse just enough of an .eml to get its headers and html body
+
+    Bodies of attachments and of every other non-multipart part are dropped
+    as the file is read, and reading stops once the first html part is
+    complete, so large images or PDFs are never buffered or parsed.
+
+    Returns:
+        EmailMessage: the top-level headers, the multipart structure up to
+                      the html part, and that part's payload
+    """
+    parser = BytesFeedParser(policy=policy.default)
+    boundaries = []     # delimiters of the enclosing multiparts, innermost last
+    header = []
+    inHeader = True
+    inHtml = False
+    skip = False
+
+    with open(file_path, 'rb') as file:
+        for line in file:
+            if inHeader:
+                parser.feed(line)
+                header.append(line)
+                if line.strip():
+                    continue
+                inHeader = False
+                part = BytesHeaderParser(policy=policy.default).parsebytes(b''.join(header))
+                header = []
+                if part.get_content_maintype() == 'multipart' and part.get_boundary():
+                    boundaries.append(b'--' + part.get_boundary().encode('ascii', 'ignore'))
+                    skip = False
+                else:
+                    inHtml = part.get_content_type() == "text/html" and \
+                        "attachment" not in str(part.get("Content-Disposition"))
+                    skip = not inHtml
+                continue
+
+            marker = line.rstrip()
+            depth = next((i for i in range(len(boundaries) - 1, -1, -1)
+                          if marker in (boundaries[i], boundaries[i] + b'--')), None)
+            if depth is None:
+                if not skip:
+                    parser.feed(line)
+                continue
+
+            parser.feed(line)
+            if inHtml:
+                break  # html part complete, the rest is not needed
+            if marker == boundaries[depth] + b'--':
+                del boundaries[depth:]
+                skip = False    # epilogue of the enclosing multipart
+            else:
+                del boundaries[depth + 1:]
+                inHeader = True
+
+    return parser.close()
+
+
+class EmailView:
+    """
+    Lazy view of an .eml file
+
+    subject and html_body come from read_eml_html, which never reads past the
+    html part; the full message and the extract_email_info dict (text body,
+    every attachment) are only parsed the first time msg or info is used.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._msg = None
+        self._html_msg = None
+        self._html_body = None
+        self._info = None
+
+    @property
+    def msg(self):
+        if self._msg is None:
+            self._msg = read_eml_file(self.file_path)
+        return self._msg
+
+    def _headers(self):
+        # either parse carries the top-level headers
+        if self._msg is not None:
+            return self._msg
+        if self._html_msg is None:
+            self._html_msg = read_eml_html(self.file_path)
+        return self._html_msg
+
+    @property
+    def subject(self) -> str:
+        return self._headers().get('Subject', 'No Subject')
+
+    @property
+    def html_body(self) -> str:
+        if self._html_body is None:
+            part = find_html_part(self._headers())
+            self._html_body = decode_part(part) if part is not None else ''
+        return self._html_body
+
+    @property
+    def info(self) -> dict:
+        if self._info is None:
+            self._info = extract_email_info(self.msg)
+        return self._info
+
+
 def moveLatestEmlFile() -> None:
     # Get a list of all .eml files in the current directory
     latestEmlFileDir = os.environ.get("LATEST_EML_FILE_DIR", ".")
@@ -91,24 +249,180 @@ def moveLatestEmlFile() -> None:
     #return latest_file
 
 
-def getEmailHtmlBody() -> str:
-    # Replace with your .eml file path
-    eml_file_path = "latest.eml"
-    moveLatestEmlFile()
+def getEmailHtmlBody(eml_file_path: str = None, jobs=None) -> str:
+    # without a path, move the next .eml from LATEST_EML_FILE_DIR to
+    # latest.eml, unless a failed run left one there to retry first
+    if eml_file_path is None:
+        eml_file_path = "latest.eml"
+        if not os.path.exists(eml_file_path):
+            moveLatestEmlFile()
 
     try:
-        # Read the .eml file
-        email_message = read_eml_file(eml_file_path)
+        # Read the .eml file, only the html part gets decoded
+        email_view = EmailView(eml_file_path)
+        html_body = email_view.html_body
 
-        # Extract email information
-        email_info = extract_email_info(email_message)
+        # keep the message in the job queue before the file is removed
+        if jobs is not None:
+            jobs.add_message(os.path.basename(unclaimedPath(eml_file_path)), email_view.subject, html_body)
 
     except FileNotFoundError:
         print(f"Error: File '{eml_file_path}' not found.")
+        raise
     except Exception as e:
+        # the file stays, the next run tries it again
         print(f"Error reading .eml file: {str(e)}")
+        raise
 
     os.remove(eml_file_path)
-    return email_info['html_body']
+    return html_body
+
+
+def pendingEmlFiles(directory: str = None) -> list:
+    """
+    Returns the paths of every .eml waiting in LATEST_EML_FILE_DIR, oldest first
+    """
+    directory = directory or os.environ.get("LATEST_EML_FILE_DIR", ".")
+    paths = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.eml')]
+    return sorted(paths, key=os.path.getmtime)
+
+
+CLAIM_SUFFIX = ".processing"
+
+
+def claimEmlFile(path: str):
+    """
+    Atomically take ownership of a pending .eml by renaming it
+
+    The claimed name carries this process's id, see reclaimStaleEmlFiles.
+
+    Returns:
+        str: the claimed path, or None if another process got there first
+    """
+    claimed = f"{path}.{os.getpid()}{CLAIM_SUFFIX}"
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def unclaimedPath(claimed: str) -> str:
+    """The .eml path a file had before claimEmlFile renamed it"""
+    if not claimed.endswith(CLAIM_SUFFIX):
+        return claimed
+    base = claimed[:-len(CLAIM_SUFFIX)]
+    head, _, pid = base.rpartition('.')
+    return head if pid.isdigit() else base
+
+
+def _claimOwner(claimed: str) -> Optional[int]:
+    pid = claimed[:-len(CLAIM_SUFFIX)].rpartition('.')[2]
+    return int(pid) if pid.isdigit() else None
+
+
+def _running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True     # alive, owned by another user
+    return True
+
+
+def reclaimStaleEmlFiles(directory: str = None) -> list:
+    """
+    Put back the .eml files claimed by a process that is no longer running
+
+    A run that is killed or crashes never renames its claims back, and only
+    .eml files are picked up.  Claims of this process (a restarted container
+    often gets the same id) and claims without a process id are stale too.
+
+    Returns:
+        list: the .eml paths put back
+    """
+    directory = directory or os.environ.get("LATEST_EML_FILE_DIR", ".")
+    reclaimed = []
+    for name in os.listdir(directory):
+        if not name.endswith(CLAIM_SUFFIX):
+            continue
+        claimed = os.path.join(directory, name)
+        owner = _claimOwner(claimed)
+        if owner is not None and owner != os.getpid() and _running(owner):
+            continue
+
+        path = unclaimedPath(claimed)
+        if os.path.exists(path):
+            print(f"❌ Not reclaiming {name}: {os.path.basename(path)} exists")
+            continue
+        try:
+            os.rename(claimed, path)
+        except FileNotFoundError:
+            continue    # another process reclaimed it first
+        print(f"♻️ Reclaimed {os.path.basename(path)} from an interrupted run")
+        reclaimed.append(path)
+    return reclaimed
+
+
+def _parseEmlFile(path: str):
+    # runs in a worker process: decode one message and parse its sections
+    try:
+        email_view = EmailView(path)
+        html_body = email_view.html_body
+        return email_view.subject, html_body, parseSections(html_body) or {}
+    except Exception as e:
+        print(f"Error reading .eml file {path}: {str(e)}")
+        return None
+
+
+def ingestEmlDirectory(directory: str = None, workers: int = None, jobs=None):
+    """
+    Decode and section-parse every pending .eml in parallel
+
+    Files are claimed up front, parsed across CPU cores with a process pool
+    and removed once parsed; a file that fails is put back for the next run.
+    Files an interrupted run left claimed are put back first.
+
+    Args:
+        directory (str, optional): defaults to LATEST_EML_FILE_DIR
+        workers (int, optional): worker processes, defaults to the CPU count
+        jobs (JobQueue, optional): each message is recorded before its file
+            is removed, and its unposted articles are yielded with their
+            'job' id
+
+    Yields:
+        dict: article dictionaries in message (oldest first) then section
+              order, labeled with 'source', 'subject' and 'section'
+    """
+    reclaimStaleEmlFiles(directory)
+    claimed = [c for c in (claimEmlFile(path) for path in pendingEmlFiles(directory)) if c]
+    if not claimed:
+        return
+
+    done = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map keeps the input order while the messages parse in parallel
+            for path, parsed in zip(claimed, pool.map(_parseEmlFile, claimed)):
+                if parsed is None:
+                    continue
 
+                subject, html_body, sections = parsed
+                source = os.path.basename(unclaimedPath(path))
+                if jobs is not None:
+                    messageId = jobs.add_message(source, subject, html_body, sections)
+                os.remove(path)
+                done.add(path)
 
+                if jobs is not None:
+                    yield from jobs.pending_articles(messageId)
+                    continue
+                for section, articles in sections.items():
+                    for article in articles:
+                        yield dict(article, source=source, subject=subject, section=section)
+    finally:
+        # failed files, and any the caller stopped before, go back in the queue
+        for path in claimed:
+            if path not in done and os.path.exists(path):
+                os.rename(path, unclaimedPath(path))
@@ -0,0 +1,146 @@
+"""
+Directory watcher for new newsletter .eml files.
+
+Watches LATEST_EML_FILE_DIR with inotify-style file events (through the
+optional watchdog package) and falls back to polling the directory when
+watchdog is not installed.  Each new file is claimed with an atomic rename so
+two watchers never process the same message, then handed to a callback.  A
+file whose processing fails is put back, and files a killed run left claimed
+are put back when the watcher starts.
+"""
+
+import os
+import queue
+import time
+
+from emailParse import claimEmlFile, pendingEmlFiles, reclaimStaleEmlFiles, unclaimedPath
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class _EmlEventHandler(FileSystemEventHandler):
+    """Queues .eml paths as they are written into or moved into the directory"""
+
+    def __init__(self, pending: queue.Queue):
+        super().__init__()
+        self.pending = pending
+
+    def _queue(self, path):
+        if path.endswith('.eml'):
+            self.pending.put(path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._queue(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self._queue(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._queue(event.dest_path)
+
+
+class EmlWatcher:
+    """Long-running watcher that feeds new .eml files to a callback"""
+
+    def __init__(self, onFile, directory: str = None, pollInterval: float = 10,
+                 settle: float = 2, usePolling: bool = False):
+        """
+        Args:
+            onFile (callable): called with the claimed path of each new message
+            directory (str, optional): defaults to LATEST_EML_FILE_DIR
+            pollInterval (float): seconds between directory scans when polling,
+                and between safety rescans when watching events
+            settle (float): a file must be unmodified this long before it is
+                claimed, so half-written messages are left alone
+            usePolling (bool): poll even if watchdog is available
+        """
+        self.onFile = onFile
+        self.directory = directory or os.environ.get("LATEST_EML_FILE_DIR", ".")
+        self.pollInterval = pollInterval
+        self.settle = settle
+        self.usePolling = usePolling or Observer is None
+        self.pending = queue.Queue()
+        self.running = False
+        self.observer = None
+
+    def _waitUntilSettled(self, path: str) -> bool:
+        while True:
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except FileNotFoundError:
+                return False
+            if age >= self.settle:
+                return True
+            time.sleep(self.settle - age)
+
+    def _process(self, path: str) -> None:
+        if not self._waitUntilSettled(path):
+            return
+        claimed = claimEmlFile(path)
+        if claimed is None:
+            return  # already taken by another watcher or run
+
+        print(f"📨 Processing {os.path.basename(path)}")
+        try:
+            self.onFile(claimed)
+        except Exception as e:
+            print(f"❌ Error processing {path}: {str(e)}")
+            # still there when it was not stored, tried again on a later scan
+            if os.path.exists(claimed):
+                os.rename(claimed, unclaimedPath(claimed))
+
+    def _rescan(self) -> None:
+        for path in pendingEmlFiles(self.directory):
+            self.pending.put(path)
+
+    def start(self) -> None:
+        self.running = True
+        if not self.usePolling:
+            self.observer = Observer()
+            self.observer.schedule(_EmlEventHandler(self.pending), self.directory, recursive=False)
+            self.observer.start()
+        print(f"👀 Watching {self.directory} ({'polling' if self.usePolling else 'file events'})")
+        # pick up whatever arrived while nothing was watching, or was left
+        # claimed by a run that was killed
+        reclaimStaleEmlFiles(self.directory)
+        self._rescan()
+
+    def stop(self) -> None:
+        self.running = False
+        self.pending.put(None)  # wake run_forever
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def run_forever(self) -> None:
+        """Process messages as they arrive until stop() or Ctrl-C"""
+        self.start()
+        lastScan = time.monotonic()
+        try:
+            while self.running:
+                try:
+                    path = self.pending.get(timeout=self.pollInterval)
+                except queue.Empty:
+                    path = None
+
+                if path is not None and os.path.exists(path):
+                    self._process(path)
+
+                # polling mode scans every interval; event mode rescans too,
+                # in case an event was missed
+                if time.monotonic() - lastScan >= self.pollInterval:
+                    self._rescan()
+                    lastScan = time.monotonic()
+        except KeyboardInterrupt:
+            print("Stopping watcher")
+        finally:
+            self.stop()
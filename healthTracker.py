@@ -0,0 +1,126 @@
+"""
+Rolling health of interchangeable backends.
+
+Keeps the latest latencies and outcomes of each backend (LLM providers, url
+shorteners, ...) in a fixed window, so callers can rank backends by median
+latency, derive a hedging delay from the p95 (the tail is what hedging is
+for), and skip a backend that keeps failing until its cooldown has passed.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class HealthTracker:
+    """Per-backend rolling latency and error rate with a failure cooldown"""
+
+    def __init__(self, window: int = 50, errorRate: float = 0.5, minSamples: int = 4,
+                 cooldown: float = 60.0, defaultLatency: float = 2.0, clock=time.monotonic):
+        """
+        Args:
+            window (int): latest calls kept per backend
+            errorRate (float): share of failed calls in the window that takes
+                a backend out of rotation
+            minSamples (int): calls needed before the error rate counts
+            cooldown (float): seconds an unhealthy backend is skipped
+            defaultLatency (float): latency assumed for a backend with no
+                successful calls yet
+            clock (callable): monotonic time source
+        """
+        self.window = window
+        self.errorRate = errorRate
+        self.minSamples = minSamples
+        self.cooldown = cooldown
+        self.defaultLatency = defaultLatency
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._outcomes = {}
+        self._downUntil = {}
+
+    def _window(self, table: dict, name: str) -> deque:
+        if name not in table:
+            table[name] = deque(maxlen=self.window)
+        return table[name]
+
+    def record(self, name: str, latency: Optional[float] = None, ok: Optional[bool] = True) -> None:
+        """
+        Record one call to a backend
+
+        Args:
+            name (str): backend name
+            latency (float, optional): seconds the call took, pass it for
+                successes and for calls abandoned while still running
+            ok (bool, optional): outcome, None records the latency only
+        """
+        with self._lock:
+            if latency is not None:
+                self._window(self._latencies, name).append(latency)
+            if ok is None:
+                return
+
+            outcomes = self._window(self._outcomes, name)
+            outcomes.append(ok)
+            if ok or len(outcomes) < self.minSamples:
+                return
+
+            rate = outcomes.count(False) / len(outcomes)
+            if rate >= self.errorRate:
+                self._downUntil[name] = self.clock() + self.cooldown
+                # judged afresh once the cooldown is over
+                outcomes.clear()
+                print(f"⚠️ {name} unhealthy ({rate:.0%} errors), skipping it for {self.cooldown:.0f} seconds")
+
+    def percentile(self, name: str, q: float) -> float:
+        """Latency percentile (0-100) over the window, defaultLatency without samples"""
+        with self._lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if not samples:
+            return self.defaultLatency
+        index = min(len(samples) - 1, max(0, int(round(q / 100 * len(samples))) - 1))
+        return samples[index]
+
+    def p95(self, name: str) -> float:
+        return self.percentile(name, 95)
+
+    def error_rate(self, name: str) -> float:
+        with self._lock:
+            outcomes = self._outcomes.get(name)
+            if not outcomes:
+                return 0.0
+            return outcomes.count(False) / len(outcomes)
+
+    def healthy(self, name: str) -> bool:
+        with self._lock:
+            return self.clock() >= self._downUntil.get(name, 0)
+
+    def rank(self, names: list) -> list:
+        """
+        Order backends best first
+
+        Healthy backends come first by median latency, ties keep the order
+        given; backends in cooldown follow, the one back soonest first, so
+        there is always something left to try.
+        """
+        healthy = [name for name in names if self.healthy(name)]
+        down = [name for name in names if name not in healthy]
+        healthy.sort(key=lambda name: self.percentile(name, 50))
+        with self._lock:
+            down.sort(key=lambda name: self._downUntil.get(name, 0))
+        return healthy + down
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = set(self._latencies) | set(self._outcomes)
+        return {
+            name: {
+                'p50': self.percentile(name, 50),
+                'p95': self.p95(name),
+                'error_rate': self.error_rate(name),
+                'healthy': self.healthy(name)
+            }
+            for name in sorted(names)
+        }
@@ -0,0 +1,290 @@
+"""
+Durable work queue with per-stage checkpoints.
+
+Every newsletter, article, revised chunk, submitted revision batch and posted
+tweet ID is recorded in a small SQLite file as soon as it is produced.  A message's html is stored
+before its .eml is removed, so a run that crashes halfway through a digest
+can be restarted: finished revisions are reused instead of calling the LLM
+again, and a partly posted thread carries on from its last tweet instead of
+being posted twice.
+
+The file defaults to .jobs.sqlite, set JOB_QUEUE_PATH to move it.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from parseEmailSections import parseSections
+
+
+DEFAULT_PATH = ".jobs.sqlite"
+
+
+class JobQueue:
+    """SQLite backed record of messages, articles, chunk revisions and posted tweets"""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get("JOB_QUEUE_PATH", DEFAULT_PATH)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY,"
+            " digest TEXT UNIQUE NOT NULL,"
+            " source TEXT,"
+            " subject TEXT,"
+            " html TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'new',"
+            " created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id INTEGER PRIMARY KEY,"
+            " message_id INTEGER NOT NULL REFERENCES messages (id),"
+            " seq INTEGER NOT NULL,"
+            " section TEXT,"
+            " title TEXT,"
+            " url TEXT,"
+            " description TEXT,"
+            " short_url TEXT,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " UNIQUE (message_id, seq));"
+            "CREATE TABLE IF NOT EXISTS revisions ("
+            " article_id INTEGER NOT NULL REFERENCES articles (id),"
+            " chunk INTEGER NOT NULL,"
+            " source TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " PRIMARY KEY (article_id, chunk));"
+            "CREATE TABLE IF NOT EXISTS tweets ("
+            " article_id INTEGER NOT NULL REFERENCES articles (id),"
+            " position INTEGER NOT NULL,"
+            " tweet_id TEXT NOT NULL,"
+            " posted REAL NOT NULL,"
+            " PRIMARY KEY (article_id, position));"
+            "CREATE TABLE IF NOT EXISTS batches ("
+            " batch_id TEXT NOT NULL,"
+            " message_id INTEGER NOT NULL REFERENCES messages (id),"
+            " status TEXT NOT NULL DEFAULT 'submitted',"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (batch_id, message_id));"
+            "CREATE INDEX IF NOT EXISTS articles_status ON articles (status, message_id, seq);"
+        )
+        self._conn.commit()
+
+    def add_message(self, source: str, subject: str, html: str, sections: dict = None) -> int:
+        """
+        Record a newsletter, call before its .eml is removed
+
+        A message is identified by its html, adding the same newsletter
+        again returns the existing row and does not queue its articles twice.
+
+        Args:
+            source (str): file name it came from
+            subject (str): message subject
+            html (str): html body
+            sections (dict, optional): parseSections output, parsed later by
+                                       pending_articles when not given
+
+        Returns:
+            int: message id
+        """
+        digest = hashlib.sha256(html.encode('utf-8', errors='surrogatepass')).hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO messages (digest, source, subject, html, created) VALUES (?, ?, ?, ?, ?)",
+                (digest, source, subject, html, time.time())
+            )
+            messageId = self._conn.execute("SELECT id FROM messages WHERE digest = ?", (digest,)).fetchone()[0]
+            if sections is not None:
+                self._addArticles(messageId, sections)
+            self._conn.commit()
+        return messageId
+
+    def _addArticles(self, messageId: int, sections: dict) -> None:
+        # only the first parse of a message queues its articles
+        status = self._conn.execute("SELECT status FROM messages WHERE id = ?", (messageId,)).fetchone()[0]
+        if status != 'new':
+            return
+
+        rows = []
+        for section, articles in (sections or {}).items():
+            for article in articles:
+                rows.append((messageId, len(rows), section, article['title'], article['url'],
+                             article['description']))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO articles (message_id, seq, section, title, url, description)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._conn.execute(
+            "UPDATE messages SET status = ? WHERE id = ?",
+            ('parsed' if rows else 'done', messageId)
+        )
+
+    def parse_pending(self, parse=parseSections) -> None:
+        """Parse the stored html of messages whose articles were never queued"""
+        with self._lock:
+            pending = self._conn.execute("SELECT id, html FROM messages WHERE status = 'new' ORDER BY id").fetchall()
+
+        for messageId, html in pending:
+            sections = parse(html) or {}
+            with self._lock:
+                self._addArticles(messageId, sections)
+                self._conn.commit()
+
+    def pending_articles(self, message_id: int = None) -> list:
+        """
+        Returns the articles that have not been posted yet, oldest message first
+
+        Articles are dictionaries like parseSections produces, labeled with
+        'section', 'source', 'subject' and their 'job' id.
+        """
+        self.parse_pending()
+
+        query = ("SELECT a.id, a.section, a.title, a.url, a.description, m.source, m.subject"
+                 " FROM articles a JOIN messages m ON m.id = a.message_id"
+                 " WHERE a.status = 'pending'")
+        params = ()
+        if message_id is not None:
+            query += " AND a.message_id = ?"
+            params = (message_id,)
+        query += " ORDER BY a.message_id, a.seq"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {
+                'title': title,
+                'url': url,
+                'description': description,
+                'section': section,
+                'source': source,
+                'subject': subject,
+                'job': articleId
+            }
+            for articleId, section, title, url, description, source, subject in rows
+        ]
+
+    def revisions(self, article_id: int) -> dict:
+        """Returns chunk index -> (chunk text, revised text) for an article"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk, source, text FROM revisions WHERE article_id = ?", (article_id,)
+            ).fetchall()
+        return {chunk: (source, text) for chunk, source, text in rows}
+
+    def save_revision(self, article_id: int, chunk: int, source: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO revisions (article_id, chunk, source, text) VALUES (?, ?, ?, ?)",
+                (article_id, chunk, source, text)
+            )
+            self._conn.commit()
+
+    def save_thread(self, article_id: int, source: str, texts: list) -> None:
+        """Replace an article's revisions with a whole thread revised from source"""
+        with self._lock:
+            self._conn.execute("DELETE FROM revisions WHERE article_id = ?", (article_id,))
+            self._conn.executemany(
+                "INSERT INTO revisions (article_id, chunk, source, text) VALUES (?, ?, ?, ?)",
+                [(article_id, index, source, text) for index, text in enumerate(texts)]
+            )
+            self._conn.commit()
+
+    def save_batch(self, batch_id: str, article_ids: list) -> None:
+        """Record a submitted revision batch against the messages of its articles"""
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO batches (batch_id, message_id, created)"
+                " SELECT ?, message_id, ? FROM articles WHERE id = ?",
+                [(batch_id, now, articleId) for articleId in article_ids]
+            )
+            self._conn.commit()
+
+    def open_batches(self, article_ids: list) -> list:
+        """Returns the ids of unfinished batches submitted for the messages of these articles, oldest first"""
+        ids = list(article_ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT b.batch_id FROM batches b"
+                " WHERE b.status = 'submitted' AND b.message_id IN"
+                f" (SELECT message_id FROM articles WHERE id IN ({', '.join('?' * len(ids))}))"
+                " GROUP BY b.batch_id ORDER BY MIN(b.created)",
+                ids
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def finish_batch(self, batch_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE batches SET status = ? WHERE batch_id = ?", (status, batch_id))
+            self._conn.commit()
+
+    def short_url(self, article_id: int):
+        """Returns the article's shortened url, or None if it was never shortened"""
+        with self._lock:
+            row = self._conn.execute("SELECT short_url FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_short_url(self, article_id: int, short_url: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE articles SET short_url = ? WHERE id = ?", (short_url, article_id))
+            self._conn.commit()
+
+    def posted_tweets(self, article_id: int) -> list:
+        """Returns the IDs of the article's tweets posted so far, in thread order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tweet_id FROM tweets WHERE article_id = ? ORDER BY position", (article_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def save_tweet(self, article_id: int, position: int, tweet_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tweets (article_id, position, tweet_id, posted) VALUES (?, ?, ?, ?)",
+                (article_id, position, str(tweet_id), time.time())
+            )
+            self._conn.commit()
+
+    def finish_article(self, article_id: int) -> None:
+        """Mark an article's thread as fully posted, and its message once none are left"""
+        with self._lock:
+            self._conn.execute("UPDATE articles SET status = 'posted' WHERE id = ?", (article_id,))
+            self._conn.execute(
+                "UPDATE messages SET status = 'done'"
+                " WHERE id = (SELECT message_id FROM articles WHERE id = ?)"
+                " AND NOT EXISTS (SELECT 1 FROM articles"
+                "                 WHERE message_id = messages.id AND status = 'pending')",
+                (article_id,)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM articles GROUP BY status"
+            ).fetchall())
+            messages = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            revisions = self._conn.execute("SELECT COUNT(*) FROM revisions").fetchone()[0]
+            tweets = self._conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+            batches = self._conn.execute(
+                "SELECT COUNT(DISTINCT batch_id) FROM batches WHERE status = 'submitted'"
+            ).fetchone()[0]
+        return {
+            'messages': messages,
+            'pending': counts.get('pending', 0),
+            'posted': counts.get('posted', 0),
+            'revisions': revisions,
+            'tweets': tweets,
+            'open_batches': batches
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,47 +1,121 @@
+import itertools
 import os
-import time
+import sys
 
-from emailParse import getEmailHtmlBody
-from parseEmailSections import parseSections
-from tweetFormatter import reviseArticleForTweet, trim, split_into_tweets
+from batchRevision import reviseSectionsBatch
+from dedupIndex import DedupIndex
+from diskCache import getRevisionCache
+from emailParse import getEmailHtmlBody, ingestEmlDirectory
+from emlWatcher import EmlWatcher
+from jobQueue import JobQueue
+from pipeline import Pipeline
+from providerRouter import routerFromEnv
+from revisionStage import RevisionStage
+from tweetFormatter import (REVISION_MAX_TOKENS, REVISION_PROMPT, THREAD_PROMPT, askThread, reviseArticleAsThread,
+                            reviseArticleForTweet, threadMaxTokens)
 from twitterPost import TwitterPoster
+from urlShortener import quick_shorten
+
+
+def loadSections(jobs):
+    # articles an interrupted run left unposted are picked up before new mail
+    # INGEST_MODE=all parses every pending .eml in parallel instead of one
+    if os.environ.get("INGEST_MODE", "") == "all":
+        resumed = jobs.pending_articles()
+        return itertools.chain(resumed, ingestEmlDirectory(jobs=jobs))
+
+    try:
+        getEmailHtmlBody(jobs=jobs)
+    except FileNotFoundError as e:
+        print(str(e))
+    #items = extract_table_data(body)
+    return jobs.pending_articles()
+
+
+def makeShortener():
+    # URL_SHORTENER=tinyurl|isgd|vgd shortens the article urls before posting,
+    # URL_SHORTENER=fastest uses whichever healthy service answers first
+    service = os.environ.get("URL_SHORTENER", "")
+    if service:
+        return lambda url: quick_shorten(url, service)
+    return None
+
+
+def makeStage(jobs):
+    # REVISION_PROVIDERS=openai,anthropic,ollama revises through a router that
+    # hedges slow providers and fails over from broken ones
+    # each article is revised with one call, REVISION_MODE=chunk makes one
+    # call per chunk instead
+    router = routerFromEnv(cache=getRevisionCache())
+    if router is None:
+        revise, ask = reviseArticleForTweet, askThread
+    else:
+        # answers sized like the single-client path, not the providers' default;
+        # a revision gets a whole tweet's budget since the providers do not
+        # report a cut-off answer, a cut-off thread fails parseThread anyway
+        revise = lambda article: router.ask_question(article, REVISION_PROMPT,
+                                                     max_tokens=REVISION_MAX_TOKENS)
+        ask = lambda question, parts: router.ask_question(question, THREAD_PROMPT,
+                                                          max_tokens=threadMaxTokens(question, parts))
+
+    reviseThread = None
+    if os.environ.get("REVISION_MODE", "") != "chunk":
+        reviseThread = lambda article, chunkLimit, revise: reviseArticleAsThread(
+            article, chunkLimit, revise=revise, ask=ask)
+
+    return RevisionStage(revise=revise, jobs=jobs, reviseThread=reviseThread)
+
+
+def runPipeline(pipeline, load):
+    # REVISION_MODE=batch revises the whole newsletter as one batch job, its
+    # id and answers are checkpointed and chunks it misses go to the stage
+    if os.environ.get("REVISION_MODE", "") == "batch":
+        pipeline.run_revised(reviseSectionsBatch(pipeline.unseen(load()), jobs=pipeline.jobs,
+                                                 stage=pipeline.revision))
+    else:
+        pipeline.run(load)
 
 
 def main():
     tweeter = TwitterPoster()
+    # every stage checkpoints to the job queue, a crashed run resumes
+    jobs = JobQueue()
+    # stories already posted from an earlier issue or section are skipped
+    dedup = DedupIndex()
 
-    body = getEmailHtmlBody()
-    items = parseSections(body)
-    #items = extract_table_data(body)
-    for k, v in items.items():
+    # parse, revise, shorten and post run as overlapping stages, so the next
+    # articles are revised while the current thread is posted and cooled down
+    with makeStage(jobs) as stage:
+        pipeline = Pipeline(tweeter, stage, shorten=makeShortener(), jobs=jobs, dedup=dedup)
+        runPipeline(pipeline, lambda: loadSections(jobs))
 
-        for item in v:
-            url = item['url']
-            article = item['description']
 
-            revisedTweets = [url]
-            tweets = split_into_tweets(article, 220)
+def watch():
+    # daemon mode: the poster, revision pool and LLM client stay up and each
+    # newsletter is processed as soon as it lands in LATEST_EML_FILE_DIR
+    tweeter = TwitterPoster()
+    shorten = makeShortener()
+    jobs = JobQueue()
+    dedup = DedupIndex()
 
-            for tweet in tweets:
-                try:
-                    revisedTweet = reviseArticleForTweet(tweet)
-                except:
-                    print("*************  FAILED ******************")
-                    continue
-                revisedTweets.append(revisedTweet)
+    with makeStage(jobs) as stage:
+        def process(path):
+            # stored before the pipeline starts, so a message that fails to
+            # load raises to the watcher and is put back for a later scan
+            getEmailHtmlBody(path, jobs)
+            runPipeline(Pipeline(tweeter, stage, shorten=shorten, jobs=jobs, dedup=dedup), jobs.pending_articles)
 
-            for i in range(3):
-                try:
-                    tweeter.post_thread(revisedTweets)
-                except (ValueError) as e:
-                    print(f"❌ Error posting tweet: {str(e)}")
-                    time.sleep(3)
-                    continue
-                break
+        # finish whatever an interrupted run left before waiting for mail
+        if jobs.pending_articles():
+            runPipeline(Pipeline(tweeter, stage, shorten=shorten, jobs=jobs, dedup=dedup), jobs.pending_articles)
 
-            time.sleep(20)
+        pollInterval = float(os.environ.get("WATCH_POLL_INTERVAL", 10))
+        EmlWatcher(process, pollInterval=pollInterval).run_forever()
 
 
 # Example usage
 if __name__ == "__main__":
-    main()
+    if "--watch" in sys.argv:
+        watch()
+    else:
+        main()
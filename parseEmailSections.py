@@ -6,22 +6,105 @@ Parse email.html file and extract specific sections:
 - Quick Links
 """
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 import re
 import os
 
+from urlCanonical import canonicalUrl
+
+
+SECTION_NAMES = [
+    "Attacks & Vulnerabilities",
+    "Strategies & Tactics",
+    "Miscellaneous",
+    "Quick Links"
+]
+
+# links containing any of these are navigation/referral links, not articles
+SKIP_TERMS = ['refer.', 'advertise', 'unsubscribe', 'manage']
+
+
+def matchSection(header_text):
+    """Returns the section name a header belongs to, or None"""
+    if "Attacks" in header_text and "Vulnerabilities" in header_text:
+        return "Attacks & Vulnerabilities"
+    elif "Strategies" in header_text and "Tactics" in header_text:
+        return "Strategies & Tactics"
+    elif "Miscellaneous" in header_text:
+        return "Miscellaneous"
+    elif "Quick Links" in header_text:
+        return "Quick Links"
+    return None
+
+
+def isSkippedHref(href):
+    lowered = href.lower()
+    return any(skip_term in lowered for skip_term in SKIP_TERMS)
+
+
+# compiled once, used for every fragment of every text-block
+WHITESPACE_RE = re.compile(r'\s+')
+ENTITY_RE = re.compile(r'&[a-zA-Z0-9#]+;')
+
+
+def blockTextParts(strings):
+    """
+    Clean the strings of a text-block once, for all the links it holds
+
+    Args:
+        strings: every string inside the text-block div
+
+    Returns:
+        list: (stripped text, cleaned text) for each meaningful string
+    """
+    parts = []
+    for element in strings:
+        text = element.strip()
+        # Skip empty strings and bare urls
+        if text and not text.startswith('http'):
+            # Clean up the text
+            cleaned_text = WHITESPACE_RE.sub(' ', text).strip()
+            if len(cleaned_text) > 10:  # Only add meaningful text
+                parts.append((text, cleaned_text))
+    return parts
+
+
+def descriptionFromParts(parts, title):
+    """Join a text-block's cleaned parts into the description of one of its articles"""
+    # Skip the title text
+    text_parts = [cleaned_text for text, cleaned_text in parts if text != title]
+    if not text_parts:
+        return ""
+
+    description = ' '.join(text_parts)
+    # Remove HTML entities and clean up
+    if '&' in description:
+        description = ENTITY_RE.sub(' ', description)
+        description = WHITESPACE_RE.sub(' ', description).strip()
+    return description
+
+
+def buildDescription(strings, title):
+    """
+    Build an article description from the strings of its text-block
+
+    Args:
+        strings: every string inside the text-block div
+        title (str): the article title, left out of the description
+
+    Returns:
+        str: cleaned description text
+    """
+    return descriptionFromParts(blockTextParts(strings), title)
+
+
 def parse_email_sections(html_content):
 
     # Parse HTML with BeautifulSoup
     soup = BeautifulSoup(html_content, 'html.parser')
 
     # Dictionary to store extracted sections
-    sections = {
-        "Attacks & Vulnerabilities": [],
-        "Strategies & Tactics": [],
-        "Miscellaneous": [],
-        "Quick Links": []
-    }
+    sections = {name: [] for name in SECTION_NAMES}
 
     # Find all h1 elements which contain section headers
     section_headers = soup.find_all('h1')
@@ -33,53 +116,48 @@ def parse_email_sections(html_content):
         header_text = header.get_text(strip=True)
 
         # Check if this header matches one of our target sections
-        if "Attacks" in header_text and "Vulnerabilities" in header_text:
-            current_section = "Attacks & Vulnerabilities"
-        elif "Strategies" in header_text and "Tactics" in header_text:
-            current_section = "Strategies & Tactics"
-        elif "Miscellaneous" in header_text:
-            current_section = "Miscellaneous"
-        elif "Quick Links" in header_text:
-            current_section = "Quick Links"
-        else:
-            current_section = None
+        current_section = matchSection(header_text)
+        if current_section is None:
             continue
 
-        if current_section:
-            # Find the parent table/container that contains this section
-            section_container = header.find_parent('table')
-            if section_container:
-                # Find the next sibling table that contains the actual content
-                content_table = section_container.find_next_sibling('table')
-                if content_table:
-                    articles = extract_articles_from_table(content_table)
-                    sections[current_section].extend(articles)
+        # Find the parent table/container that contains this section
+        section_container = header.find_parent('table')
+        if section_container:
+            # Find the next sibling table that contains the actual content
+            content_table = section_container.find_next_sibling('table')
+            if content_table:
+                articles = extract_articles_from_table(content_table)
+                sections[current_section].extend(articles)
 
     return sections
 
 
 def fixUpHref(href):
     # href is 'https://tracking.tldrnewsletter.com/CL0/https:%2F%2Fwww.bleepingcomputer.com%2Fnews%2Fsecurity%2Fnetherlands-citrix-netscaler-flaw-cve-2025-6543-exploited-to-breach-orgs%2F%3Futm_source=tldrinfosec/1/01000198a38abf5c-1df751a1-4ff3-45f8-9a34-6ef5f324d7f4-000000/yCsUCrlwhItaPww2IcSKVDOt_jS-GXFAehMaXQmiK1A=418'
-    scheme = 'https'
-    if href.startswith('http://'):
-        parts = href.split('http')
-        scheme = 'http'
-    else:
-        parts = href.split('https')
-
-    numParts = len(parts)
-    urlIndex = 2
-    if numParts == 2: # there is only one https
-        urlIndex = 1
-    part = parts[urlIndex].replace('%2F', '/')
-    part = part.split('%3F')[0]
-    return scheme + part
+    # and the article is https://www.bleepingcomputer.com/news/security/netherlands-...-orgs/
+    return canonicalUrl(href)
+
+
+def _textBlockOf(link):
+    # nearest enclosing <div class="text-block">, walked directly instead of
+    # going through find_parent's filter machinery
+    for parent in link.parents:
+        if parent.name == 'div':
+            classes = parent.get('class') or []
+            if isinstance(classes, str):
+                classes = classes.split()
+            if 'text-block' in classes:
+                return parent
+    return None
 
 
 def extract_articles_from_table(table):
     """
     Extract article information from a content table.
 
+    The table is walked once to find its links, and each text-block's
+    strings are walked and cleaned once, however many links it holds.
+
     Args:
         table: BeautifulSoup table element
 
@@ -87,18 +165,19 @@ def extract_articles_from_table(table):
         list: List of article dictionaries
     """
     articles = []
+    block_parts = {}  # id(text-block div) -> blockTextParts
 
     # Find all links within the table that have article titles
-    article_links = table.find_all('a', href=True)
+    article_links = [tag for tag in table.descendants if tag.name == 'a' and tag.get('href') is not None]
 
     for link in article_links:
         # Skip navigation links and referral links
         href = link.get('href', '')
-        if any(skip_term in href.lower() for skip_term in ['refer.', 'advertise', 'unsubscribe', 'manage']):
+        if isSkippedHref(href):
             continue
 
         # Get the article title from the strong tag within the link
-        strong_tag = link.find('strong')
+        strong_tag = next((tag for tag in link.descendants if tag.name == 'strong'), None)
         if strong_tag:
             title = strong_tag.get_text(strip=True)
 
@@ -106,25 +185,14 @@ def extract_articles_from_table(table):
             description = ""
 
             # Look for the next span with description text
-            parent_div = link.find_parent('div', class_='text-block')
+            parent_div = _textBlockOf(link)
             if parent_div:
-                # Get all text after the link, excluding the title
-                text_parts = []
-                for element in parent_div.find_all(string=True):
-                    text = element.strip()
-                    # Skip the title text and empty strings
-                    if text and text != title and not text.startswith('http'):
-                        # Clean up the text
-                        cleaned_text = re.sub(r'\s+', ' ', text).strip()
-                        if cleaned_text and len(cleaned_text) > 10:  # Only add meaningful text
-                            text_parts.append(cleaned_text)
-
-                # Join the text parts and clean up
-                if text_parts:
-                    description = ' '.join(text_parts)
-                    # Remove HTML entities and clean up
-                    description = re.sub(r'&[a-zA-Z0-9#]+;', ' ', description)
-                    description = re.sub(r'\s+', ' ', description).strip()
+                parts = block_parts.get(id(parent_div))
+                if parts is None:
+                    strings = [node for node in parent_div.descendants if isinstance(node, NavigableString)]
+                    parts = blockTextParts(strings)
+                    block_parts[id(parent_div)] = parts
+                description = descriptionFromParts(parts, title)
 
             if title:  # Only add if we have a title
                 article = {
@@ -137,12 +205,19 @@ def extract_articles_from_table(table):
     return articles
 
 
-def parseSections(html_content):
+def parseSections(html_content, backend=None):
     # main function to call from your code
+    # backend 'bs4' (default) builds a BeautifulSoup tree, 'stream' uses the
+    # single-pass event driven extractor; SECTION_PARSER picks the default
+    backend = backend or os.environ.get("SECTION_PARSER", "bs4")
     try:
         # Parse the email sections
         print("Parsing email.html file...")
-        sections = parse_email_sections(html_content)
+        if backend == "stream":
+            from streamSectionParser import parse_email_sections_stream
+            sections = parse_email_sections_stream(html_content)
+        else:
+            sections = parse_email_sections(html_content)
         return sections
 
     except Exception as e:
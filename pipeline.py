@@ -0,0 +1,222 @@
+"""
+Pipelined parse -> revise -> shorten -> post.
+
+Each stage runs in its own thread and hands work to the next one through a
+bounded queue, so the LLM revision of article N+1 (and the ones after it, up
+to the queue size) overlaps the posting and cooldown of article N.  Wall-clock
+time is then set by the posting rate instead of the sum of every stage.
+
+Given a job queue, the shortened url and every posted tweet ID of an article
+are checkpointed, so a restarted run continues a partly posted thread instead
+of posting it again.  Given a dedup index, articles already seen in an
+earlier issue or another section are dropped before they are revised.
+"""
+
+import queue
+import threading
+import time
+
+
+_DONE = object()
+
+
+class Pipeline:
+    """Overlapping parse/revise/shorten/post stages connected by bounded queues"""
+
+    def __init__(self, poster, revision=None, shorten=None, queueSize: int = 4,
+                 cooldown: float = 0, retries: int = 3, jobs=None, dedup=None):
+        """
+        Args:
+            poster: TwitterPoster used by the post stage
+            revision: RevisionStage whose pool revises the chunks
+            shorten (callable, optional): long url -> short url, urls are
+                posted unchanged when not given
+            queueSize (int): max articles waiting between two stages
+            cooldown (float): extra seconds to wait after each posted thread,
+                the poster's rate-limit scheduler already paces the tweets
+            retries (int): attempts per thread in the post stage
+            jobs (JobQueue, optional): checkpoints articles labeled with a
+                'job' id, see jobQueue
+            dedup (DedupIndex, optional): skips articles seen before
+        """
+        self.poster = poster
+        self.revision = revision
+        self.shorten = shorten
+        self.queueSize = queueSize
+        self.cooldown = cooldown
+        self.retries = retries
+        self.jobs = jobs
+        self.dedup = dedup
+        self.posted = 0
+        self.skipped = 0
+
+    def _job(self, item):
+        return item.get('job') if self.jobs is not None and isinstance(item, dict) else None
+
+    def unseen(self, items):
+        """
+        Drop the articles the dedup index has seen before
+
+        Args:
+            items: parseSections output or an iterable of articles
+
+        Yields:
+            dict: the new articles, recorded in the index as they pass
+        """
+        if isinstance(items, dict):
+            items = (item for v in items.values() for item in v)
+        for item in items:
+            job = self._job(item)
+            earlier = self.dedup.check_and_add(item, owner=job) if self.dedup is not None else None
+            if earlier is None:
+                yield item
+                continue
+
+            print(f"⏭️ Skipping {item.get('title')}: already seen as {earlier['url']} ({earlier['reason']})")
+            self.skipped += 1
+            if job is not None:
+                self.jobs.finish_article(job)
+
+    def _startStage(self, target, *args) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def _parseStage(self, loadSections, outQ: queue.Queue):
+        try:
+            # parseSections output, or any iterable of articles such as
+            # ingestEmlDirectory's stream
+            for item in self.unseen(loadSections() or {}):
+                outQ.put(item)
+        except Exception as e:
+            print(f"❌ Error parsing sections: {str(e)}")
+        finally:
+            outQ.put(_DONE)
+
+    def _reviseStage(self, inQ: queue.Queue, outQ: queue.Queue):
+        # submits an article's chunks to the revision pool and moves on, the
+        # bounded outQ limits how many articles are being revised ahead
+        while True:
+            item = inQ.get()
+            if item is _DONE:
+                outQ.put(_DONE)
+                return
+            try:
+                outQ.put((item, self.revision.submit(item)))
+            except Exception as e:
+                print(f"❌ Error revising article {item.get('title')}: {str(e)}")
+
+    def _collectStage(self, inQ: queue.Queue, outQ: queue.Queue):
+        while True:
+            work = inQ.get()
+            if work is _DONE:
+                outQ.put(_DONE)
+                return
+            item, futures = work
+            revisedTweets = self.revision.collect(item, futures)
+            # an article missing a chunk is not posted and stays pending
+            if revisedTweets is not None:
+                outQ.put((item, revisedTweets))
+
+    def _shortenStage(self, inQ: queue.Queue, outQ: queue.Queue):
+        while True:
+            work = inQ.get()
+            if work is _DONE:
+                outQ.put(_DONE)
+                return
+            item, revisedTweets = work
+            if self.shorten:
+                job = self._job(item)
+                try:
+                    shortUrl = self.jobs.short_url(job) if job is not None else None
+                    if shortUrl is None:
+                        shortUrl = self.shorten(revisedTweets[0])
+                        if job is not None:
+                            self.jobs.save_short_url(job, shortUrl)
+                    revisedTweets = [shortUrl] + revisedTweets[1:]
+                except Exception as e:
+                    print(f"❌ Error shortening {revisedTweets[0]}: {str(e)}")
+            outQ.put((item, revisedTweets))
+
+    def post(self, revisedTweets: list, job: int = None) -> None:
+        for i in range(self.retries):
+            try:
+                if job is None:
+                    self.poster.post_thread(revisedTweets)
+                else:
+                    self._postJob(revisedTweets, job)
+            except (ValueError) as e:
+                # no fixed back-off, the retry waits on the rate-limit budget
+                print(f"❌ Error posting tweet: {str(e)}")
+                continue
+            self.posted += 1
+            break
+
+        if self.cooldown:
+            time.sleep(self.cooldown)
+
+    def _postJob(self, revisedTweets: list, job: int) -> None:
+        # carry on from the last tweet that made it out, in this run or an
+        # earlier one, recording each tweet ID as soon as it is posted
+        posted = self.jobs.posted_tweets(job)
+        remaining = revisedTweets[len(posted):]
+        if remaining:
+            self.poster.post_thread(
+                remaining,
+                reply_to_id=posted[-1] if posted else None,
+                on_posted=lambda index, tweetId: self.jobs.save_tweet(job, len(posted) + index, tweetId)
+            )
+        self.jobs.finish_article(job)
+
+    def _postStage(self, inQ: queue.Queue):
+        while True:
+            work = inQ.get()
+            if work is _DONE:
+                return
+            item, revisedTweets = work
+            self.post(revisedTweets, self._job(item))
+
+    def run(self, loadSections) -> int:
+        """
+        Run every stage until the newsletter is posted
+
+        Args:
+            loadSections (callable): returns parseSections output (or an
+                iterable of articles), called in the parse stage
+
+        Returns:
+            int: number of threads posted
+        """
+        articleQ = queue.Queue(self.queueSize)
+        revisingQ = queue.Queue(self.queueSize)
+        revisedQ = queue.Queue(self.queueSize)
+        postQ = queue.Queue(self.queueSize)
+
+        self._startStage(self._parseStage, loadSections, articleQ)
+        self._startStage(self._reviseStage, articleQ, revisingQ)
+        self._startStage(self._collectStage, revisingQ, revisedQ)
+        self._startStage(self._shortenStage, revisedQ, postQ)
+        self._postStage(postQ)
+        return self.posted
+
+    def run_revised(self, revised) -> int:
+        """
+        Shorten and post threads that were revised elsewhere (e.g. batch mode)
+
+        Args:
+            revised (iterable): (item, revisedTweets) tuples
+        """
+        revisedQ = queue.Queue(self.queueSize)
+        postQ = queue.Queue(self.queueSize)
+
+        def feed():
+            try:
+                for work in revised:
+                    revisedQ.put(work)
+            finally:
+                revisedQ.put(_DONE)
+
+        self._startStage(feed)
+        self._startStage(self._shortenStage, revisedQ, postQ)
+        self._postStage(postQ)
+        return self.posted
@@ -0,0 +1,230 @@
+"""
+Latency-aware routing across aiClient providers.
+
+A question goes to the best ranked provider (HealthTracker: healthy first,
+lowest median latency first).  If no answer has arrived after that provider's
+p95, a hedged copy goes to the next best one and whichever answers first
+wins.  A failed call fails over to the next provider straight away, and a
+provider that keeps failing sits out a cooldown.  A vendor that degrades then
+costs about one p95 of extra latency instead of stalling the pipeline.
+
+Set REVISION_PROVIDERS (e.g. "openai,anthropic,ollama") to revise through a
+router instead of the single OpenAI client.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+
+from aiClient import Anthropic, Ollama, OpenAI
+from healthTracker import HealthTracker
+
+
+PROVIDERS = {
+    'openai': OpenAI,
+    'anthropic': Anthropic,
+    'ollama': Ollama
+}
+
+
+class ProviderRouter:
+    """Hedged, failover routing of questions over several providers"""
+
+    def __init__(self, providers, tracker: Optional[HealthTracker] = None, hedge: bool = True,
+                 minHedgeDelay: float = 0.05, poolSize: int = 32):
+        """
+        Args:
+            providers: dict of name -> provider, or a list of providers (named
+                by their class), in order of preference
+            tracker (HealthTracker, optional): shared health statistics
+            hedge (bool): send a hedged request after the primary's p95
+            minHedgeDelay (float): lower bound of the hedging delay in seconds
+            poolSize (int): threads for the blocking ask_question calls
+        """
+        if not isinstance(providers, dict):
+            providers = {type(p).__name__.lower(): p for p in providers}
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+
+        self.providers = providers
+        self.tracker = tracker or HealthTracker()
+        self.hedge = hedge
+        self.minHedgeDelay = minHedgeDelay
+        self.hedges = 0
+        self.failovers = 0
+        # blocking calls run here, the hedge needs the primary to be waited on
+        self._pool = ThreadPoolExecutor(max_workers=poolSize)
+
+    def hedgeDelay(self, name: str) -> float:
+        return max(self.minHedgeDelay, self.tracker.p95(name))
+
+    def _order(self) -> list:
+        return self.tracker.rank(list(self.providers))
+
+    def _timed(self, name: str, question: str, context: Optional[str], max_tokens: Optional[int]):
+        start = time.monotonic()
+        try:
+            answer = self.providers[name].ask_question(question, context, max_tokens=max_tokens)
+        except Exception:
+            self.tracker.record(name, ok=False)
+            raise
+        self.tracker.record(name, time.monotonic() - start)
+        return answer
+
+    def ask_question(self, question: str, context: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        Ask the best provider, hedging and failing over as needed
+
+        Blocking version for thread pools such as RevisionStage.  A request
+        that loses the race still runs to the end in the background, its
+        latency is recorded when it does.
+        """
+        order = self._order()
+        pending = {}
+        errors = []
+
+        def launch():
+            name = order.pop(0)
+            pending[self._pool.submit(self._timed, name, question, context, max_tokens)] = name
+            return name
+
+        primary = launch()
+        hedged = False
+        while pending:
+            delay = self.hedgeDelay(primary) if self.hedge and order and not hedged else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                self.hedges += 1
+                launch()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {str(e)}")
+                    continue
+                for other in pending:
+                    other.cancel()
+                return answer
+
+            if not pending and order:
+                self.failovers += 1
+                primary = launch()
+
+        raise Exception(f"All providers failed: {'; '.join(errors)}")
+
+    async def _timedAsync(self, name: str, question: str, context: Optional[str], timeout: Optional[float],
+                          max_tokens: Optional[int]):
+        start = time.monotonic()
+        try:
+            answer = await self.providers[name].ask_question_async(question, context, timeout=timeout,
+                                                                   max_tokens=max_tokens)
+        except asyncio.CancelledError:
+            # lost the race: still tells how slow the provider is
+            self.tracker.record(name, time.monotonic() - start, ok=None)
+            raise
+        except Exception:
+            self.tracker.record(name, ok=False)
+            raise
+        self.tracker.record(name, time.monotonic() - start)
+        return answer
+
+    async def ask_question_async(self, question: str, context: Optional[str] = None,
+                                 timeout: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Ask the best provider, hedging and failing over, the loser is cancelled"""
+        order = self._order()
+        pending = {}
+        errors = []
+
+        def launch():
+            name = order.pop(0)
+            task = asyncio.ensure_future(self._timedAsync(name, question, context, timeout, max_tokens))
+            pending[task] = name
+            return name
+
+        primary = launch()
+        hedged = False
+        try:
+            while pending:
+                delay = self.hedgeDelay(primary) if self.hedge and order and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    launch()
+                    continue
+
+                # every finished task is looked at, so no exception goes unretrieved
+                answers = []
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(f"{name}: {str(task.exception())}")
+                    else:
+                        answers.append(task.result())
+                if answers:
+                    return answers[0]
+
+                if not pending and order:
+                    self.failovers += 1
+                    primary = launch()
+        finally:
+            # the losing request, or all of them when the caller is cancelled,
+            # waited for so it is recorded and its outcome retrieved
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        raise Exception(f"All providers failed: {'; '.join(errors)}")
+
+    async def ask_many(self, questions: list, context: Optional[str] = None, concurrency: int = 8,
+                       timeout: Optional[float] = None, return_exceptions: bool = False,
+                       max_tokens: Optional[int] = None) -> list:
+        """Route several questions concurrently, answers in question order"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def ask(question):
+            async with semaphore:
+                return await self.ask_question_async(question, context, timeout=timeout, max_tokens=max_tokens)
+
+        return await asyncio.gather(*(ask(q) for q in questions), return_exceptions=return_exceptions)
+
+    async def aclose(self) -> None:
+        """Close every provider's async client, see _Provider.aclose"""
+        for provider in self.providers.values():
+            await provider.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def routerFromEnv(cache=None) -> Optional[ProviderRouter]:
+    """
+    Build a router over the providers listed in REVISION_PROVIDERS
+
+    Returns:
+        ProviderRouter: or None when the variable is not set or no listed
+                        provider could be created
+    """
+    names = [name.strip().lower() for name in os.environ.get("REVISION_PROVIDERS", "").split(',') if name.strip()]
+    providers = {}
+    for name in names:
+        if name not in PROVIDERS:
+            print(f"❌ Unknown provider {name}")
+            continue
+        try:
+            providers[name] = PROVIDERS[name](cache=cache)
+        except Exception as e:
+            print(f"❌ Provider {name} unavailable: {str(e)}")
+    return ProviderRouter(providers) if providers else None
@@ -0,0 +1,166 @@
+"""
+Posting scheduler driven by the rate-limit headers of the Twitter/X API.
+
+Every response to tweepy.Client carries the limit, the remaining budget and
+the reset time of its rate-limit windows (the 15 minute endpoint window and,
+for posting, the 24 hour user/app windows).  Each window is tracked as a token
+bucket holding the remaining budget which refills at its reset time, so posts
+go out back to back while there is budget and only wait once a window is used
+up, instead of sleeping a fixed interval after every tweet.  The same
+scheduler paces blocking posters (acquire) and asyncio ones (acquire_async).
+"""
+
+import asyncio
+import threading
+import time
+
+
+# window name -> (limit header, remaining header, reset header, window length)
+RATE_LIMIT_WINDOWS = {
+    'endpoint': ('x-rate-limit-limit', 'x-rate-limit-remaining', 'x-rate-limit-reset', 15 * 60),
+    'user24h': ('x-user-limit-24hour-limit', 'x-user-limit-24hour-remaining', 'x-user-limit-24hour-reset', 24 * 3600),
+    'app24h': ('x-app-limit-24hour-limit', 'x-app-limit-24hour-remaining', 'x-app-limit-24hour-reset', 24 * 3600),
+}
+
+# until the first response reports the budget, concurrent requests wait for it
+PROBE_POLL = 0.02
+# a probe that got no headers back (e.g. a network error) is given up after
+PROBE_TIMEOUT = 10.0
+
+
+class TokenBucket:
+    """Budget of one rate-limit window, refilled to its limit at reset"""
+
+    def __init__(self, limit: int, remaining: int, reset: float, period: float):
+        self.limit = limit
+        self.tokens = remaining
+        self.reset = reset
+        # reset time of the window the API last reported on
+        self.reported = reset
+        self.period = period
+        self.available = 0.0
+
+    def take(self, now: float) -> float:
+        """
+        Reserve one request from the budget
+
+        Returns:
+            float: time at which the reserved request may be sent
+        """
+        if now >= self.reset:
+            # the window rolled over, skip any windows that passed unused
+            periods = int((now - self.reset) // self.period) + 1
+            self.reset += periods * self.period
+            self.tokens = self.limit
+            self.available = 0.0
+
+        if self.tokens <= 0:
+            # budget used up, the request goes out once the window resets
+            self.available = self.reset
+            self.reset += self.period
+            self.tokens = self.limit
+
+        self.tokens -= 1
+        return max(now, self.available)
+
+
+class RateLimitScheduler:
+    """Spends the rate-limit budget reported by the API with token buckets"""
+
+    def __init__(self, clock=time.time, sleep=time.sleep, sleepAsync=asyncio.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.sleepAsync = sleepAsync
+        self.buckets = {}
+        self._probeStarted = None
+        self._lock = threading.Lock()
+
+    def update(self, headers) -> None:
+        """
+        Refresh the buckets from the headers of an API response
+
+        Args:
+            headers: response headers (case-insensitive mapping)
+        """
+        if headers is None:
+            return
+        lowered = {k.lower(): v for k, v in headers.items()}
+
+        with self._lock:
+            for name, (limitHeader, remainingHeader, resetHeader, period) in RATE_LIMIT_WINDOWS.items():
+                try:
+                    limit = int(lowered[limitHeader])
+                    remaining = int(lowered[remainingHeader])
+                    reset = float(lowered[resetHeader])
+                except (KeyError, ValueError):
+                    continue
+
+                bucket = self.buckets.get(name)
+                if bucket is None:
+                    self.buckets[name] = TokenBucket(limit, remaining, reset, period)
+                elif reset > bucket.reported:
+                    # a new window; when the bucket already rolled over on its
+                    # own, its count includes the requests sent since
+                    bucket.limit = limit
+                    bucket.tokens = min(bucket.tokens, remaining) if bucket.reset > bucket.reported else remaining
+                    bucket.reset = bucket.reported = reset
+                    if remaining > 0:
+                        bucket.available = 0.0
+                elif reset == bucket.reset:
+                    # responses to concurrent requests arrive in any order, one
+                    # sent earlier does not count the reservations made since
+                    bucket.limit = limit
+                    bucket.tokens = min(bucket.tokens, remaining)
+                # else: late news of a window the bucket has already moved past
+
+    def reserve(self) -> float:
+        """
+        Reserve one request in every known window
+
+        Returns:
+            float: seconds to wait before sending it (0 when there is budget)
+        """
+        with self._lock:
+            now = self.clock()
+            sendAt = now
+            for bucket in self.buckets.values():
+                sendAt = max(sendAt, bucket.take(now))
+            return sendAt - now
+
+    def acquire(self) -> float:
+        """Block until a request may be sent, returns the seconds waited"""
+        wait = self.reserve()
+        if wait > 0:
+            print(f"⏳ Rate limit budget used up, waiting {wait:.1f} seconds")
+            self.sleep(wait)
+        return wait
+
+    def _probing(self) -> bool:
+        # claims the probe when nothing is known yet, True while another
+        # request is the probe
+        with self._lock:
+            if self.buckets:
+                return False
+            now = self.clock()
+            if self._probeStarted is None or now - self._probeStarted >= PROBE_TIMEOUT:
+                self._probeStarted = now
+                return False
+            return True
+
+    async def acquire_async(self) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent
+
+        Concurrent callers start with a single request, the rest wait for
+        its response to report the budget.
+
+        Returns:
+            float: seconds waited for the budget
+        """
+        while self._probing():
+            await self.sleepAsync(PROBE_POLL)
+        wait = self.reserve()
+        if wait > 0:
+            print(f"⏳ Rate limit budget used up, waiting {wait:.1f} seconds")
+            await self.sleepAsync(wait)
+        return wait
@@ -0,0 +1,181 @@
+"""
+Concurrent revision stage.
+
+Runs reviseArticleForTweet for every chunk of every article through a bounded
+thread pool instead of one blocking LLM call after another.  Chunk order is
+kept per article, and an article with a chunk that failed is held back so it
+stays pending instead of being posted incomplete.  With a thread reviser
+(reviseArticleAsThread) each article is revised with a single call instead.
+With a job queue each revised chunk is checkpointed, and chunks revised by an
+earlier run are not sent to the LLM again.
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from tweetFormatter import reviseArticleForTweet, revisionChunks
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+def getConcurrency() -> int:
+    # max number of LLM calls in flight, configurable via the environment
+    return max(1, int(os.environ.get("REVISION_CONCURRENCY", DEFAULT_CONCURRENCY)))
+
+
+class RevisionStage:
+    """Bounded worker pool that revises article chunks concurrently"""
+
+    def __init__(self, concurrency: int = None, chunkLimit: int = 220, revise=reviseArticleForTweet,
+                 jobs=None, reviseThread=None):
+        """
+        Args:
+            concurrency (int, optional): LLM calls in flight, REVISION_CONCURRENCY
+                                         by default
+            chunkLimit (int): chunk size articles are split at
+            revise (callable): revises one chunk
+            jobs (JobQueue, optional): checkpoints revisions
+            reviseThread (callable, optional): revises a whole article,
+                called as reviseThread(article, chunkLimit, revise=...) and
+                returning the list of tweets, see reviseArticleAsThread
+        """
+        self.concurrency = concurrency or getConcurrency()
+        self.chunkLimit = chunkLimit
+        self.revise = revise
+        self.jobs = jobs
+        self.reviseThread = reviseThread
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def _reviseChunk(self, chunk: str, job: int = None, index: int = None):
+        try:
+            revised = self.revise(chunk)
+        except Exception:
+            print("*************  FAILED ******************")
+            return None
+
+        if job is not None and revised is not None:
+            self.jobs.save_revision(job, index, chunk, revised)
+        return revised
+
+    def _reviseArticle(self, item: dict, job: int = None) -> list:
+        article = item['description']
+        if job is not None:
+            saved = self.jobs.revisions(job)
+            if saved and all(source == article for source, _ in saved.values()):
+                return [saved[index][1] for index in sorted(saved)]
+
+        failed = []
+
+        def revise(chunk):
+            # reviseArticleAsThread leaves out chunks that fail, noted here
+            tweet = self._reviseChunk(chunk)
+            if tweet is None:
+                failed.append(chunk)
+            return tweet
+
+        try:
+            tweets = self.reviseThread(article, self.chunkLimit, revise=revise)
+        except Exception:
+            print("*************  FAILED ******************")
+            return None
+        if failed:
+            return None
+
+        if job is not None:
+            self.jobs.save_thread(job, article, tweets)
+        return tweets
+
+    def submit_chunk(self, chunk: str, job: int = None, index: int = None) -> Future:
+        """
+        Queue a single chunk, checkpointed as chunk index of job when given
+
+        Returns:
+            Future: the revised text, None when the revision failed
+        """
+        if self.jobs is None:
+            job = None
+        return self.pool.submit(self._reviseChunk, chunk, job, index)
+
+    def submit(self, item: dict) -> list:
+        """
+        Queue every chunk of an article for revision
+
+        Args:
+            item (dict): article dictionary from parseSections
+
+        Returns:
+            list: futures, one per chunk, in chunk order, or a single future
+                  of the whole thread with a thread reviser
+        """
+        if self.reviseThread is not None:
+            job = item.get('job') if self.jobs is not None else None
+            return [self.pool.submit(self._reviseArticle, item, job)]
+
+        chunks = revisionChunks(item['description'], self.chunkLimit)
+
+        job = item.get('job') if self.jobs is not None else None
+        if job is None:
+            return [self.pool.submit(self._reviseChunk, chunk) for chunk in chunks]
+
+        # reuse the chunks an earlier run already revised
+        saved = self.jobs.revisions(job)
+        futures = []
+        for index, chunk in enumerate(chunks):
+            source, revised = saved.get(index, (None, None))
+            if source == chunk:
+                future = Future()
+                future.set_result(revised)
+            else:
+                future = self.pool.submit(self._reviseChunk, chunk, job, index)
+            futures.append(future)
+        return futures
+
+    def collect(self, item: dict, futures: list) -> list:
+        """
+        Wait for an article's chunks and assemble its thread
+
+        Returns:
+            list: the article url followed by the revised chunks in order,
+                  None when a chunk could not be revised
+        """
+        revisedTweets = [item['url']]
+        for future in futures:
+            tweet = future.result()
+            if tweet is None:
+                print(f"❌ Holding back {item.get('title')}: not every chunk was revised")
+                return None
+            if isinstance(tweet, list):
+                revisedTweets.extend(tweet)
+            else:
+                revisedTweets.append(tweet)
+        return revisedTweets
+
+    def revise_sections(self, items: dict):
+        """
+        Revise every article of parseSections output
+
+        All chunks are submitted up front, results are yielded in
+        section/article order as soon as each article is complete.
+
+        Args:
+            items (dict): section name -> list of article dictionaries
+
+        Yields:
+            tuple: (item, revisedTweets), articles with a chunk that could
+                   not be revised are left out
+        """
+        pending = [(item, self.submit(item)) for v in items.values() for item in v]
+        for item, futures in pending:
+            revisedTweets = self.collect(item, futures)
+            if revisedTweets is not None:
+                yield item, revisedTweets
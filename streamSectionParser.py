@@ -0,0 +1,249 @@
+"""
+Single-pass, event driven section extractor.
+
+Produces the same sections dictionary as parse_email_sections without
+building a BeautifulSoup tree: the html is fed once through the standard
+library HTMLParser and the few relationships the extraction needs (the table
+around a section header, that table's next sibling table, the text-block div
+around a link) are tracked on a stack of open elements.
+"""
+
+from html.parser import HTMLParser
+
+from parseEmailSections import (SECTION_NAMES, blockTextParts, descriptionFromParts, fixUpHref,
+                                isSkippedHref, matchSection)
+
+
+# elements that never get an end tag
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+])
+
+
+class _Element:
+    """An open element and the extraction state hanging off it"""
+
+    __slots__ = ('tag', 'header', 'headerSections', 'awaiting', 'contentSections',
+                 'strings', 'links', 'link', 'strongLinks')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.header = None           # h1: collected text pieces
+        self.headerSections = None   # table: sections whose h1 it contains
+        self.awaiting = None         # parent: sections waiting for the next child table
+        self.contentSections = None  # table: sections whose articles it holds
+        self.strings = None          # text-block div: every string inside it
+        self.links = None            # text-block div: links waiting for its text
+        self.link = None             # a: the link being extracted
+        self.strongLinks = None      # strong: links whose title it holds
+
+
+class _Link:
+
+    __slots__ = ('seq', 'href', 'sections', 'block', 'title', 'titleStarted')
+
+    def __init__(self, seq, href, sections, block):
+        self.seq = seq
+        self.href = href
+        self.sections = sections
+        self.block = block
+        self.title = None
+        self.titleStarted = False
+
+
+class SectionStreamParser(HTMLParser):
+    """HTMLParser that extracts newsletter sections as the html streams by"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = [_Element(None)]   # document root
+        self.text = []
+        self.openBlocks = []
+        self.openHeaders = []
+        self.openContent = []
+        self.openLinks = []
+        self.titleCapture = []
+        self.seq = 0
+        self.found = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flushText()
+        if tag in VOID_ELEMENTS:
+            return
+
+        parent = self.stack[-1]
+        element = _Element(tag)
+
+        if tag == 'table':
+            if parent.awaiting:
+                # first table after a section header's table: the content table
+                element.contentSections = parent.awaiting
+                parent.awaiting = None
+                self.openContent.append(element)
+        elif tag == 'div':
+            classes = (dict(attrs).get('class') or '').split()
+            if 'text-block' in classes:
+                element.strings = []
+                element.links = []
+                self.openBlocks.append(element)
+        elif tag == 'h1':
+            element.header = []
+            self.openHeaders.append(element)
+        elif tag == 'a':
+            self._startLink(element, attrs)
+        elif tag == 'strong':
+            # the first strong inside a link holds its title
+            waiting = [link for link in self.openLinks if not link.titleStarted]
+            if waiting:
+                for link in waiting:
+                    link.titleStarted = True
+                    link.title = []
+                element.strongLinks = waiting
+                self.titleCapture.append(element)
+
+        self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> style tags open nothing
+        self._flushText()
+
+    def _startLink(self, element, attrs):
+        if not self.openContent:
+            return
+        href = dict(attrs).get('href', None)
+        if href is None or isSkippedHref(href):
+            return
+
+        sections = []
+        for content in self.openContent:
+            sections.extend(content.contentSections)
+
+        self.seq += 1
+        block = self.openBlocks[-1] if self.openBlocks else None
+        element.link = _Link(self.seq, href, sections, block)
+        self.openLinks.append(element.link)
+
+    def handle_endtag(self, tag):
+        self._flushText()
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                break
+        else:
+            return  # stray end tag
+
+        while len(self.stack) > index:
+            self._closeElement(self.stack.pop())
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_comment(self, data):
+        self._flushText()
+        # comments are strings of the text-block too, but not of get_text()
+        for block in self.openBlocks:
+            block.strings.append(data)
+
+    def unknown_decl(self, data):
+        # CDATA sections are strings of the text-block as well
+        if data.startswith('CDATA['):
+            self.handle_comment(data[len('CDATA['):])
+
+    def _flushText(self):
+        if not self.text:
+            return
+        text = ''.join(self.text)
+        self.text = []
+
+        for block in self.openBlocks:
+            block.strings.append(text)
+        for header in self.openHeaders:
+            header.header.append(text)
+        for strong in self.titleCapture:
+            for link in strong.strongLinks:
+                link.title.append(text)
+
+    def _closeElement(self, element):
+        parent = self.stack[-1] if self.stack else None
+
+        if element.header is not None:
+            self.openHeaders.remove(element)
+            section = matchSection(''.join(piece.strip() for piece in element.header))
+            if section:
+                table = next((e for e in reversed(self.stack) if e.tag == 'table'), None)
+                if table is not None:
+                    table.headerSections = (table.headerSections or []) + [section]
+
+        if element.strongLinks is not None:
+            self.titleCapture.remove(element)
+            for link in element.strongLinks:
+                link.title = ''.join(piece.strip() for piece in link.title)
+
+        if element.link is not None:
+            link = element.link
+            self.openLinks.remove(link)
+            if link.block is None:
+                self._addArticle(link, None)
+            else:
+                link.block.links.append(link)
+
+        if element.strings is not None:
+            self.openBlocks.remove(element)
+            if element.links:
+                parts = blockTextParts(element.strings)
+                for link in element.links:
+                    self._addArticle(link, parts)
+
+        if element.contentSections is not None:
+            self.openContent.remove(element)
+
+        if element.headerSections and parent is not None:
+            # the content table is the next table among this table's siblings
+            parent.awaiting = (parent.awaiting or []) + element.headerSections
+
+    def _addArticle(self, link, parts):
+        if isinstance(link.title, list):
+            # strong never closed, take what it collected
+            link.title = ''.join(piece.strip() for piece in link.title)
+        if not link.title:
+            return
+
+        description = descriptionFromParts(parts, link.title) if parts is not None else ""
+        url = fixUpHref(link.href)
+        for section in link.sections:
+            self.found.append((link.seq, section, {
+                'title': link.title,
+                'url': url,
+                'description': description
+            }))
+
+    def close(self):
+        super().close()
+        self._flushText()
+        while len(self.stack) > 1:
+            self._closeElement(self.stack.pop())
+
+    def sections(self) -> dict:
+        sections = {name: [] for name in SECTION_NAMES}
+        # articles complete when their text-block closes, put them back in
+        # document order
+        for seq, section, article in sorted(self.found, key=lambda found: found[0]):
+            sections[section].append(article)
+        return sections
+
+
+def parse_email_sections_stream(html_content):
+    """
+    Extract the newsletter sections in a single pass over the html
+
+    Args:
+        html_content (str): newsletter html
+
+    Returns:
+        dict: section name -> list of article dictionaries, same as
+              parse_email_sections
+    """
+    parser = SectionStreamParser()
+    parser.feed(html_content)
+    parser.close()
+    return parser.sections()
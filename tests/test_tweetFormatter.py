@@ -0,0 +1,89 @@
+"""
+Property checks of tweetFormatter.trim and split_into_tweets on random tweets:
+words, URLs, CJK, emoji, stray and trailing hashtags, words longer than a
+tweet and text with no spaces at all.
+"""
+
+import random
+import re
+
+import pytest
+
+from tweetFormatter import WORD_RE, split_into_tweets, trim
+from tweetLength import TWEET_LIMIT, weightedLength
+
+
+WORDS = ("patch exploit ransomware attackers vulnerability researchers released critical "
+         "update servers cloud breach phishing credentials").split()
+ODD = ["https://example.com/" + "p" * 60, "www.example.org/a", "日本語", "脆弱性", "👍", "🔐",
+       "“quoted”", "#inline", "x" * 300]
+EDGE = ['', '#', 'x' * 1000, '#Tag ' * 100, ' ' * 400, 'word ' * 100 + '#Tag', '👍' * 200]
+NUMBERING_RE = re.compile(r" \(\d+/\d+\)$")
+
+
+def randomTweet(rng) -> str:
+    words = [rng.choice(ODD) if rng.random() < 0.08 else rng.choice(WORDS)
+             for _ in range(rng.randint(0, 80))]
+    tags = [f"#{rng.choice(WORDS).title()}" for _ in range(rng.choice((0, 0, 1, 2, 3, 40)))]
+    separator = rng.choice((' ', ' ', ' ', '  ', '\n', ''))
+    return separator.join(words + tags)
+
+
+def trailingTags(tweet: str) -> str:
+    # the hashtags at the end, as they appear in tweet, '' if it is all tags
+    words = list(WORD_RE.finditer(tweet))
+    count = 0
+    while count < len(words) and words[-1 - count].group().startswith('#'):
+        count += 1
+    if count == 0 or count == len(words):
+        return ''
+    return tweet[words[-count].start():]
+
+
+def check(tweet: str) -> None:
+    """trim fits the limit, keeps the text as a prefix and the trailing hashtags"""
+    result = trim(tweet)
+    assert weightedLength(result) <= TWEET_LIMIT, (tweet, result)
+    if weightedLength(tweet) <= TWEET_LIMIT:
+        assert result == tweet
+        return
+
+    tags = trailingTags(tweet)
+    body = result
+    if tags and weightedLength(tags) + 1 <= TWEET_LIMIT:
+        assert result.endswith(tags), (tweet, result)
+        body = result[:len(result) - len(tags)].rstrip()
+    assert tweet.startswith(body), (tweet, result)
+
+
+def randomTweets(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [randomTweet(rng) for _ in range(count)] + EDGE
+
+
+def test_trim_properties():
+    for tweet in randomTweets(3000):
+        check(tweet)
+
+
+@pytest.mark.parametrize("number", [False, True])
+@pytest.mark.parametrize("limit", [12, 20, 24, 30, 60, TWEET_LIMIT])
+def test_split_into_tweets_fits_and_keeps_text(limit, number):
+    for text in randomTweets(200, seed=limit):
+        tweets = split_into_tweets(text, limit, number)
+        for tweet in tweets:
+            assert 0 < weightedLength(tweet) <= limit, (limit, tweet)
+        if number:
+            assert all(tweet.endswith(f" ({i}/{len(tweets)})") for i, tweet in enumerate(tweets, 1))
+            tweets = [NUMBERING_RE.sub('', tweet) for tweet in tweets]
+        assert ''.join(''.join(tweets).split()) == ''.join(text.split())
+
+
+def test_split_into_tweets_leaves_text_alone_when_it_fits():
+    text = "Critical patch released https://example.com/" + "p" * 60 + " 脆弱性 #Patch"
+    assert split_into_tweets(text) == [text]
+
+
+def test_split_into_tweets_numbering_needs_room():
+    with pytest.raises(ValueError):
+        split_into_tweets("word " * 100, 5, number=True)
@@ -0,0 +1,158 @@
+"""
+Local token counts for sizing prompts and max_tokens.
+
+Counts come from tiktoken when it is installed and its encoding can be
+loaded; encoders are built once per model and counts of repeated strings
+(system prompts, re-submitted chunks) are cached.  Without tiktoken a
+heuristic is used: every run of up to four word characters and every
+punctuation mark counts as a token, which tracks BPE counts of English text
+closely enough for budgeting.
+
+Used to right-size max_tokens per request, merge chunks too short to be
+worth their own call, and split or refuse inputs that would not fit the
+model's context window before they reach the network.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# prompt + completion tokens the models accept
+CONTEXT_WINDOWS = {
+    'gpt-3.5-turbo': 16385,
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'claude-3-haiku-20240307': 200000,
+    'llama2': 4096,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# chat messages carry a few tokens of framing each
+MESSAGE_OVERHEAD = 4
+
+HEURISTIC_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+@lru_cache(maxsize=None)
+def encoderFor(model: str):
+    """Returns the tiktoken encoding for model, or None to use the heuristic"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None
+    except Exception:
+        # e.g. the encoding file cannot be downloaded
+        return None
+
+
+@lru_cache(maxsize=4096)
+def countTokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """
+    Number of tokens text encodes to for model
+
+    Args:
+        text (str): any text
+        model (str): model name, picks the encoding
+
+    Returns:
+        int: exact with tiktoken, estimated otherwise
+    """
+    if not text:
+        return 0
+    encoder = encoderFor(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(HEURISTIC_RE.findall(text))
+
+
+def promptTokens(messages: list, model: str = "gpt-3.5-turbo") -> int:
+    """Tokens a list of chat messages takes up, including the per-message framing"""
+    return sum(countTokens(m['content'], model) + MESSAGE_OVERHEAD for m in messages) + 3
+
+
+def contextWindow(model: str) -> int:
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def tokensForChars(chars: int) -> int:
+    """Token budget for an answer of up to chars characters of English"""
+    return math.ceil(chars / 4)
+
+
+def maxTokensFor(prompt: int, model: str, cap: int, expected: int = None, margin: int = 16) -> int:
+    """
+    Right-size max_tokens for one request
+
+    Args:
+        prompt (int): prompt tokens, see promptTokens
+        model (str): model name
+        cap (int): most tokens the answer may ever need
+        expected (int, optional): tokens the answer is expected to take,
+            margin is added on top
+        margin (int): slack over expected
+
+    Returns:
+        int: max_tokens to send
+
+    Raises:
+        ValueError: when the prompt leaves no room for an answer
+    """
+    room = contextWindow(model) - prompt
+    budget = cap if expected is None else min(cap, expected + margin)
+    if room < min(budget, margin):
+        raise ValueError(f"Prompt of {prompt} tokens does not fit {model}'s {contextWindow(model)} token window")
+    return max(1, min(budget, room))
+
+
+def mergeShortChunks(chunks: list, minTokens: int = 12, maxChars: int = 280,
+                     model: str = "gpt-3.5-turbo") -> list:
+    """
+    Fold chunks too short to be worth their own LLM call into their neighbour
+
+    A short chunk (typically the tail split_into_tweets leaves) joins the
+    previous chunk, or the next one when it comes first, as long as the
+    merged text stays within maxChars.
+    """
+    merged = []
+    for chunk in chunks:
+        if merged and (countTokens(chunk, model) < minTokens or countTokens(merged[-1], model) < minTokens) \
+                and len(merged[-1]) + 1 + len(chunk) <= maxChars:
+            merged[-1] = f"{merged[-1]} {chunk}"
+        else:
+            merged.append(chunk)
+    return merged
+
+
+def splitOversized(text: str, maxTokens: int, model: str = "gpt-3.5-turbo") -> list:
+    """
+    Split text into pieces of at most maxTokens, at sentence ends where
+    possible and at word boundaries otherwise
+    """
+    if countTokens(text, model) <= maxTokens:
+        return [text]
+
+    pieces = []
+    current = ''
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        units = [sentence] if countTokens(sentence, model) <= maxTokens else sentence.split()
+        for unit in units:
+            candidate = f"{current} {unit}" if current else unit
+            if current and countTokens(candidate, model) > maxTokens:
+                pieces.append(current)
+                current = unit
+            else:
+                current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
@@ -1,66 +1,440 @@
 
+import json
 import os
+import re
+import threading
 
 from openai import OpenAI
 
+from diskCache import DiskCache, cacheKey, getRevisionCache
+from tokenEstimator import countTokens, maxTokensFor, mergeShortChunks, promptTokens, splitOversized, tokensForChars
+from tweetLength import TWEET_LIMIT, URL_RE, WIDE_RE, charWeight, isPlain, weightedLength
 
-def trim(tweet):
-    # get the hashtags starting from the end (in case there is a # in the article)
-    lastTag = len(tweet)
-    while True:
-        tag = tweet[:lastTag].rfind('#')
-        if tag == -1:
+
+REVISION_MODEL = "gpt-3.5-turbo"
+REVISION_PROMPT = "You are a helpful assistant that revises text to fit into a single tweet of 280 characters."
+REVISION_TEMPERATURE = 0.7
+REVISION_MAX_TOKENS = 70
+THREAD_PROMPT = ("You are a helpful assistant that revises an article into a thread of tweets. "
+                 "The first line gives the number of tweets to write. Reply with only a JSON array "
+                 "of strings, one per tweet in thread order, each at most 280 characters.")
+# longer articles are revised as several threads, one call each
+THREAD_INPUT_TOKENS = 1000
+
+_client = None
+_clientLock = threading.Lock()
+
+WORD_RE = re.compile(r"\S+")
+SENTENCE_END_RE = re.compile(r"[.!?][\"')\]”’]*$")
+
+
+def trim(tweet, limit=TWEET_LIMIT):
+    """
+    Shortens tweet to fit limit, keeping its trailing hashtags
+
+    Whole words are dropped from the end of the text before the hashtags, a
+    first word longer than the budget is cut.  Length is the platform's
+    weighted length (see tweetLength) and the text is scanned once, with no
+    copies until the result is built.
+
+    Args:
+        tweet (str): revised tweet, optionally ending in hashtags
+        limit (int): weighted length to fit
+
+    Returns:
+        str: tweet itself when it fits, else the shortened tweet
+    """
+    if weightedLength(tweet) <= limit:
+        return tweet
+
+    # the run of hashtags at the end (a # inside the article is not one)
+    end = len(tweet)
+    tailStart = pos = end
+    while pos > 0:
+        while pos > 0 and tweet[pos - 1].isspace():
+            pos -= 1
+        wordEnd = pos
+        while pos > 0 and not tweet[pos - 1].isspace():
+            pos -= 1
+        if pos == wordEnd or tweet[pos] != '#':
             break
-        lastTag = tag - 1
+        tailStart = pos
+
+    tailWeight = weightedLength(tweet, tailStart) + 1
+    if tailStart == 0 or tailWeight > limit:
+        # all hashtags, or too many of them to keep: trim them like text
+        tailStart, tailWeight = end, 0
+    budget = limit - tailWeight
+
+    if isPlain(tweet) or (URL_RE.search(tweet, 0, tailStart) is None and WIDE_RE.search(tweet, 0, tailStart) is None):
+        # plain text weighs its length: back off to the word boundary
+        cut = min(budget, tailStart)
+        if cut < tailStart and not tweet[cut].isspace():
+            while cut > 0 and not tweet[cut - 1].isspace():
+                cut -= 1
+        while cut > 0 and tweet[cut - 1].isspace():
+            cut -= 1
+        if cut == 0:
+            cut = min(budget, tailStart)
+            while cut > 0 and tweet[cut - 1].isspace():
+                cut -= 1
+        return _withTail(tweet, cut, tailStart)
+
+    cut = used = 0
+    for word in WORD_RE.finditer(tweet, 0, tailStart):
+        cost = weightedLength(tweet, cut, word.end())
+        if used + cost <= budget:
+            used += cost
+            cut = word.end()
+            continue
+
+        if cut == 0:
+            # not even the first word fits, cut inside it but not inside a
+            # url, a piece of one would still weigh a whole url
+            url = URL_RE.search(tweet, word.start(), word.end())
+            used += weightedLength(tweet, 0, word.start())
+            for i in range(word.start(), url.start() if url else word.end()):
+                used += charWeight(tweet[i])
+                if used > budget:
+                    break
+                cut = i + 1
+        break
+
+    return _withTail(tweet, cut, tailStart)
 
 
+def _withTail(tweet, cut, tailStart):
+    if tailStart == len(tweet):
+        return tweet[:cut]
+    if cut == 0:
+        return tweet[tailStart:]
+    return tweet[:cut] + ' ' + tweet[tailStart:]
 
-    if lastTag == -1:
-        hashtags = None
-        hashtagLength = len(tweet)
-    else:
-        hashtags = tweet[lastTag:]
-        hashtagLength = len(hashtags)
 
-    tweetLen = len(tweet[:lastTag])
-    while (tweetLen + hashtagLength) > 280:
-        lastTag = tweet[:lastTag].rfind(' ')
-        tweetLen = len(tweet[:lastTag])
+def _hardSplit(word, budget):
+    # a word heavier than a whole tweet, cut at the budget
+    pieces = []
+    start = used = 0
+    if not isPlain(word):
+        # a cut url still weighs 23, so pieces are weighed as a whole: the
+        # longest one that fits is found by bisection, weight only grows
+        # with the length of a piece
+        while start < len(word):
+            low, high = start + 1, len(word)
+            while low < high:
+                middle = (low + high + 1) // 2
+                if weightedLength(word, start, middle) <= budget:
+                    low = middle
+                else:
+                    high = middle - 1
+            pieces.append(word[start:low])
+            start = low
+        return pieces
 
-    return tweet[:lastTag] + hashtags
+    for i, char in enumerate(word):
+        weight = charWeight(char)
+        if used + weight > budget and i > start:
+            pieces.append(word[start:i])
+            start, used = i, 0
+        used += weight
+    pieces.append(word[start:])
+    return pieces
 
 
+def _pack(words, weights, budget):
+    # greedy fill, breaking after the last sentence end of a chunk when that
+    # fills three quarters of the budget, else after the last word that fits
+    chunks = []
+    current, ends = [], []
+    used = 0
+    sentenceEnd = None
+    for word, weight in zip(words, weights):
+        if current and used + 1 + weight > budget:
+            if sentenceEnd is not None and ends[sentenceEnd] * 4 >= budget * 3 and sentenceEnd < len(current) - 1:
+                carry = current[sentenceEnd + 1:]
+                chunks.append(' '.join(current[:sentenceEnd + 1]))
+                current = carry
+                used = ends[-1] - ends[sentenceEnd] - 1
+                ends = [end - ends[sentenceEnd] - 1 for end in ends[sentenceEnd + 1:]]
+                sentenceEnd = None
+                for index, carried in enumerate(current):
+                    if SENTENCE_END_RE.search(carried):
+                        sentenceEnd = index
+            else:
+                chunks.append(' '.join(current))
+                current, ends, used, sentenceEnd = [], [], 0, None
 
-def split_into_tweets(long_text, limit=280):
+        if current and used + 1 + weight > budget:
+            chunks.append(' '.join(current))
+            current, ends, used, sentenceEnd = [], [], 0, None
+
+        used += weight + (1 if current else 0)
+        current.append(word)
+        ends.append(used)
+        if SENTENCE_END_RE.search(word):
+            sentenceEnd = len(current) - 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def split_into_tweets(long_text, limit=TWEET_LIMIT, number=False):
+    """
+    Splits long_text into tweets of at most limit weighted length (urls count
+    23, CJK and emoji 2), breaking at word boundaries and preferably at the
+    end of a sentence.
+
+    Args:
+        long_text (str): text to split
+        limit (int): weighted length of each tweet
+        number (bool): end every tweet in "(i/n)", counted in the limit
+
+    Returns:
+        list: the tweets in order
+
+    Raises:
+        ValueError: number is set and the limit leaves no room for text next
+            to " (i/n)"
+    """
+    words = WORD_RE.findall(long_text)
+    if not words:
+        return []
+    plain = isPlain(long_text)
+
+    digits = 1
+    while True:
+        # " (i/n)" with n of the digits assumed so far
+        budget = limit - (2 * digits + 4 if number else 0)
+        if budget < 1:
+            raise ValueError(f"A limit of {limit} leaves no room for text in tweets numbered up to "
+                             f"{'9' * digits}")
+        pieces, weights = [], []
+        for word in words:
+            weight = len(word) if plain else weightedLength(word)
+            if weight <= budget:
+                pieces.append(word)
+                weights.append(weight)
+            else:
+                for piece in _hardSplit(word, budget):
+                    pieces.append(piece)
+                    weights.append(weightedLength(piece))
+        chunks = _pack(pieces, weights, budget)
+        if not number:
+            return chunks
+        if len(str(len(chunks))) <= digits:
+            return [f"{chunk} ({i}/{len(chunks)})" for i, chunk in enumerate(chunks, 1)]
+        digits = len(str(len(chunks)))
+
+
+def revisionChunks(long_text, limit=220):
     """
-    Splits long_text into a list of strings, each ≤ limit characters, breaking at word boundaries when possible.
+    The chunks of an article that are revised one call each: split_into_tweets
+    pieces, with a piece too short to be worth its own call merged into its
+    neighbour
     """
-    import textwrap
-    return textwrap.wrap(long_text, limit)
+    return mergeShortChunks(split_into_tweets(long_text, limit), model=REVISION_MODEL)
 
 
-def reviseArticleForTweet(article: str) -> str:
-    client = OpenAI(
+def revisionMessages(article: str) -> list:
+    return [
+        {"role": "system", "content": REVISION_PROMPT},
+        {"role": "user", "content": article}
+    ]
+
+
+def revisionMaxTokens(article: str) -> int:
+    # a revision is about as long as its input plus hashtags and never more
+    # than a tweet, raises ValueError for input the model could not take
+    expected = min(countTokens(article, REVISION_MODEL), tokensForChars(280))
+    return maxTokensFor(promptTokens(revisionMessages(article), REVISION_MODEL), REVISION_MODEL,
+                        REVISION_MAX_TOKENS, expected)
+
+
+def createClient() -> OpenAI:
+    # the client owns an httpx connection pool with keep-alive, so a single
+    # instance reuses its TCP/TLS connections across calls and threads
+    return OpenAI(
             api_key = os.environ.get("openaiApiKey", None),
+            base_url = os.environ.get("openaiBaseUrl", None),
     )
 
-    messages = []
-    messages.append({"role": "system", "content": "You are a helpful assistant that revises text to fit into a single tweet of 280 characters."})
-    messages.append({"role": "user", "content": article})
+
+def getClient() -> OpenAI:
+    """
+    Returns the long-lived OpenAI client for this process, created on first use
+    """
+    global _client
+    if _client is None:
+        with _clientLock:
+            if _client is None:
+                _client = createClient()
+    return _client
+
+
+def revisionCacheKey(article: str, maxTokens: int = None) -> str:
+    # keyed on the max_tokens sent, answers asked for at another budget differ
+    if maxTokens is None:
+        maxTokens = revisionMaxTokens(article)
+    return cacheKey(article, REVISION_MODEL, REVISION_PROMPT, REVISION_TEMPERATURE, maxTokens)
+
+
+def reviseArticleForTweet(article: str, client: OpenAI = None, cache: DiskCache = None) -> str:
+    if client is None:
+        client = getClient()
+    if cache is None:
+        cache = getRevisionCache()
+
+    maxTokens = revisionMaxTokens(article)
+    key = revisionCacheKey(article, maxTokens)
+    tweet = cache.get(key)
+    if tweet is not None:
+        return tweet
+
+    messages = revisionMessages(article)
 
     try:
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=REVISION_MODEL,
             messages=messages,
-            temperature=0.7,
-            max_tokens=70
+            temperature=REVISION_TEMPERATURE,
+            max_tokens=maxTokens
         )
+        if response.choices[0].finish_reason == 'length' and maxTokens < REVISION_MAX_TOKENS:
+            # the estimate was short and the revision got cut off, asked
+            # again once with room for a whole tweet
+            response = client.chat.completions.create(
+                model=REVISION_MODEL,
+                messages=messages,
+                temperature=REVISION_TEMPERATURE,
+                max_tokens=REVISION_MAX_TOKENS
+            )
         tweet = response.choices[0].message.content.strip()
+        cache.set(key, tweet)
         return tweet
     except Exception as e:
         print(f"Error revising article: {e}")
         raise
 
+
+def threadQuestion(article: str, parts: int) -> str:
+    return f"{parts}\n{article}"
+
+
+def threadMaxTokens(question: str, parts: int) -> int:
+    # every tweet is about as long as its share of the article plus hashtags
+    # and JSON quoting, and never more than one revision
+    messages = [{"role": "system", "content": THREAD_PROMPT}, {"role": "user", "content": question}]
+    expected = min(countTokens(question, REVISION_MODEL), parts * tokensForChars(280)) + parts * 8
+    return maxTokensFor(promptTokens(messages, REVISION_MODEL), REVISION_MODEL,
+                        parts * (REVISION_MAX_TOKENS + 4), expected)
+
+
+def parseThread(reply: str, parts: int, limit: int = TWEET_LIMIT):
+    """
+    Validate a thread revision
+
+    Args:
+        reply (str): model answer, a JSON array of strings
+        parts (int): number of tweets asked for
+        limit (int): longest tweet allowed, in weighted length
+
+    Returns:
+        list: the tweets, or None when the answer is not a usable thread
+    """
+    text = (reply or '').strip()
+    if text.startswith('```'):
+        # ```json ... ``` fences around the array
+        text = text.strip('`').strip()
+        if text.startswith('json'):
+            text = text[4:]
+    try:
+        tweets = json.loads(text)
+    except ValueError:
+        return None
+
+    if not isinstance(tweets, list) or not 0 < len(tweets) <= 2 * parts:
+        return None
+    if not all(isinstance(tweet, str) for tweet in tweets):
+        return None
+    tweets = [tweet.strip() for tweet in tweets]
+    if not all(0 < weightedLength(tweet) <= limit for tweet in tweets):
+        return None
+    return tweets
+
+
+def askThread(question: str, parts: int, client: OpenAI = None) -> str:
+    if client is None:
+        client = getClient()
+    response = client.chat.completions.create(
+        model=REVISION_MODEL,
+        messages=[
+            {"role": "system", "content": THREAD_PROMPT},
+            {"role": "user", "content": question}
+        ],
+        temperature=REVISION_TEMPERATURE,
+        max_tokens=threadMaxTokens(question, parts)
+    )
+    return response.choices[0].message.content
+
+
+def threadCacheKey(question: str) -> str:
+    return cacheKey(question, REVISION_MODEL, THREAD_PROMPT, REVISION_TEMPERATURE)
+
+
+def reviseArticleAsThread(article: str, chunkLimit: int = 220, revise=reviseArticleForTweet, ask=askThread,
+                          cache: DiskCache = None) -> list:
+    """
+    Revise a whole article into a thread with one LLM call
+
+    The answer is checked locally (a JSON array of tweets within 280
+    characters); when the call fails or the answer does not check out the
+    article is revised chunk by chunk instead.  Articles of a single chunk
+    go straight to revise, articles over THREAD_INPUT_TOKENS are revised as
+    several threads.
+
+    Args:
+        article (str): article description
+        chunkLimit (int): chunk size of the per-chunk fallback
+        revise (callable): per-chunk reviser, a chunk it returns None for is
+                           left out
+        ask (callable): sends a thread question and its number of tweets,
+                        returns the raw answer
+        cache (DiskCache, optional): validated threads
+
+    Returns:
+        list: the revised tweets in order
+    """
+    if cache is None:
+        cache = getRevisionCache()
+
+    tweets = []
+    for piece in splitOversized(article, THREAD_INPUT_TOKENS, REVISION_MODEL):
+        chunks = revisionChunks(piece, chunkLimit)
+        if len(chunks) > 1:
+            question = threadQuestion(piece, len(chunks))
+            key = threadCacheKey(question)
+            cached = cache.get(key)
+            if cached is not None:
+                tweets.extend(json.loads(cached))
+                continue
+
+            try:
+                thread = parseThread(ask(question, len(chunks)), len(chunks))
+            except Exception as e:
+                print(f"Error revising thread: {e}")
+                thread = None
+            if thread is not None:
+                cache.set(key, json.dumps(thread, ensure_ascii=False))
+                tweets.extend(thread)
+                continue
+            print("⚠️ Thread revision unusable, revising chunk by chunk")
+
+        for chunk in chunks:
+            tweet = revise(chunk)
+            if tweet is not None:
+                tweets.append(tweet)
+    return tweets
+
 if __name__ == "__main__":
 
     ######################################
@@ -0,0 +1,61 @@
+"""
+Tweet length as the platform counts it.
+
+Twitter weighs text before checking the 280 limit: every URL counts as 23
+whatever its length, characters from the Latin, Greek, Cyrillic and similar
+blocks (plus a few punctuation ranges) count 1, and everything else - CJK,
+emoji - counts 2.  Emoji made of several code points are counted per code
+point, which can only overestimate.
+"""
+
+import re
+
+
+TWEET_LIMIT = 280
+URL_WEIGHT = 23
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# characters outside the ranges of weight 1
+WIDE_RE = re.compile(r"[^\u0000-\u10FF\u2000-\u200D\u2010-\u201F\u2032-\u2037]")
+
+
+def _plainLength(text: str, start: int, end: int) -> int:
+    if end <= start:
+        return 0
+    return end - start + len(WIDE_RE.findall(text, start, end))
+
+
+def weightedLength(text: str, start: int = 0, end: int = None) -> int:
+    """
+    Weighted length of text[start:end], without copying it
+
+    Args:
+        text (str): tweet text
+        start (int): first character counted
+        end (int, optional): end of the range, the end of text by default
+
+    Returns:
+        int: length the platform checks against TWEET_LIMIT
+    """
+    if end is None and start == 0 and isPlain(text):
+        return len(text)
+    end = len(text) if end is None else end
+    total = 0
+    pos = start
+    for match in URL_RE.finditer(text, start, end):
+        total += _plainLength(text, pos, match.start()) + URL_WEIGHT
+        pos = match.end()
+    return total + _plainLength(text, pos, end)
+
+
+def isPlain(text: str) -> bool:
+    """True when text has no urls and no wide characters, so weighs its length"""
+    return text.isascii() and '://' not in text and 'www.' not in text
+
+
+def charWeight(char: str) -> int:
+    return 2 if WIDE_RE.match(char) else 1
+
+
+def fits(text: str, limit: int = TWEET_LIMIT) -> bool:
+    return weightedLength(text) <= limit
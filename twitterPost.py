@@ -4,35 +4,55 @@ Twitter/X Tweet Posting Script
 Requires Twitter API v2 credentials and tweepy library
 """
 
-import time
+import asyncio
+import requests
 import tweepy
-from tweepy.errors import Forbidden, BadRequest, NotFound, Unauthorized
+from tweepy.errors import Forbidden, BadRequest, NotFound, Unauthorized, TooManyRequests
 
 import os
 from typing import Optional
 
+from rateLimiter import RateLimitScheduler
+from tweetLength import TWEET_LIMIT, fits, weightedLength
+
+try:
+    import aiohttp
+    from tweepy.asynchronous import AsyncClient
+except Exception:
+    # tweepy.asynchronous needs aiohttp, async_lru and oauthlib
+    aiohttp = None
+    AsyncClient = None
+
+
+def twitterCredentials() -> dict:
+    """Twitter API credentials from environment variables, as tweepy client arguments"""
+    credentials = {
+        'bearer_token': os.getenv('bearerToken'),
+        'consumer_key': os.getenv('apiKey'),
+        'consumer_secret': os.getenv('apiKeySecret'),
+        'access_token': os.getenv('accessToken'),
+        'access_token_secret': os.getenv('accessTokenSecret')
+    }
+    if not all(v for k, v in credentials.items() if k != 'bearer_token'):
+        raise ValueError("Missing required Twitter API credentials in environment variables")
+    return credentials
+
+
 class TwitterPoster:
 
-    def __init__(self):
+    def __init__(self, scheduler: Optional[RateLimitScheduler] = None):
         """Initialize Twitter API client with credentials from environment variables"""
-        # Twitter API credentials (set these as environment variables)
-        api_key = os.getenv('apiKey')
-        api_secret = os.getenv('apiKeySecret')
-        access_token = os.getenv('accessToken')
-        access_token_secret = os.getenv('accessTokenSecret')
-        bearer_token = os.getenv('bearerToken')
+        # posts are paced by the rate-limit budget the API reports, the
+        # scheduler can be shared by several posters on the same account
+        self.scheduler = scheduler or RateLimitScheduler()
 
-        if not all([api_key, api_secret, access_token, access_token_secret]):
-            raise ValueError("Missing required Twitter API credentials in environment variables")
-
-        # Initialize the Twitter API v2 client
+        # Initialize the Twitter API v2 client, credentials come from
+        # environment variables
         self.client = tweepy.Client(
-            bearer_token=bearer_token,
-            consumer_key=api_key,
-            consumer_secret=api_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret,
-            wait_on_rate_limit=True
+            **twitterCredentials(),
+            wait_on_rate_limit=True,
+            # raw responses, so the rate-limit headers are available
+            return_type=requests.Response
         )
 
     def post_tweet(self, text: str, reply_to_id: Optional[str] = None) -> dict:
@@ -40,54 +60,66 @@ class TwitterPoster:
         Post a tweet to Twitter/X
 
         Args:
-            text (str): The tweet text (max 280 characters)
+            text (str): The tweet text (max 280 weighted characters)
             reply_to_id (str, optional): Tweet ID to reply to
 
         Returns:
             dict: Response from Twitter API containing tweet information
+
+        Raises:
+            ValueError: the tweet is too long or the API rejected it, nothing
+                was posted
         """
-        retVal = { 'id': '0' }
         try:
-            if len(text) > 280:
-                raise ValueError(f"Tweet text is too long: {len(text)} characters (max 280)")
+            # counted the way the API does: urls as 23, wide characters as 2
+            if not fits(text):
+                raise ValueError(f"Tweet text is too long: weighs {weightedLength(text)} (max {TWEET_LIMIT})")
 
             try:
                 # Post the tweet
+                self.scheduler.acquire()
                 response = self.client.create_tweet(
                     text=text,
                     in_reply_to_tweet_id=reply_to_id
                 )
+                self.scheduler.update(response.headers)
+                data = response.json()['data']
                 print(f"✅ Tweet posted successfully!")
-                print(f"Tweet ID: {response.data['id']}")
-                print(f"Tweet URL: https://twitter.com/user/status/{response.data['id']}")
-                retVal['id'] = response.data['id']
+                print(f"Tweet ID: {data['id']}")
+                print(f"Tweet URL: https://twitter.com/user/status/{data['id']}")
+                return { 'id': data['id'] }
 
             except (Forbidden, BadRequest, NotFound, Unauthorized) as e:
-                print(f"caught error posting tweet {str(e)}")
-                #raise(ValueError(f"Error posting tweet: {str(e)}"))
-
-            return retVal
+                # no tweet ID to reply to or checkpoint, the thread stops here
+                self.scheduler.update(e.response.headers)
+                raise ValueError(str(e)) from e
 
         except Exception as e:
             print(f"❌ Error posting tweet: {str(e)}")
             raise
 
 
-    def post_thread(self, tweets: list) -> list:
+    def post_thread(self, tweets: list, reply_to_id: Optional[str] = None, on_posted=None) -> list:
         """
         Post a thread of tweets
 
         Args:
             tweets (list): List of tweet texts
+            reply_to_id (str, optional): Tweet ID the thread continues from
+            on_posted (callable, optional): called with (index, tweet ID)
+                as soon as each tweet is posted
 
         Returns:
             list: List of tweet IDs from the thread
+
+        Raises:
+            ValueError: a tweet could not be posted, the ones before it were
+                already passed to on_posted
         """
         if not tweets:
             raise ValueError("Tweet list cannot be empty")
 
         tweet_ids = []
-        reply_to_id = None
 
         for i, tweet_text in enumerate(tweets):
             print(f"Posting tweet {i+1}/{len(tweets)}...")
@@ -95,12 +127,163 @@ class TwitterPoster:
             response = self.post_tweet(tweet_text, reply_to_id)
             tweet_ids.append(response['id'])
             reply_to_id = response['id']  # Next tweet will reply to this one
-            time.sleep(5)
+            if on_posted is not None:
+                on_posted(i, response['id'])
 
         print(f"✅ Thread of {len(tweets)} tweets posted successfully!")
         return tweet_ids
 
 
+class AsyncTwitterPoster:
+    """
+    TwitterPoster on tweepy's AsyncClient
+
+    Tweets of one thread still go out one after the other, each replying to
+    the previous one, but independent threads are posted concurrently over
+    one aiohttp session, so the rate-limit budget sets the pace instead of
+    the round trip of every tweet.
+    """
+
+    def __init__(self, scheduler: Optional[RateLimitScheduler] = None, session=None, concurrency: int = 4,
+                 rateLimitRetries: int = 3):
+        """
+        Args:
+            scheduler (RateLimitScheduler, optional): shared with other
+                posters on the same account
+            session (aiohttp.ClientSession, optional): session to post with,
+                one is opened on first use otherwise
+            concurrency (int): threads posted at once by post_threads
+            rateLimitRetries (int): times a tweet answered with 429 is sent
+                again once the window resets
+        """
+        if AsyncClient is None:
+            raise ImportError("AsyncTwitterPoster requires aiohttp, async_lru and oauthlib")
+
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.concurrency = max(1, concurrency)
+        self.rateLimitRetries = rateLimitRetries
+        # a 429 is waited out by the scheduler, tweepy's own retry loses the
+        # parameters of user-authenticated requests
+        self.client = AsyncClient(
+            **twitterCredentials(),
+            wait_on_rate_limit=False,
+            # raw responses, so the rate-limit headers are available
+            return_type=aiohttp.ClientResponse
+        )
+        self.client.session = session
+        self._ownSession = session is None
+
+    def _session(self):
+        # opened inside the running loop, tweepy opens one per request otherwise
+        if self.client.session is None:
+            self.client.session = aiohttp.ClientSession()
+        return self.client.session
+
+    async def post_tweet(self, text: str, reply_to_id: Optional[str] = None) -> dict:
+        """
+        Post a tweet to Twitter/X
+
+        Args:
+            text (str): The tweet text (max 280 weighted characters)
+            reply_to_id (str, optional): Tweet ID to reply to
+
+        Returns:
+            dict: Response from Twitter API containing tweet information
+
+        Raises:
+            ValueError: the tweet is too long or the API rejected it, nothing
+                was posted
+        """
+        if not fits(text):
+            raise ValueError(f"Tweet text is too long: weighs {weightedLength(text)} (max {TWEET_LIMIT})")
+
+        self._session()
+        try:
+            for attempt in range(self.rateLimitRetries + 1):
+                await self.scheduler.acquire_async()
+                try:
+                    response = await self.client.create_tweet(
+                        text=text,
+                        in_reply_to_tweet_id=reply_to_id
+                    )
+                    break
+                except TooManyRequests as e:
+                    # the budget was spent elsewhere, the headers say until when
+                    self.scheduler.update(e.response.headers)
+                    if attempt == self.rateLimitRetries:
+                        raise
+            self.scheduler.update(response.headers)
+            data = (await response.json())['data']
+            print(f"✅ Tweet posted: https://twitter.com/user/status/{data['id']}")
+            return { 'id': data['id'] }
+
+        except (Forbidden, BadRequest, NotFound, Unauthorized) as e:
+            # no tweet ID to reply to or checkpoint, the thread stops here
+            self.scheduler.update(e.response.headers)
+            print(f"❌ Error posting tweet: {str(e)}")
+            raise ValueError(str(e)) from e
+
+        except Exception as e:
+            print(f"❌ Error posting tweet: {str(e)}")
+            raise
+
+    async def post_thread(self, tweets: list, reply_to_id: Optional[str] = None, on_posted=None) -> list:
+        """
+        Post a thread of tweets, in order
+
+        Args:
+            tweets (list): List of tweet texts
+            reply_to_id (str, optional): Tweet ID the thread continues from
+            on_posted (callable, optional): called with (index, tweet ID)
+                as soon as each tweet is posted
+
+        Returns:
+            list: List of tweet IDs from the thread
+
+        Raises:
+            ValueError: a tweet could not be posted, the ones before it were
+                already passed to on_posted
+        """
+        if not tweets:
+            raise ValueError("Tweet list cannot be empty")
+
+        tweet_ids = []
+        for i, tweet_text in enumerate(tweets):
+            response = await self.post_tweet(tweet_text, reply_to_id)
+            tweet_ids.append(response['id'])
+            reply_to_id = response['id']
+            if on_posted is not None:
+                on_posted(i, response['id'])
+
+        print(f"✅ Thread of {len(tweets)} tweets posted successfully!")
+        return tweet_ids
+
+    async def post_threads(self, threads: list, return_exceptions: bool = False) -> list:
+        """
+        Post several independent threads concurrently
+
+        Args:
+            threads (list): lists of tweet texts
+            return_exceptions (bool): put a failed thread's exception in its
+                place instead of raising it
+
+        Returns:
+            list: the tweet IDs of each thread, in input order
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def post(tweets):
+            async with semaphore:
+                return await self.post_thread(tweets)
+
+        return await asyncio.gather(*(post(tweets) for tweets in threads), return_exceptions=return_exceptions)
+
+    async def aclose(self) -> None:
+        if self._ownSession and self.client.session is not None:
+            await self.client.session.close()
+            self.client.session = None
+
+
 def main():
     """Example usage of the TwitterPoster class"""
     try:
@@ -11,16 +11,72 @@ This script demonstrates how to call various URL shortening services:
 
 import requests
 import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import quote
 
+from requests.adapters import HTTPAdapter
+
+from diskCache import cacheKey, getShortenerCache
+from healthTracker import HealthTracker
+
+
+DEFAULT_ENDPOINTS = {
+    'tinyurl': "http://tinyurl.com/api-create.php",
+    'isgd': "https://is.gd/create.php",
+    'vgd': "https://v.gd/create.php",
+    'bitly': "https://api-ssl.bitly.com/v4/shorten"
+}
+# requests in flight per service, the free services throttle bursts
+DEFAULT_SERVICE_CONCURRENCY = 4
+# services tried by the 'fastest' mode, URL_SHORTENER_SERVICES overrides
+DEFAULT_FASTEST_SERVICES = ('tinyurl', 'isgd', 'vgd')
+MIN_STAGGER = 0.05
+
+_quickShortener = None
+_quickShortenerLock = threading.Lock()
+
+
 class URLShortener:
     """URL shortening service wrapper"""
     
-    def __init__(self):
+    def __init__(self, cache=None, timeout=10, endpoints=None, concurrency=DEFAULT_SERVICE_CONCURRENCY,
+                 services=None, tracker=None):
+        """
+        Args:
+            cache (DiskCache, optional): long url -> short url cache, the
+                                         shared shortener cache by default
+            timeout (float): seconds per request
+            endpoints (dict, optional): service -> API url overrides
+            concurrency (int): requests in flight per service in shorten_many
+            services (list, optional): services the 'fastest' mode tries
+            tracker (HealthTracker, optional): per-service latency and errors
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'URL-Shortener-Python/1.0'
         })
+        # one pooled connection per request in flight
+        adapter = HTTPAdapter(pool_connections=len(DEFAULT_ENDPOINTS), pool_maxsize=max(10, concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.cache = cache if cache is not None else getShortenerCache()
+        self.timeout = timeout
+        self.endpoints = {**DEFAULT_ENDPOINTS, **(endpoints or {})}
+        self.concurrency = max(1, concurrency)
+        self._limits = {}
+        self._limitsLock = threading.Lock()
+
+        if services is None:
+            configured = os.environ.get("URL_SHORTENER_SERVICES", "")
+            services = [name.strip().lower() for name in configured.split(',') if name.strip()]
+        self.services = list(services or DEFAULT_FASTEST_SERVICES)
+        self.tracker = tracker or HealthTracker(defaultLatency=1.0)
+        # racing requests run here, a loser finishes in the background
+        self._racePool = ThreadPoolExecutor(max_workers=len(self.services) * self.concurrency)
     
     def shorten_with_tinyurl(self, long_url):
         """
@@ -33,8 +89,8 @@ class URLShortener:
             str: Shortened URL or None if failed
         """
         try:
-            api_url = f"http://tinyurl.com/api-create.php?url={quote(long_url)}"
-            response = self.session.get(api_url, timeout=10)
+            api_url = f"{self.endpoints['tinyurl']}?url={quote(long_url)}"
+            response = self.session.get(api_url, timeout=self.timeout)
             
             if response.status_code == 200:
                 short_url = response.text.strip()
@@ -63,13 +119,13 @@ class URLShortener:
             str: Shortened URL or None if failed
         """
         try:
-            api_url = "https://is.gd/create.php"
+            api_url = self.endpoints['isgd']
             params = {
                 'format': 'simple',
                 'url': long_url
             }
             
-            response = self.session.post(api_url, data=params, timeout=10)
+            response = self.session.post(api_url, data=params, timeout=self.timeout)
             
             if response.status_code == 200:
                 short_url = response.text.strip()
@@ -97,13 +153,13 @@ class URLShortener:
             str: Shortened URL or None if failed
         """
         try:
-            api_url = "https://v.gd/create.php"
+            api_url = self.endpoints['vgd']
             params = {
                 'format': 'simple',
                 'url': long_url
             }
             
-            response = self.session.post(api_url, data=params, timeout=10)
+            response = self.session.post(api_url, data=params, timeout=self.timeout)
             
             if response.status_code == 200:
                 short_url = response.text.strip()
@@ -132,7 +188,7 @@ class URLShortener:
             str: Shortened URL or None if failed
         """
         try:
-            api_url = "https://api-ssl.bitly.com/v4/shorten"
+            api_url = self.endpoints['bitly']
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json'
@@ -145,7 +201,7 @@ class URLShortener:
                 api_url, 
                 headers=headers, 
                 json=data, 
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -175,26 +231,169 @@ class URLShortener:
         
         Args:
             long_url (str): The URL to shorten
-            service (str): Service to use ('tinyurl', 'isgd', 'vgd', 'bitly')
+            service (str): Service to use ('tinyurl', 'isgd', 'vgd', 'bitly',
+                           or 'fastest', see shorten_fastest)
             api_key (str): API key for services that require it
             
         Returns:
             str: Shortened URL or None if failed
         """
-        if service.lower() == 'tinyurl':
-            return self.shorten_with_tinyurl(long_url)
-        elif service.lower() == 'isgd':
-            return self.shorten_with_isgd(long_url)
-        elif service.lower() == 'vgd':
-            return self.shorten_with_vgd(long_url)
-        elif service.lower() == 'bitly':
+        service = service.lower()
+        if service == 'fastest':
+            return self.shorten_fastest(long_url, api_key=api_key)
+
+        key = cacheKey("shorten", service, long_url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        short_url = self._shortenWith(service, long_url, api_key)
+
+        if short_url:
+            self.cache.set(key, short_url)
+        return short_url
+
+    def _shortenWith(self, service, long_url, api_key=None):
+        if service == 'tinyurl':
+            short_url = self.shorten_with_tinyurl(long_url)
+        elif service == 'isgd':
+            short_url = self.shorten_with_isgd(long_url)
+        elif service == 'vgd':
+            short_url = self.shorten_with_vgd(long_url)
+        elif service == 'bitly':
             if not api_key:
                 print("Error: Bitly requires an API key")
                 return None
-            return self.shorten_with_bitly(long_url, api_key)
+            short_url = self.shorten_with_bitly(long_url, api_key)
         else:
             print(f"Error: Unknown service '{service}'")
             return None
+        return short_url
+
+    def _timedShorten(self, service, long_url, api_key):
+        start = time.monotonic()
+        try:
+            short_url = self._shortenWith(service, long_url, api_key)
+        except Exception as e:
+            print(f"{service} Error: {e}")
+            short_url = None
+        self.tracker.record(service, time.monotonic() - start if short_url else None, ok=bool(short_url))
+        return short_url
+
+    def _fastest(self, long_url, services, stagger, api_key):
+        order = self.tracker.rank(list(services))
+        pending = {}
+
+        def launch():
+            service = order.pop(0)
+            pending[self._racePool.submit(self._timedShorten, service, long_url, api_key)] = service
+            return service
+
+        primary = launch()
+        while pending:
+            delay = None
+            # services in cooldown are only tried once the others have failed
+            if order and self.tracker.healthy(order[0]):
+                delay = stagger if stagger is not None else max(MIN_STAGGER, self.tracker.p95(primary))
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+
+            for future in done:
+                pending.pop(future)
+                short_url = future.result()
+                if short_url:
+                    for other in pending:
+                        other.cancel()
+                    return short_url
+
+            if not pending and order:
+                primary = launch()
+
+        print(f"❌ No shortener answered for {long_url}")
+        return None
+
+    def shorten_fastest(self, long_url, services=None, stagger=None, api_key=None):
+        """
+        Shorten URL with whichever of several services answers first
+
+        Services are tried best first by rolling latency and error rate
+        (HealthTracker), a service in cooldown after repeated failures is
+        only tried when all the others have failed.  The next service is sent the URL once the current one has
+        taken longer than its p95, or after `stagger` seconds; stagger=0
+        races them all at once.  A failed request moves on to the next
+        service straight away.
+
+        Args:
+            long_url (str): The URL to shorten
+            services (list, optional): services to try, self.services by default
+            stagger (float, optional): seconds between sends instead of the p95
+            api_key (str): API key for services that require it
+
+        Returns:
+            str: the first valid shortened URL, or None if all failed
+        """
+        key = cacheKey("shorten", "fastest", long_url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        short_url = self._fastest(long_url, services or self.services, stagger, api_key)
+        if short_url:
+            self.cache.set(key, short_url)
+        return short_url
+
+    def _limit(self, service):
+        with self._limitsLock:
+            if service not in self._limits:
+                self._limits[service] = threading.BoundedSemaphore(self.concurrency)
+            return self._limits[service]
+
+    def _shortenLimited(self, long_url, service, api_key):
+        # for urls shorten_many already missed in the cache, not looked up again
+        service = service.lower()
+        with self._limit(service):
+            if service == 'fastest':
+                short_url = self._fastest(long_url, self.services, None, api_key)
+            else:
+                short_url = self._shortenWith(service, long_url, api_key)
+        if short_url:
+            self.cache.set(cacheKey("shorten", service, long_url), short_url)
+        return short_url
+
+    def shorten_many(self, long_urls, service='tinyurl', api_key=None):
+        """
+        Shorten several URLs at once
+
+        Repeated URLs are shortened once, URLs in the cache are not sent at
+        all and the rest are shortened concurrently, at most `concurrency`
+        requests to a service at a time (also across concurrent calls).
+
+        Args:
+            long_urls (list): URLs to shorten
+            service (str): Service to use ('tinyurl', 'isgd', 'vgd', 'bitly')
+            api_key (str): API key for services that require it
+
+        Returns:
+            list: Shortened URLs in input order, None where one failed
+        """
+        unique = list(dict.fromkeys(long_urls))
+        results = {}
+        misses = []
+        for long_url in unique:
+            cached = self.cache.get(cacheKey("shorten", service.lower(), long_url))
+            if cached is not None:
+                results[long_url] = cached
+            else:
+                misses.append(long_url)
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(misses))) as pool:
+                shortened = pool.map(lambda url: self._shortenLimited(url, service, api_key), misses)
+                results.update(zip(misses, shortened))
+
+        return [results[long_url] for long_url in long_urls]
 
 def main():
     """Demonstrate URL shortening with different services"""
@@ -267,9 +466,21 @@ def quick_shorten(url, service='tinyurl'):
     Returns:
         str: Shortened URL or original URL if failed
     """
-    shortener = URLShortener()
-    result = shortener.shorten_url(url, service)
+    result = getShortener().shorten_url(url, service)
     return result if result else url
 
+
+def getShortener():
+    """
+    Returns the process-wide URLShortener, so quick_shorten reuses one
+    session and its connections instead of opening new ones on every call
+    """
+    global _quickShortener
+    if _quickShortener is None:
+        with _quickShortenerLock:
+            if _quickShortener is None:
+                _quickShortener = URLShortener()
+    return _quickShortener
+
 if __name__ == "__main__":
     main()